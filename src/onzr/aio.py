@@ -0,0 +1,810 @@
+"""Onzr: asyncio deezer client."""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
+
+import httpx
+from deezer.errors import (
+    APIError,
+    DataException,
+    DeezerError,
+    GWAPIError,
+    WrongGeolocation,
+    WrongLicense,
+)
+from pydantic import BaseModel, HttpUrl, ValidationError
+
+from .cache import AudioCache, AudioKey
+from .crypto import CHUNK_SIZE, StreamBuffer, aligned_size
+from .deezer import (
+    API_ERROR_PATTERN,
+    API_URL,
+    QUOTA_MAX_RETRIES,
+    BaseTrack,
+    TrackStatus,
+)
+from .exceptions import DeezerLoginException, DeezerTrackException
+from .models.core import PlaylistShort, StreamQuality, TrackShort
+from .models.deezer import (
+    DeezerAlbumResponse,
+    DeezerPlaylist,
+    DeezerSong,
+    DeezerTrack,
+    type_adapter,
+)
+from .traffic import (
+    AsyncSingleFlight,
+    CircuitBreaker,
+    ConcurrencyGovernor,
+    Hedger,
+    Priority,
+    RateLimiter,
+    backoff_delay,
+    current_priority,
+    prioritized,
+)
+
+logger = logging.getLogger(__name__)
+
+GW_URL: str = "https://www.deezer.com/ajax/gw-light.php"
+MEDIA_URL: str = "https://media.deezer.com/v1/get_url"
+HTTP_HEADERS: Dict[str, str] = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/79.0.3945.130 Safari/537.36"
+    )
+}
+# Gateway errors that require to log in again
+GW_INVALID_TOKEN_ERRORS: List[dict] = [
+    {"GATEWAY_ERROR": "invalid api token"},
+    {"VALID_TOKEN_REQUIRED": "Invalid CSRF token"},
+]
+# API errors that should be retried (quota exceeded and service busy)
+API_RETRY_ERROR_CODES: List[int] = [4, 700]
+API_RETRY_DELAY: float = 5  # in seconds
+API_NO_DATA_ERROR_CODE: int = 800
+# Endpoint families guarded by their own circuit breaker
+ENDPOINT_FAMILIES: List[str] = ["api", "gateway", "media", "cdn"]
+# Concurrency governor traffic class of endpoint families
+TRAFFIC_CLASSES: Dict[str, str] = {
+    "api": "metadata",
+    "gateway": "gateway",
+    "media": "gateway",
+    "cdn": "cdn",
+}
+# How long should a persisted login session be reused? (in seconds)
+SESSION_TTL: int = 6 * 60 * 60
+
+# Streams are read by buffers of STREAM_BUFFER_SIZE bytes (rounded to a multiple of
+# CHUNK_SIZE so that every buffer starts at a chunk boundary)
+STREAM_BUFFER_SIZE: int = 42 * CHUNK_SIZE
+
+# Interrupted streams are resumed up to STREAM_MAX_RETRIES times in a row, waiting
+# for a bounded exponential backoff between attempts
+STREAM_MAX_RETRIES: int = 5
+STREAM_RETRY_BACKOFF: float = 0.5  # in seconds
+STREAM_RETRY_MAX_BACKOFF: float = 8.0  # in seconds
+
+# How long should idle CDN connections be kept alive between tracks? (in seconds)
+CDN_KEEPALIVE_EXPIRY: float = 60
+
+# Deezer model
+M = TypeVar("M", bound=BaseModel)
+R = TypeVar("R")
+
+
+class AsyncDeezerClient:
+    """An asyncio Deezer client.
+
+    This is the asyncio counterpart of the DeezerClient, it queries the public API,
+    the gateway and the media API (to get track URLs) using a shared HTTP client, and
+    streams tracks from the CDN using a dedicated HTTP client. Login is performed on
+    the first gateway call.
+    """
+
+    def __init__(
+        self,
+        arl: str,
+        blowfish: str,
+        connection_pool_maxsize: int = 10,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        limiter: Optional[RateLimiter] = None,
+        session_file: Optional[Path] = None,
+        session_ttl: int = SESSION_TTL,
+        hedger: Optional[Hedger] = None,
+        breakers: Optional[Dict[str, CircuitBreaker]] = None,
+        governor: Optional[ConcurrencyGovernor] = None,
+        http2: bool = False,
+        stream_buffer_size: int = STREAM_BUFFER_SIZE,
+        cdn_pool_size: int = 4,
+    ) -> None:
+        """Instantiate the asyncio Deezer client.
+
+        When a rate limiter is given, API and gateway requests are sent at the pace it
+        allows, backing off when Deezer quota is exceeded.
+
+        When a session file is given, the login session (cookies, user data and API
+        token) is persisted to this file and reused for `session_ttl` seconds, even
+        after a restart.
+
+        When a hedger is given, gateway song and media track URL calls (on the
+        critical path of track streaming) are hedged: a duplicate call is sent when
+        Deezer is slower than usual to answer.
+
+        When circuit breakers are given (per endpoint family, see ENDPOINT_FAMILIES),
+        requests to an unavailable family fail fast with a DeezerUnavailableException
+        instead of waiting for Deezer.
+
+        When a concurrency governor is given, concurrent requests are limited per
+        traffic class (see TRAFFIC_CLASSES).
+
+        When HTTP/2 is enabled (and the `h2` package is installed), concurrent
+        requests to a Deezer host are multiplexed over a single connection.
+
+        Streams are read and decrypted by buffers of `stream_buffer_size` bytes
+        (rounded to a multiple of CHUNK_SIZE). The CDN client opens up to
+        `cdn_pool_size` connections (whatever the CDN host), and keeps them alive
+        between tracks (see CDN_KEEPALIVE_EXPIRY).
+        """
+        self.arl = arl
+        self.blowfish = blowfish
+        self.limiter = limiter
+        self.session_file = session_file
+        self.session_ttl = session_ttl
+        self.hedger = hedger
+        self.breakers = breakers or {}
+        self.governor = governor or ConcurrencyGovernor({})
+        self.stream_buffer_size = aligned_size(stream_buffer_size)
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "HTTP/2 requires the 'h2' package (install onzr[http2]), "
+                "falling back to HTTP/1.1"
+            )
+            http2 = False
+        self.http = httpx.AsyncClient(
+            headers=HTTP_HEADERS,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=connection_pool_maxsize,
+            ),
+            timeout=30,
+            transport=transport,
+        )
+        self.http.cookies.set("arl", self.arl.strip(), domain=".deezer.com")
+        self.cdn = httpx.AsyncClient(
+            headers=HTTP_HEADERS,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=cdn_pool_size,
+                max_keepalive_connections=cdn_pool_size,
+                keepalive_expiry=CDN_KEEPALIVE_EXPIRY,
+            ),
+            timeout=30,
+            transport=transport,
+        )
+
+        self.logged_in: bool = False
+        self.api_token: Optional[str] = None
+        self.current_user: Dict[str, Any] = {}
+        self._login_lock = asyncio.Lock()
+        self.inflight = AsyncSingleFlight()
+
+    async def aclose(self):
+        """Close the HTTP clients."""
+        await self.http.aclose()
+        await self.cdn.aclose()
+
+    async def login(self):
+        """Login to deezer using the ARL cookie."""
+        async with self._login_lock:
+            if self.logged_in:
+                return
+            if self._restore_session():
+                logger.debug("Restored Deezer session")
+                return
+            logger.debug("Login in to deezer using defined ARL…")
+            user_data = await self._gw("deezer.getUserData")
+            user = user_data["USER"]
+            if not user["USER_ID"]:
+                raise DeezerLoginException("Cannot log in to Deezer, check your ARL")
+            options = user["OPTIONS"]
+            self.api_token = user_data["checkForm"]
+            self._set_current_user(
+                {
+                    "id": user["USER_ID"],
+                    "name": user["BLOG_NAME"],
+                    "license_token": options["license_token"],
+                    "can_stream_hq": options.get("web_hq") or options.get("mobile_hq"),
+                    "can_stream_lossless": (
+                        options.get("web_lossless") or options.get("mobile_lossless")
+                    ),
+                    "country": options["license_country"],
+                    "language": user["SETTING"]["global"].get("language", ""),
+                }
+            )
+            self.logged_in = True
+            self._save_session()
+
+    def _set_current_user(self, user: Dict[str, Any]):
+        """Set the logged in user (and its language)."""
+        self.current_user = user
+        if language := re.sub(r"[^0-9A-Za-z *,-.;=]", "", str(user["language"])):
+            self.http.headers["Accept-Language"] = language
+
+    @property
+    def _arl_digest(self) -> str:
+        """Get the ARL digest a persisted session belongs to."""
+        return hashlib.sha256(self.arl.strip().encode()).hexdigest()
+
+    def _save_session(self):
+        """Persist the login session (if enabled)."""
+        if self.session_file is None or self.session_ttl <= 0:
+            return
+        session = {
+            "arl": self._arl_digest,
+            "expires": time.time() + self.session_ttl,
+            "api_token": self.api_token,
+            "current_user": self.current_user,
+            "cookies": [
+                {
+                    "name": cookie.name,
+                    "value": cookie.value,
+                    "domain": cookie.domain,
+                    "path": cookie.path,
+                }
+                for cookie in self.http.cookies.jar
+            ],
+        }
+        tmp = self.session_file.with_suffix(".tmp")
+        try:
+            self.session_file.parent.mkdir(parents=True, exist_ok=True)
+            # The session grants access to the Deezer account
+            tmp.touch(mode=0o600)
+            tmp.write_text(json.dumps(session))
+            os.replace(tmp, self.session_file)
+        except OSError as err:
+            logger.warning(f"Cannot save Deezer session: {err}")
+
+    def _restore_session(self) -> bool:
+        """Restore the persisted login session if it is still valid."""
+        if self.session_file is None or self.session_ttl <= 0:
+            return False
+        try:
+            session = json.loads(self.session_file.read_text())
+            if session["arl"] != self._arl_digest or session["expires"] < time.time():
+                logger.debug("Persisted Deezer session is expired")
+                return False
+            for cookie in session["cookies"]:
+                self.http.cookies.set(**cookie)
+            self.api_token = session["api_token"]
+            self._set_current_user(session["current_user"])
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            logger.debug(f"Cannot restore Deezer session: {err}")
+            return False
+        self.logged_in = True
+        return True
+
+    def _forget_session(self):
+        """Remove the persisted login session."""
+        if self.session_file is not None:
+            self.session_file.unlink(missing_ok=True)
+
+    async def _request(
+        self, family: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """Send a request through the endpoint family circuit breaker (if any)."""
+        breaker = self.breakers.get(family)
+        if breaker is None:
+            async with self.governor.slot(TRAFFIC_CLASSES[family]):
+                return await self.http.request(method, url, **kwargs)
+
+        breaker.acquire()
+        try:
+            async with self.governor.slot(TRAFFIC_CLASSES[family]):
+                response = await self.http.request(method, url, **kwargs)
+        except httpx.TransportError:
+            breaker.failed()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        if response.is_server_error:
+            breaker.failed()
+        else:
+            breaker.succeeded()
+        return response
+
+    async def _send(
+        self, family: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """Send an API or gateway request through the rate limiter (if any).
+
+        Requests are sent again (up to QUOTA_MAX_RETRIES times) when quota is
+        exceeded.
+        """
+        for _ in range(QUOTA_MAX_RETRIES):
+            if self.limiter is not None:
+                await self.limiter.aacquire()
+            response = await self._request(family, method, url, **kwargs)
+            if response.status_code != httpx.codes.TOO_MANY_REQUESTS:
+                return response
+            await self._throttled()
+        # Quota is still exceeded: give up
+        response.raise_for_status()
+        return response
+
+    async def _throttled(self):
+        """Back off after a quota error."""
+        if self.limiter is None:
+            await asyncio.sleep(API_RETRY_DELAY)
+        else:
+            self.limiter.throttled()
+
+    def _succeeded(self):
+        """Report a successful call to the rate limiter (if any)."""
+        if self.limiter is not None:
+            self.limiter.succeeded()
+
+    async def _gw(self, method: str, args: Optional[dict] = None) -> Any:
+        """Call a gateway method."""
+        args = args or {}
+        params = {
+            "api_version": "1.0",
+            "api_token": ("null" if method == "deezer.getUserData" else self.api_token),
+            "input": "3",
+            "method": method,
+        }
+        response = await self._send("gateway", "POST", GW_URL, params=params, json=args)
+        response.raise_for_status()
+        payload = response.json()
+        self._succeeded()
+
+        if error := payload["error"]:
+            if error in GW_INVALID_TOKEN_ERRORS and method != "deezer.getUserData":
+                logger.debug("Invalid gateway token, will log in again…")
+                self.logged_in = False
+                self._forget_session()
+                await self.login()
+                return await self._gw(method, args)
+            if fallback := (payload.get("payload") or {}).get("FALLBACK"):
+                return await self._gw(method, args | fallback)
+            raise GWAPIError(json.dumps(error))
+        return payload["results"]
+
+    async def _hedged(
+        self, key: str, func: Callable[..., Awaitable[R]], *args, **kwargs
+    ) -> R:
+        """Await func, hedging the call if a hedger is configured."""
+        if self.hedger is None:
+            return await func(*args, **kwargs)
+        return await self.hedger.do(key, func, *args, **kwargs)
+
+    async def gw(self, method: str, args: Optional[dict] = None) -> Any:
+        """Call a gateway method (login first if needed)."""
+        if not self.logged_in:
+            await self.login()
+        return await self._gw(method, args)
+
+    async def api(self, model: type[M], method: str, **params) -> M:
+        """Query the public API and validate response using the input model.
+
+        Concurrent identical queries share the same upstream request.
+        """
+        logger.debug(f"Will query {method=} to {model=} with {params=}")
+        key = ("api", method, tuple(sorted(params.items())))
+        content = await self.inflight.do(key, self._api, method, **params)
+        return type_adapter(model).validate_json(content)
+
+    async def _api(self, method: str, **params) -> bytes:
+        """Query the public API and get the raw JSON response.
+
+        Busy API calls are retried (up to QUOTA_MAX_RETRIES times).
+        """
+        for attempt in range(1, QUOTA_MAX_RETRIES + 1):
+            response = await self._send(
+                "api", "GET", f"{API_URL}{method}", params=params
+            )
+            if not API_ERROR_PATTERN.match(response.content[:32]):
+                self._succeeded()
+                return response.content
+            error = response.json()["error"]
+            code = error.get("code")
+            if code not in API_RETRY_ERROR_CODES or attempt == QUOTA_MAX_RETRIES:
+                break
+            logger.warning(f"Deezer API is busy ({error}), will retry…")
+            await self._throttled()
+
+        if code == API_NO_DATA_ERROR_CODE:
+            raise DataException(f"DataException: {method} no data")
+        raise APIError(json.dumps(error))
+
+    async def track(self, track_id: int) -> TrackShort:
+        """Get track info."""
+        return (await self.api(DeezerTrack, f"track/{track_id}")).to_short()
+
+    async def album(self, album_id: int) -> List[TrackShort]:
+        """Get album tracks."""
+        return list(
+            (await self.api(DeezerAlbumResponse, f"album/{album_id}")).get_tracks()
+        )
+
+    async def playlist(self, playlist_id: int) -> PlaylistShort:
+        """Get playlist tracks."""
+        return (await self.api(DeezerPlaylist, f"playlist/{playlist_id}")).to_short()
+
+    async def song(self, track_id: int) -> DeezerSong:
+        """Get gateway song (concurrent calls for the same song are de-duplicated)."""
+        return DeezerSong(
+            **await self.inflight.do(
+                ("song", track_id),
+                self._hedged,
+                "gateway",
+                self.gw,
+                "song.getData",
+                {"SNG_ID": track_id},
+            )
+        )
+
+    async def songs(
+        self, track_ids: List[int], batch_size: int = 100
+    ) -> Dict[int, DeezerSong]:
+        """Get gateway songs given their identifiers.
+
+        Songs are concurrently fetched by batches using the gateway songs list method.
+        Songs that cannot be fetched (a failed batch does not fail other ones) or
+        validated are missing from the returned mapping (indexed by song identifier).
+        """
+
+        async def get_songs(batch: List[int]) -> List[DeezerSong]:
+            response = await self.gw("song.getListData", {"SNG_IDS": batch})
+            songs = []
+            for data in response.get("data", []):
+                try:
+                    songs.append(DeezerSong(**data))
+                except ValidationError as err:
+                    logger.warning(f"Ignoring invalid song {data.get('SNG_ID')}: {err}")
+            return songs
+
+        if not track_ids:
+            return {}
+        if not self.logged_in:
+            await self.login()
+        batches = [
+            track_ids[i : i + batch_size] for i in range(0, len(track_ids), batch_size)
+        ]
+        results = await asyncio.gather(
+            *(get_songs(batch) for batch in batches), return_exceptions=True
+        )
+        songs: Dict[int, DeezerSong] = {}
+        for batch, result in zip(batches, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning(f"Cannot fetch songs batch {batch}: {result}")
+                continue
+            songs.update((song.SNG_ID, song) for song in result)
+        return songs
+
+    async def get_track_url(self, track_token: str, quality: StreamQuality) -> HttpUrl:
+        """Get the URL of a track to stream given its token and quality."""
+        if not self.logged_in:
+            await self.login()
+        if (
+            quality == StreamQuality.FLAC
+            and not self.current_user.get("can_stream_lossless")
+        ) or (
+            quality == StreamQuality.MP3_320
+            and not self.current_user.get("can_stream_hq")
+        ):
+            raise WrongLicense(quality.value)
+
+        response = await self._hedged(
+            "media",
+            self._request,
+            "media",
+            "POST",
+            MEDIA_URL,
+            json={
+                "license_token": self.current_user["license_token"],
+                "media": [
+                    {
+                        "type": "FULL",
+                        "formats": [
+                            {"cipher": "BF_CBC_STRIPE", "format": quality.value}
+                        ],
+                    }
+                ],
+                "track_tokens": [track_token],
+            },
+        )
+        response.raise_for_status()
+        payload = response.json()
+
+        for data in payload.get("data", []):
+            if errors := data.get("errors"):
+                if errors[0]["code"] == 2002:  # noqa: PLR2004
+                    raise WrongGeolocation(self.current_user["country"])
+                raise DeezerError(json.dumps(payload))
+            if data.get("media"):
+                return HttpUrl(data["media"][0]["sources"][0]["url"])
+        raise DeezerTrackException("No media available for this track")
+
+    @asynccontextmanager
+    async def stream(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[httpx.Response]:
+        """Stream a file from the CDN (through its circuit breaker, if any)."""
+        breaker = self.breakers.get("cdn")
+        if breaker is None:
+            async with (
+                self.governor.slot(TRAFFIC_CLASSES["cdn"]),
+                self.cdn.stream("GET", url, headers=headers) as response,
+            ):
+                yield response
+            return
+
+        breaker.acquire()
+        try:
+            async with (
+                self.governor.slot(TRAFFIC_CLASSES["cdn"]),
+                self.cdn.stream("GET", url, headers=headers) as response,
+            ):
+                if response.is_server_error:
+                    breaker.failed()
+                else:
+                    breaker.succeeded()
+                yield response
+        except httpx.TransportError:
+            breaker.failed()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+
+
+class AsyncTrack(BaseTrack):
+    """A Deezer track using the asyncio client."""
+
+    def __init__(
+        self,
+        client: AsyncDeezerClient,
+        track_id: int,
+        song: Optional[DeezerSong] = None,
+    ) -> None:
+        """Instantiate a new track.
+
+        Track info is only available once fetched, either from a given gateway song
+        or by refreshing the track.
+        """
+        super().__init__(track_id, client.blowfish)
+        self.deezer = client
+
+        if song is not None:
+            self._update_track_info(song)
+
+    async def refresh(self):
+        """Refresh track info."""
+        logger.debug("Refreshing track info…")
+        self._update_track_info(await self.deezer.song(self.track_id))
+
+    async def _get_url(self, quality: StreamQuality) -> HttpUrl:
+        """Get URL of the track to stream."""
+        logger.debug(f"Getting track url with quality {quality}…")
+        return await self.deezer.get_track_url(self.token, quality)
+
+    async def _stream_from(self, url: str, offset: int) -> AsyncGenerator[bytes, None]:
+        """Stream decrypted track content from an offset (using a Range request)."""
+        start, headers = self._stream_range(offset)
+        async with self.deezer.stream(url, headers=headers) as r:
+            r.raise_for_status()
+            if r.status_code != httpx.codes.PARTIAL_CONTENT:
+                start = 0
+            filesize = int(r.headers.get("Content-Length", 0))
+            logger.debug(f"Track size: {filesize} (from {start})")
+            self.status = TrackStatus.STREAMING
+
+            buffer = StreamBuffer(
+                self.deezer.stream_buffer_size,
+                self._decrypt_buffer,
+                skip=offset - start,
+            )
+            async for data in r.aiter_bytes():
+                for block in buffer.feed(data):
+                    yield block
+            for block in buffer.flush():
+                yield block
+
+    async def stream(
+        self,
+        quality: StreamQuality = StreamQuality.MP3_128,
+        priority: Priority = Priority.STREAM,
+    ) -> AsyncGenerator[bytes, None]:
+        """Fetch track in-memory.
+
+        If the connection drops, streaming is transparently resumed from the last
+        received chunk.
+
+        quality (StreamQuality): audio file to stream quality
+        priority (Priority): outbound calls priority
+        """
+        # The stream is consumed by its own (response) task, all its outbound calls
+        # get this priority
+        current_priority.set(priority)
+        quality = self._stream_quality(quality)
+        logger.debug(
+            "Start streaming track: "
+            f"▶️ {self.full_title} (ID: {self.track_id} Q: {quality})"
+        )
+
+        self.streamed = 0
+        self.status = TrackStatus.IDLE
+
+        url = await self._get_url(quality)
+        failures = 0
+        while True:
+            try:
+                async for chunk in self._stream_from(str(url), self.streamed):
+                    self.streamed += len(chunk)
+                    failures = 0
+                    yield chunk
+                break
+            except httpx.TransportError as err:
+                failures += 1
+                if failures > STREAM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(
+                    failures, STREAM_RETRY_BACKOFF, STREAM_RETRY_MAX_BACKOFF
+                )
+                logger.warning(
+                    f"Track stream interrupted after {self.streamed} bytes ({err}), "
+                    f"resuming in {delay}s…"
+                )
+                await asyncio.sleep(delay)
+
+        # We are done here
+        self.status = TrackStatus.STREAMED
+        logger.debug(f"Track fully streamed {self.streamed}")
+
+    async def cached_stream(
+        self,
+        cache: AudioCache,
+        quality: StreamQuality = StreamQuality.MP3_128,
+        priority: Priority = Priority.STREAM,
+    ) -> AsyncGenerator[bytes, None]:
+        """Fetch track from the audio cache.
+
+        Cached tracks are read from disk without any request to Deezer. Other tracks
+        are streamed from Deezer and added to the cache once fully streamed.
+
+        cache (AudioCache): decrypted audio cache
+        quality (StreamQuality): audio file to stream quality
+        priority (Priority): outbound calls priority
+        """
+        with cache.pinned(self.track_id, quality):
+            if (path := cache.get(self.track_id, quality)) is not None:
+                logger.debug(f"Streaming track {self.track_id} from audio cache")
+                self.streamed = 0
+                self.status = TrackStatus.STREAMING
+                with path.open("rb") as file:
+                    while block := await asyncio.to_thread(
+                        file.read, self.deezer.stream_buffer_size
+                    ):
+                        self.streamed += len(block)
+                        yield block
+                self.status = TrackStatus.STREAMED
+                return
+
+            with cache.writer(self.track_id, quality) as file:
+                async for chunk in self.stream(quality, priority):
+                    await asyncio.to_thread(file.write, chunk)
+                    yield chunk
+
+
+class Prefetcher:
+    """Prefetch upcoming queued tracks into the audio cache.
+
+    Upcoming tracks (the `depth` first ones) are streamed in background tasks, with
+    the prefetch priority, and pinned in the cache until they leave the upcoming
+    tracks window. Prefetches of tracks that are no longer upcoming are cancelled.
+
+    Prefetches stream a copy of queued tracks, which are left untouched. As a
+    refreshed track may be a fallback track, the cache key of a prefetched track is
+    only known once refreshed: it is resolved from the queued track key.
+    """
+
+    def __init__(
+        self, cache: AudioCache, quality: StreamQuality, depth: int = 1
+    ) -> None:
+        """Instantiate the prefetcher."""
+        self.cache = cache
+        self.quality = quality
+        self.depth = depth
+        self.tasks: Dict[AudioKey, asyncio.Task] = {}
+        self.pins: Set[AudioKey] = set()
+        self.resolved: Dict[AudioKey, AudioKey] = {}
+
+    def _key(self, track: AsyncTrack) -> Optional[AudioKey]:
+        """Get the audio cache key of a track (if its info has been fetched)."""
+        if track.track_info is None:
+            return None
+        return track.track_id, track.query_quality(self.quality)
+
+    def _pin(self, pins: Set[AudioKey]) -> None:
+        """Pin given tracks in the cache and unpin others."""
+        for key in self.pins - pins:
+            self.cache.unpin(*key)
+        for key in pins - self.pins:
+            self.cache.pin(*key)
+        self.pins = pins
+
+    def schedule(self, tracks: Sequence[AsyncTrack]) -> None:
+        """Prefetch upcoming tracks and cancel stale prefetches."""
+        upcoming = {
+            key: track
+            for track in tracks[: self.depth]
+            if (key := self._key(track)) is not None
+        }
+        self.resolved = {
+            key: resolved for key, resolved in self.resolved.items() if key in upcoming
+        }
+        self._pin({self.resolved.get(key, key) for key in upcoming})
+
+        for key in self.tasks.keys() - upcoming.keys():
+            logger.debug(f"Cancelling stale track {key} prefetch")
+            self.tasks.pop(key).cancel()
+        for key, track in upcoming.items():
+            if (
+                key in self.tasks
+                or self.cache.get(*self.resolved.get(key, key)) is not None
+            ):
+                continue
+            self.tasks[key] = asyncio.create_task(self._prefetch(key, track))
+
+    def cancel(self) -> None:
+        """Cancel all prefetches."""
+        self.schedule([])
+
+    async def _prefetch(self, key: AudioKey, track: AsyncTrack) -> None:
+        """Stream a copy of a track into the audio cache."""
+        logger.debug(f"Prefetching track {key}")
+        prefetched = AsyncTrack(track.deezer, track.track_id)
+        try:
+            with prioritized(Priority.PREFETCH):
+                await prefetched.refresh()
+            resolved = prefetched.track_id, prefetched.query_quality(self.quality)
+            if resolved != key:
+                logger.debug(f"Track {key} prefetch resolved to {resolved}")
+                self.resolved[key] = resolved
+                self._pin((self.pins - {key}) | {resolved})
+            if self.cache.get(*resolved) is not None:
+                return
+            async for _ in prefetched.cached_stream(
+                self.cache, resolved[1], Priority.PREFETCH
+            ):
+                pass
+        except Exception as err:
+            logger.warning(f"Cannot prefetch track {track.track_id}: {err}")
+        finally:
+            if self.tasks.get(key) is asyncio.current_task():
+                del self.tasks[key]
@@ -0,0 +1,397 @@
+"""Onzr: on-disk caches."""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from .models.core import StreamQuality
+
+logger = logging.getLogger(__name__)
+
+# Cached responses time-to-live (in seconds) per Deezer API endpoint, endpoints
+# that are not listed here use the DEFAULT_TTL
+DEFAULT_TTL: int = 60 * 60
+ENDPOINTS_TTL: Dict[str, int] = {
+    "get_album": 7 * 24 * 60 * 60,
+    "get_artist": 7 * 24 * 60 * 60,
+    "get_artist_albums": 24 * 60 * 60,
+    "get_artist_radio": 60 * 60,
+    "get_artist_related": 7 * 24 * 60 * 60,
+    "get_artist_top": 24 * 60 * 60,
+    "get_playlist": 60 * 60,
+    "get_track": 7 * 24 * 60 * 60,
+}
+# How long should we remember that an object does not exist?
+NEGATIVE_TTL: int = 60 * 60
+
+
+class ResponseCache:
+    """A persistent Deezer API response cache.
+
+    Raw JSON responses are stored in a SQLite database, keyed by endpoint and
+    arguments. Each entry expires given its endpoint TTL and the least recently used
+    entries are evicted when the cache exceeds its maximal size. Missing objects are
+    also cached (negative caching) as `None` responses.
+
+    Albums release date never change: they are stored in a separate table that is
+    not subject to expiration nor eviction.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 10_000,
+        ttl: Optional[Dict[str, int]] = None,
+        negative_ttl: int = NEGATIVE_TTL,
+    ) -> None:
+        """Instantiate the cache and create its database if needed."""
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ENDPOINTS_TTL | (ttl or {})
+        self.negative_ttl = negative_ttl
+        self._lock = Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "response TEXT, "
+                "expires REAL NOT NULL, "
+                "accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS album_release_dates ("
+                "album_id INTEGER PRIMARY KEY, "
+                "release_date TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def key(endpoint: str, *args, **kwargs) -> str:
+        """Get the cache key of an endpoint call."""
+        return json.dumps([endpoint, args, kwargs], sort_keys=True, default=str)
+
+    def get_ttl(self, endpoint: str) -> int:
+        """Get endpoint cached responses time-to-live (in seconds)."""
+        return self.ttl.get(endpoint, DEFAULT_TTL)
+
+    def get(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """Get a cached response.
+
+        Returns a (hit, response) tuple, the response is `None` for negative entries.
+        """
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                row = self._db.execute(
+                    "SELECT response, expires FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return False, None
+                response, expires = row
+                if expires < now:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return False, None
+                self._db.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                )
+        except sqlite3.Error as err:
+            logger.warning("Cannot read from response cache: %s", err)
+            return False, None
+        if isinstance(response, str):
+            response = response.encode()
+        return True, response
+
+    def set(self, key: str, response: Optional[bytes], endpoint: str) -> None:
+        """Store an endpoint response (use a `None` response for missing objects)."""
+        ttl = self.negative_ttl if response is None else self.get_ttl(endpoint)
+        if ttl <= 0:
+            return
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                self._db.execute(
+                    "REPLACE INTO responses (key, response, expires, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now + ttl, now),
+                )
+                self._evict()
+        except sqlite3.Error as err:
+            logger.warning("Cannot write to response cache: %s", err)
+
+    def _evict(self) -> None:
+        """Remove least recently used entries exceeding the cache maximal size."""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if (exceeding := count - self.max_entries) <= 0:
+            return
+        logger.debug(f"Evicting {exceeding} response(s) from cache")
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+            (exceeding,),
+        )
+
+    def get_release_dates(self, album_ids: Iterable[int]) -> Dict[int, date]:
+        """Get known albums release date (unknown albums are missing)."""
+        dates: Dict[int, date] = {}
+        try:
+            with self._lock, self._db:
+                for album_id in album_ids:
+                    row = self._db.execute(
+                        "SELECT release_date FROM album_release_dates "
+                        "WHERE album_id = ?",
+                        (album_id,),
+                    ).fetchone()
+                    if row is not None:
+                        dates[album_id] = date.fromisoformat(row[0])
+        except sqlite3.Error as err:
+            logger.warning("Cannot read from response cache: %s", err)
+        return dates
+
+    def set_release_dates(self, dates: Dict[int, date]) -> None:
+        """Store albums release date."""
+        try:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "REPLACE INTO album_release_dates (album_id, release_date) "
+                    "VALUES (?, ?)",
+                    (
+                        (album_id, value.isoformat())
+                        for album_id, value in dates.items()
+                    ),
+                )
+        except sqlite3.Error as err:
+            logger.warning("Cannot write to response cache: %s", err)
+
+    def clear(self) -> None:
+        """Remove all cached responses (and albums release date)."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("DELETE FROM album_release_dates")
+
+    def __len__(self) -> int:
+        """Get the number of cached responses."""
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+
+AudioKey = Tuple[int, StreamQuality]
+
+
+class AudioCacheFile:
+    """An audio file being added to the cache (see `AudioCache.writer`).
+
+    Data is written to a temporary file. Writing errors are logged but not raised:
+    the file is then discarded instead of being added to the cache.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Create the temporary file."""
+        self.path: Optional[Path] = None
+        self.failed: bool = False
+        self._file: Optional[BinaryIO] = None
+        try:
+            fd, name = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+            self.path = Path(name)
+            self._file = os.fdopen(fd, "wb")
+        except OSError as err:
+            self._fail(err)
+
+    def _fail(self, err: OSError) -> None:
+        """Give up writing the file."""
+        logger.warning(f"Cannot write to audio cache: {err}")
+        self.failed = True
+
+    def write(self, data: bytes) -> None:
+        """Write data to the file."""
+        if self.failed or self._file is None:
+            return
+        try:
+            self._file.write(data)
+        except OSError as err:
+            self._fail(err)
+
+    def close(self) -> None:
+        """Close the file."""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except OSError as err:
+            self._fail(err)
+
+    def discard(self) -> None:
+        """Close and remove the file."""
+        self.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class AudioCache:
+    """A persistent decrypted audio cache.
+
+    Decrypted track streams are stored as files in the cache directory, keyed by
+    track identifier and stream quality. Files are added atomically once completely
+    written. The least recently used files are evicted when the cache exceeds its
+    `max_bytes` budget, except pinned ones (_e.g._ the playing track).
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 1_073_741_824) -> None:
+        """Instantiate the cache given its directory, indexing existing files."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._entries: OrderedDict[AudioKey, int] = OrderedDict()
+        self._pins: Counter = Counter()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        files = []
+        for file in self.path.iterdir():
+            # Remove incomplete files left behind (e.g. after a crash)
+            if file.suffix == ".part":
+                file.unlink(missing_ok=True)
+            elif (key := self._parse(file.name)) is not None:
+                stat = file.stat()
+                files.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+
+    @staticmethod
+    def filename(track_id: int, quality: StreamQuality) -> str:
+        """Get the file name of a cached track."""
+        return f"{track_id}-{quality}"
+
+    @staticmethod
+    def _parse(filename: str) -> Optional[AudioKey]:
+        """Get the cache key of a file name (if valid)."""
+        track_id, _, quality = filename.partition("-")
+        if not track_id.isdigit():
+            return None
+        try:
+            return int(track_id), StreamQuality(quality)
+        except ValueError:
+            return None
+
+    def get(self, track_id: int, quality: StreamQuality) -> Optional[Path]:
+        """Get the path of a cached track (if any)."""
+        key = (track_id, quality)
+        path = self.path / self.filename(*key)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return path
+
+    def pin(self, track_id: int, quality: StreamQuality) -> None:
+        """Prevent a cached track from being evicted (until unpinned)."""
+        with self._lock:
+            self._pins[(track_id, quality)] += 1
+
+    def unpin(self, track_id: int, quality: StreamQuality) -> None:
+        """Allow a pinned track to be evicted again."""
+        key = (track_id, quality)
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] <= 0:
+                del self._pins[key]
+
+    @contextmanager
+    def pinned(self, track_id: int, quality: StreamQuality) -> Iterator[None]:
+        """Prevent a cached track from being evicted in this context."""
+        self.pin(track_id, quality)
+        try:
+            yield
+        finally:
+            self.unpin(track_id, quality)
+
+    @contextmanager
+    def writer(self, track_id: int, quality: StreamQuality) -> Iterator[AudioCacheFile]:
+        """Add a track to the cache by writing its file.
+
+        The track is added once the context exits, unless writing failed or has been
+        interrupted (by an exception).
+        """
+        with self.pinned(track_id, quality):
+            file = AudioCacheFile(self.path)
+            try:
+                yield file
+            except BaseException:
+                file.discard()
+                raise
+            file.close()
+            if file.failed or file.path is None:
+                file.discard()
+                return
+            self._add((track_id, quality), file.path)
+
+    def _add(self, key: AudioKey, file: Path) -> None:
+        """Move a completed file into the cache."""
+        path = self.path / self.filename(*key)
+        try:
+            os.replace(file, path)
+            size = path.stat().st_size
+        except OSError as err:
+            logger.warning(f"Cannot write to audio cache: {err}")
+            file.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        """Get the cache size (in bytes)."""
+        with self._lock:
+            return sum(self._entries.values())
+
+    def _evict(self) -> None:
+        """Remove least recently used (unpinned) files exceeding the cache budget."""
+        exceeding = sum(self._entries.values()) - self.max_bytes
+        for key, size in list(self._entries.items()):
+            if exceeding <= 0:
+                break
+            if key in self._pins:
+                continue
+            logger.debug(f"Evicting track {key} from audio cache")
+            try:
+                (self.path / self.filename(*key)).unlink(missing_ok=True)
+            except OSError as err:
+                logger.warning(f"Cannot evict track {key} from audio cache: {err}")
+                continue
+            del self._entries[key]
+            exceeding -= size
+
+    def clear(self) -> None:
+        """Remove all cached tracks (but pinned ones)."""
+        with self._lock:
+            for key in list(self._entries):
+                if key in self._pins:
+                    continue
+                (self.path / self.filename(*key)).unlink(missing_ok=True)
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        """Get the number of cached tracks."""
+        with self._lock:
+            return len(self._entries)
@@ -30,8 +30,10 @@ from uvicorn.config import LOG_LEVELS
 
 from onzr.exceptions import OnzrConfigurationError
 
+from .cache import ResponseCache
 from .client import OnzrClient
 from .config import (
+    RESPONSE_CACHE_FILE,
     SETTINGS_FILE,
     get_onzr_dir,
     get_settings,
@@ -46,6 +48,7 @@ from .models.core import (
     ServerState,
     TrackShort,
 )
+from .traffic import RateLimiter
 
 FORMAT = "%(message)s"
 logging_console = Console(stderr=True)
@@ -92,12 +95,24 @@ def get_deezer_client(quiet: bool = False) -> DeezerClient:
     if not quiet:
         console.print("🚀 login in to Deezer…", style="cyan")
 
+    cache = (
+        ResponseCache(
+            get_onzr_dir() / RESPONSE_CACHE_FILE,
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=settings.RESPONSE_CACHE_TTL,
+        )
+        if settings.RESPONSE_CACHE
+        else None
+    )
+
     return DeezerClient(
         arl=settings.ARL,
         blowfish=settings.DEEZER_BLOWFISH_SECRET,
         fast=True,
         connection_pool_maxsize=settings.CONNECTION_POOL_MAXSIZE,
         always_fetch_release_date=settings.ALWAYS_FETCH_RELEASE_DATE,
+        cache=cache,
+        limiter=RateLimiter(settings.RATE_LIMIT) if settings.RATE_LIMIT else None,
     )
 
 
@@ -305,7 +320,16 @@ def search(
     if not quiet:
         console.print("🔍 start searching…")
     try:
-        results = deezer.search(artist, album, track, playlist, strict, release)
+        results = deezer.search(
+            artist,
+            album,
+            track,
+            playlist,
+            strict,
+            release,
+            # Only request the first match upstream
+            limit=1 if first else 25,
+        )
     except ValueError as err:
         raise typer.Exit(code=ExitCodes.INVALID_ARGUMENTS) from err
 
@@ -429,16 +453,23 @@ def playlist(
         logger.debug(f"{playlist_id=}")
 
     deezer = get_deezer_client(quiet=quiet)
-    playlist = deezer.playlist(int(playlist_id))
 
+    # Track ids are printed as playlist pages are fetched
+    if ids:
+        empty = True
+        for track in deezer.iter_playlist_tracks(int(playlist_id)):
+            console.print(track.id)
+            empty = False
+        if empty:
+            console.print("This playlist contains no tracks")
+            raise typer.Exit(code=ExitCodes.INVALID_ARGUMENTS)
+        return
+
+    playlist = deezer.playlist(int(playlist_id))
     if playlist.tracks is None:
         console.print("This playlist contains no tracks")
         raise typer.Exit(code=ExitCodes.INVALID_ARGUMENTS)
 
-    if ids:
-        print_collection_ids(playlist.tracks)
-        return
-
     print_collection_table(
         playlist.tracks, title=f"« {playlist.title} » by {playlist.user or '?'}"
     )
@@ -456,29 +487,51 @@ def mix(
     limit: Annotated[
         int, typer.Option("--limit", "-l", help="Limit to the l first hits per artist.")
     ] = 10,
+    depth: Annotated[
+        int,
+        typer.Option(
+            "--depth",
+            "-D",
+            min=0,
+            help="Also mix related artists up to this depth (0 to disable).",
+        ),
+    ] = 0,
+    fanout: Annotated[
+        int,
+        typer.Option(
+            "--fanout",
+            "-f",
+            min=1,
+            help="Maximal number of related artists mixed per artist.",
+        ),
+    ] = 5,
     quiet: Annotated[bool, typer.Option("--quiet", "-q", help="Quiet output.")] = False,
     ids: Annotated[
         bool, typer.Option("--ids", "-i", help="Show only result IDs.")
     ] = False,
 ):
-    """Create a playlist from multiple artists."""
+    """Create a playlist from multiple artists (and related artists)."""
     if ids:
         quiet = True
 
     deezer = get_deezer_client(quiet=quiet)
-    tracks: List[TrackShort] = []
 
     if not quiet:
         console.print("🍪 cooking the mix…")
 
-    for artist_ in artist:
-        result = deezer.search(artist_, strict=True)
-        # We expect the search engine to be relevant 🤞
-        artist_id = result[0].id
-        tracks += cast(
-            List[TrackShort],
-            deezer.artist(artist_id, radio=deep, top=True, limit=limit),
+    tracks, errors = deezer.mix(
+        artist, radio=deep, limit=limit, depth=depth, fanout=fanout
+    )
+    theme = get_theme()
+    # Report errors on stderr so that the output can still be piped
+    for name, err in errors.items():
+        logging_console.print(
+            f"⚠️  [{theme.alert_color}]Artist '{name}' is missing from the mix"
+            f"[/{theme.alert_color}] ({err})"
         )
+    if not tracks:
+        console.print(f"❌ [{theme.alert_color}]No match found[/{theme.alert_color}]")
+        raise typer.Exit(code=ExitCodes.NOT_FOUND)
     shuffle(tracks)
 
     if ids:
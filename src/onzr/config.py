@@ -3,6 +3,7 @@
 import logging
 from functools import cache
 from pathlib import Path
+from typing import Dict
 
 from pydantic import computed_field
 from pydantic.networks import HttpUrl
@@ -22,6 +23,9 @@ logger = logging.getLogger(__name__)
 
 APP_NAME: str = "onzr"
 SETTINGS_FILE: Path = Path("settings.yaml")
+RESPONSE_CACHE_FILE: Path = Path("cache.db")
+AUDIO_CACHE_DIR: Path = Path("audio")
+SESSION_FILE: Path = Path("session.json")
 
 
 def get_onzr_dir() -> Path:
@@ -72,8 +76,28 @@ class Settings(BaseSettings):
     ARL: str
     ALWAYS_FETCH_RELEASE_DATE: bool = False
     CONNECTION_POOL_MAXSIZE: int = 10
+    CDN_POOL_SIZE: int = 4  # pooled CDN connections (all hosts)
+    HTTP2: bool = False
+    STREAM_BUFFER_SIZE: int = 258_048  # in bytes (42 stream chunks)
     DEEZER_BLOWFISH_SECRET: str
     QUALITY: StreamQuality = StreamQuality.MP3_128
+    RATE_LIMIT: float = 10.0  # in requests per second (0 disables rate limiting)
+    SESSION_TTL: int = 6 * 60 * 60  # in seconds (0 disables session persistence)
+    HEDGING: bool = False
+    HEDGING_PERCENTILE: float = 95.0
+    HEDGING_MAX_RATIO: float = 0.1
+    CIRCUIT_BREAKER_THRESHOLD: int = 5  # consecutive failures (0 disables breakers)
+    CIRCUIT_BREAKER_TIMEOUT: float = 30.0  # in seconds
+    # Max concurrent calls per traffic class (0 disables the limit)
+    CONCURRENCY_LIMITS: Dict[str, int] = {"metadata": 8, "gateway": 4, "cdn": 4}
+
+    # Cache
+    RESPONSE_CACHE: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_TTL: Dict[str, int] = {}  # in seconds, per API endpoint
+    AUDIO_CACHE: bool = False
+    AUDIO_CACHE_MAX_SIZE: int = 1_073_741_824  # in bytes
+    PREFETCH_DEPTH: int = 1  # upcoming tracks (requires the audio cache)
 
     # Player
     # How long should we wait before getting player status after player control action?
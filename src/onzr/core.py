@@ -4,14 +4,24 @@ import logging
 import random
 from functools import cached_property
 from time import sleep
-from typing import List
+from typing import List, Optional
 
 from vlc import Instance, MediaList, MediaListPlayer
 
-from onzr.config import get_settings
-
-from .deezer import DeezerClient, Track
-from .models.core import QueuedTrack, QueuedTracks, QueueState, ServerState
+from onzr.config import AUDIO_CACHE_DIR, SESSION_FILE, get_onzr_dir, get_settings
+
+from .aio import ENDPOINT_FAMILIES, AsyncDeezerClient, AsyncTrack, Prefetcher
+from .cache import AudioCache
+from .models.core import (
+    HedgingStats,
+    QueuedTrack,
+    QueuedTracks,
+    QueueState,
+    ServerState,
+    ServerStats,
+    TrafficStats,
+)
+from .traffic import CircuitBreaker, ConcurrencyGovernor, Hedger, RateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +32,7 @@ class Queue:
     def __init__(self, player: MediaListPlayer) -> None:
         """Instantiate the tracks queue."""
         self.playing: int | None = None
-        self.tracks: List[Track] = []
+        self.tracks: List[AsyncTrack] = []
         self.player: MediaListPlayer = player
         self.playlist: MediaList = self._activate_new_playlist(self.player)
 
@@ -30,7 +40,7 @@ class Queue:
         """Get queue length."""
         return len(self.tracks)
 
-    def __getitem__(self, index: int) -> Track:
+    def __getitem__(self, index: int) -> AsyncTrack:
         """Get track from its queue index."""
         return self.tracks[index]
 
@@ -45,7 +55,7 @@ class Queue:
         return len(self) == 0
 
     @property
-    def current(self) -> Track | None:
+    def current(self) -> AsyncTrack | None:
         """Get the current track."""
         if self.playing is None:
             return None
@@ -62,7 +72,7 @@ class Queue:
         player.set_media_list(playlist)
         return playlist
 
-    def add(self, tracks: List[Track]):
+    def add(self, tracks: List[AsyncTrack]):
         """Add one or more tracks to queue."""
         start = len(self)
         self.tracks.extend(tracks)
@@ -102,7 +112,9 @@ class Queue:
 class Onzr:
     """Onzr main class that communicates with every components.
 
-    - deezer: Deezer API client
+    - deezer: Deezer API asyncio client
+    - audio_cache: decrypted audio cache (if enabled)
+    - prefetcher: upcoming tracks prefetcher (if enabled)
     - player: VLC player
     - queue: Queue instance
     """
@@ -111,13 +123,62 @@ class Onzr:
         """Instantiate components."""
         self.settings = get_settings()
 
-        # Deezer API client
-        self.deezer: DeezerClient = DeezerClient(
+        # Deezer API client (login is performed on the first gateway call, reusing the
+        # persisted session if any)
+        self.deezer: AsyncDeezerClient = AsyncDeezerClient(
             arl=self.settings.ARL,
             blowfish=self.settings.DEEZER_BLOWFISH_SECRET,
-            fast=False,
             connection_pool_maxsize=self.settings.CONNECTION_POOL_MAXSIZE,
-            always_fetch_release_date=self.settings.ALWAYS_FETCH_RELEASE_DATE,
+            limiter=(
+                RateLimiter(self.settings.RATE_LIMIT)
+                if self.settings.RATE_LIMIT
+                else None
+            ),
+            session_file=get_onzr_dir() / SESSION_FILE,
+            session_ttl=self.settings.SESSION_TTL,
+            hedger=(
+                Hedger(
+                    percentile=self.settings.HEDGING_PERCENTILE,
+                    max_ratio=self.settings.HEDGING_MAX_RATIO,
+                )
+                if self.settings.HEDGING
+                else None
+            ),
+            breakers=(
+                {
+                    family: CircuitBreaker(
+                        family,
+                        failure_threshold=self.settings.CIRCUIT_BREAKER_THRESHOLD,
+                        reset_timeout=self.settings.CIRCUIT_BREAKER_TIMEOUT,
+                    )
+                    for family in ENDPOINT_FAMILIES
+                }
+                if self.settings.CIRCUIT_BREAKER_THRESHOLD
+                else None
+            ),
+            governor=ConcurrencyGovernor(self.settings.CONCURRENCY_LIMITS),
+            http2=self.settings.HTTP2,
+            stream_buffer_size=self.settings.STREAM_BUFFER_SIZE,
+            cdn_pool_size=self.settings.CDN_POOL_SIZE,
+        )
+
+        # Decrypted audio cache
+        self.audio_cache: Optional[AudioCache] = (
+            AudioCache(
+                get_onzr_dir() / AUDIO_CACHE_DIR,
+                max_bytes=self.settings.AUDIO_CACHE_MAX_SIZE,
+            )
+            if self.settings.AUDIO_CACHE
+            else None
+        )
+        self.prefetcher: Optional[Prefetcher] = (
+            Prefetcher(
+                self.audio_cache,
+                self.settings.QUALITY,
+                depth=self.settings.PREFETCH_DEPTH,
+            )
+            if self.audio_cache is not None and self.settings.PREFETCH_DEPTH > 0
+            else None
         )
 
         # Player
@@ -127,6 +188,38 @@ class Onzr:
         # Queue
         self.queue: Queue = Queue(player=self.player)
 
+    def prefetch(self) -> None:
+        """Prefetch tracks following the playing one (cancelling stale prefetches)."""
+        if self.prefetcher is None:
+            return
+        playing = self.queue.playing
+        self.prefetcher.schedule(
+            [] if playing is None else self.queue.tracks[playing + 1 :]
+        )
+
+    def stats(self) -> ServerStats:
+        """Get Onzr outbound traffic stats."""
+        hedger = self.deezer.hedger
+        governor = self.deezer.governor
+        return ServerStats(
+            traffic={
+                name: TrafficStats(limit=limit, **governor.counters[name])
+                for name, limit in governor.limits.items()
+            },
+            hedging=(
+                {
+                    key: HedgingStats(**counter)
+                    for key, counter in hedger.counters.items()
+                }
+                if hedger
+                else {}
+            ),
+            circuits={
+                family: breaker.state
+                for family, breaker in self.deezer.breakers.items()
+            },
+        )
+
     def state(self) -> ServerState:
         """Get Onzr state."""
         # Wait a bit before returning the server/player state, since after performing
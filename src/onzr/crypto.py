@@ -0,0 +1,115 @@
+"""Onzr: Deezer streams decryption."""
+
+import functools
+from typing import Callable, Iterator, Tuple
+
+from Cryptodome.Cipher import Blowfish
+
+# Encrypted streams are made of stripes of STRIPE_SIZE bytes, only the first stripe
+# of every chunk (of CHUNK_SIZE bytes) is encrypted
+STRIPE_SIZE: int = 2048
+CHUNK_SIZE: int = 3 * STRIPE_SIZE
+
+# Encrypted stripes use Blowfish CBC with a fixed initialization vector
+IV: bytes = b"\x00\x01\x02\x03\x04\x05\x06\x07"
+BLOCK_SIZE: int = Blowfish.block_size
+BLOCK_BITS: int = 8 * BLOCK_SIZE
+
+
+def aligned_size(size: int) -> int:
+    """Round a stream buffer size down to a multiple of CHUNK_SIZE (one at least)."""
+    return max(CHUNK_SIZE, size - size % CHUNK_SIZE)
+
+
+@functools.cache
+def chaining_masks(stripes: int) -> Tuple[int, int]:
+    """Get CBC chaining masks for a number of consecutive stripes.
+
+    Shifting consecutive stripes by one block gives the previous ciphertext block
+    of every block but the first block of a stripe, chained to the IV. Returned
+    masks are the one keeping shifted blocks and the one setting the IV.
+    """
+    bits = 8 * STRIPE_SIZE
+    first = ((1 << BLOCK_BITS) - 1) << (bits - BLOCK_BITS)
+    iv = int.from_bytes(IV, "big") << (bits - BLOCK_BITS)
+    firsts = sum(first << (bits * stripe) for stripe in range(stripes))
+    ivs = sum(iv << (bits * stripe) for stripe in range(stripes))
+    return ((1 << (bits * stripes)) - 1) ^ firsts, ivs
+
+
+class StripeDecryptor:
+    """Decrypt Deezer stream stripes in batches.
+
+    The key schedule is performed once per track. All encrypted stripes of a buffer
+    are decrypted with a single ECB call, then the CBC chaining (XOR with the
+    previous ciphertext block, or the IV for the first block of a stripe) is
+    applied to all stripes at once, see `chaining_masks`.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        """Instantiate the decryptor given the track Blowfish key."""
+        self._cipher = Blowfish.new(key, Blowfish.MODE_ECB)  # noqa: S304
+
+    def decrypt_into(self, buffer: memoryview) -> None:
+        """Decrypt stream data in place, starting at a chunk boundary.
+
+        Data may span several chunks: the first stripe of every chunk longer than a
+        stripe is decrypted.
+        """
+        offsets = range(0, len(buffer) - STRIPE_SIZE, CHUNK_SIZE)
+        if not offsets:
+            return
+
+        ciphertext = b"".join(buffer[o : o + STRIPE_SIZE] for o in offsets)
+        keep, ivs = chaining_masks(len(offsets))
+        previous = (int.from_bytes(ciphertext, "big") >> BLOCK_BITS) & keep | ivs
+        plaintext = memoryview(
+            (
+                int.from_bytes(self._cipher.decrypt(ciphertext), "big") ^ previous
+            ).to_bytes(len(ciphertext), "big")
+        )
+        for stripe, o in enumerate(offsets):
+            buffer[o : o + STRIPE_SIZE] = plaintext[
+                stripe * STRIPE_SIZE : (stripe + 1) * STRIPE_SIZE
+            ]
+
+
+class StreamBuffer:
+    """Assemble stream data into a reusable buffer that is decrypted in place.
+
+    Received data is copied into a buffer of `size` bytes (rounded to a multiple of
+    CHUNK_SIZE) which is decrypted in place once full: chunks are neither sliced
+    nor concatenated. The first `skip` bytes of the stream are dropped.
+    """
+
+    def __init__(
+        self, size: int, decrypt: Callable[[memoryview], None], skip: int = 0
+    ) -> None:
+        """Instantiate an empty stream buffer."""
+        self._buffer = bytearray(aligned_size(size))
+        self._view = memoryview(self._buffer)
+        self._decrypt = decrypt
+        self.filled = 0
+        self.skip = skip
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        """Append received data, yielding decrypted blocks when the buffer is full."""
+        pending = memoryview(data)
+        while pending:
+            size = min(len(pending), len(self._buffer) - self.filled)
+            self._view[self.filled : self.filled + size] = pending[:size]
+            self.filled += size
+            pending = pending[size:]
+            if self.filled == len(self._buffer):
+                yield from self.flush()
+
+    def flush(self) -> Iterator[bytes]:
+        """Decrypt buffered data and yield it (if not skipped)."""
+        filled, self.filled = self.filled, 0
+        if filled <= self.skip:
+            self.skip -= filled
+            return
+        block = self._view[:filled]
+        self._decrypt(block)
+        yield bytes(block[self.skip :])
+        self.skip = 0
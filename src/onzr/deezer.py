@@ -2,22 +2,54 @@
 
 import functools
 import hashlib
+import json
 import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date
 from enum import IntEnum
+from functools import cached_property
+from itertools import islice
 from pprint import pformat
-from queue import Queue as SyncQueue
-from threading import Thread
-from typing import Any, Callable, Iterator, List, Optional, cast
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+from urllib.parse import parse_qs, urlsplit
 
 import deezer
 import requests
-from Cryptodome.Cipher import Blowfish
+from deezer.errors import (
+    APIError,
+    DataException,
+    DeezerError,
+    IndividualAccountChangedNotAllowedException,
+    InvalidQueryException,
+    InvalidTokenException,
+    ItemsLimitExceededException,
+    MissingParameterException,
+    PermissionException,
+    WrongParameterException,
+)
 from pydantic import HttpUrl
 
+from .cache import ResponseCache
+from .crypto import CHUNK_SIZE, StripeDecryptor
 from .exceptions import DeezerTrackException
 from .models.core import (
     AlbumShort,
+    ArtistShort,
     Collection,
     PlaylistShort,
     StreamQuality,
@@ -28,12 +60,15 @@ from .models.deezer import (
     DeezerAdvancedSearchResponse,
     DeezerAlbum,
     DeezerAlbumResponse,
+    DeezerAPIResponseCollection,
     DeezerArtist,
     DeezerArtistAlbumsResponse,
     DeezerArtistRadioResponse,
+    DeezerArtistRelatedResponse,
     DeezerArtistResponse,
     DeezerArtistTopResponse,
     DeezerPlaylist,
+    DeezerPlaylistTracksResponse,
     DeezerSearchAlbumResponse,
     DeezerSearchArtistResponse,
     DeezerSearchPlaylistResponse,
@@ -45,10 +80,141 @@ from .models.deezer import (
     to_artists,
     to_playlists,
     to_tracks,
+    type_adapter,
 )
+from .traffic import RateLimiter, SingleFlight
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Maximal number of items requested per page for paginated API collections
+PAGE_SIZE: int = 100
+
+# Number of related artists requested per artist when crawling the related artists
+# graph (at least the crawl fan-out)
+RELATED_ARTISTS_LIMIT: int = 20
+
+API_URL: str = "https://api.deezer.com/"
+API_TIMEOUT: int = 30  # in seconds
+API_RETRY_DELAY: float = 2  # in seconds
+
+# Requests sent to those URLs go through the client rate limiter (if any)
+RATE_LIMITED_URLS: List[str] = [API_URL]
+# API error responses start with an "error" object
+API_ERROR_PATTERN: re.Pattern = re.compile(rb'^\s*\{\s*"error"\s*:\s*\{')
+# API errors raised as deezer-py exceptions (by error code)
+API_ERRORS: Dict[int, type[APIError]] = {
+    100: ItemsLimitExceededException,
+    200: PermissionException,
+    300: InvalidTokenException,
+    500: WrongParameterException,
+    501: MissingParameterException,
+    600: InvalidQueryException,
+    800: DataException,
+    901: IndividualAccountChangedNotAllowedException,
+}
+# API errors for exceeded quota and busy service
+QUOTA_ERROR_CODES: List[int] = [4, 700]
+QUOTA_MAX_RETRIES: int = 5
+QUOTA_RETRY_DELAY: float = 5  # in seconds
+
+
+class RateLimitedAdapter(requests.adapters.HTTPAdapter):
+    """An HTTP adapter that sends requests through a rate limiter.
+
+    Quota errors are reported to the limiter and requests are sent again (up to
+    QUOTA_MAX_RETRIES times) once it has backed off.
+    """
+
+    def __init__(self, limiter: RateLimiter, **kwargs) -> None:
+        """Instantiate the adapter."""
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(
+        self, request: requests.PreparedRequest, *args, **kwargs
+    ) -> requests.Response:
+        """Send a request when the rate limiter allows it."""
+        stream = kwargs.get("stream", False)
+        for _ in range(QUOTA_MAX_RETRIES):
+            self.limiter.acquire()
+            response = super().send(request, *args, **kwargs)
+            if not self._is_quota_error(response, stream):
+                self.limiter.succeeded()
+                return response
+            self.limiter.throttled()
+        return response
+
+    @staticmethod
+    def _is_quota_error(response: requests.Response, stream: bool) -> bool:
+        """Check if the response is a quota error."""
+        if response.status_code == requests.codes.too_many_requests:
+            return True
+        # Only decode error responses
+        if stream or not API_ERROR_PATTERN.match(response.content[:32]):
+            return False
+        try:
+            code = response.json()["error"].get("code")
+        except (ValueError, KeyError, AttributeError):
+            return False
+        return code in QUOTA_ERROR_CODES
+
+
+class RawAPI(deezer.api.API):
+    """A Deezer public API client that returns raw JSON responses.
+
+    Successful responses are not decoded: callers validate them straight from bytes
+    (see the `type_adapter` helper). Only error responses are decoded to raise
+    deezer-py exceptions.
+    """
+
+    def api_call(self, method: str, args: Optional[dict] = None) -> bytes:
+        """Query the public API.
+
+        Failed connections and busy API calls are retried (up to QUOTA_MAX_RETRIES
+        times). When requests go through a RateLimitedAdapter, busy API calls have
+        already been retried by the adapter and are not retried again.
+        """
+        params = dict(args or {})
+        if self.access_token:
+            params["access_token"] = self.access_token
+        rate_limited = isinstance(self.session.get_adapter(API_URL), RateLimitedAdapter)
+        for attempt in range(1, QUOTA_MAX_RETRIES + 1):
+            try:
+                response = self.session.get(
+                    f"{API_URL}{method}",
+                    params=params,
+                    headers=self.http_headers,
+                    timeout=API_TIMEOUT,
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == QUOTA_MAX_RETRIES:
+                    raise
+                time.sleep(API_RETRY_DELAY)
+                continue
+
+            content = response.content
+            if not API_ERROR_PATTERN.match(content[:32]):
+                return content
+            error = json.loads(content)["error"]
+            code = error.get("code")
+            if (
+                code not in QUOTA_ERROR_CODES
+                or rate_limited
+                or attempt == QUOTA_MAX_RETRIES
+            ):
+                break
+            logger.warning(f"Deezer API is busy ({error}), will retry…")
+            time.sleep(QUOTA_RETRY_DELAY)
+
+        if (exception := API_ERRORS.get(code)) is not None:
+            raise exception(
+                f"{exception.__name__}: {method} {error.get('message', '')}"
+            )
+        raise APIError(json.dumps(error))
+
 
 class DeezerClient(deezer.Deezer):
     """A wrapper for the Deezer API client."""
@@ -60,23 +226,47 @@ class DeezerClient(deezer.Deezer):
         fast: bool = False,
         connection_pool_maxsize: int = 10,
         always_fetch_release_date: bool = False,
+        cache: Optional[ResponseCache] = None,
+        max_workers: Optional[int] = None,
+        limiter: Optional[RateLimiter] = None,
     ) -> None:
         """Instantiate the Deezer API client.
 
         Fast login is useful to quicky access some API endpoints such as "search" but
         won't work if you need to stream tracks.
+
+        When a response cache is given, API responses are read from (and stored to)
+        this cache before hitting Deezer servers. Concurrent identical API calls are
+        de-duplicated: only one request is sent upstream and callers share its
+        response.
+
+        When a rate limiter is given, API requests are sent at the pace it allows,
+        backing off when Deezer quota is exceeded.
+
+        Concurrent API calls are performed by a pool of `max_workers` threads, it
+        defaults to the connection pool maximal size so that workers never wait for
+        an available connection.
         """
         super().__init__()
+        self.api = RawAPI(self.session, self.http_headers)
 
         # Set allowed maximal concurrent connections
         self.adapter = requests.adapters.HTTPAdapter(
             pool_maxsize=connection_pool_maxsize
         )
         self.session.mount("https://", self.adapter)
+        self.limiter = limiter
+        if limiter is not None:
+            limited = RateLimitedAdapter(limiter, pool_maxsize=connection_pool_maxsize)
+            for url in RATE_LIMITED_URLS:
+                self.session.mount(url, limited)
 
         self.arl = arl
         self.blowfish = blowfish
         self.always_fetch_release_date = always_fetch_release_date
+        self.cache = cache
+        self.max_workers = max_workers or connection_pool_maxsize
+        self.inflight = SingleFlight()
         if fast:
             self._fast_login()
         else:
@@ -99,18 +289,44 @@ class DeezerClient(deezer.Deezer):
         self.session.cookies.set_cookie(cookie_obj)
         self.logged_in = True
 
+    @cached_property
+    def executor(self) -> ThreadPoolExecutor:
+        """Get the client worker pool (created on first use)."""
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="onzr-deezer"
+        )
+
+    def map_concurrently(
+        self, func: Callable[[T], R], items: Iterable[T]
+    ) -> Generator[R, None, None]:
+        """Apply a function to all items using the client worker pool.
+
+        Results are yielded in the input order. To apply backpressure, no more than
+        `max_workers` calls are pending at once: a new item is only submitted to the
+        pool when a result has been consumed.
+        """
+        iterator = iter(items)
+        pending: Deque[Future[R]] = deque(
+            self.executor.submit(func, item)
+            for item in islice(iterator, self.max_workers)
+        )
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(
+                self.executor.submit(func, item) for item in islice(iterator, 1)
+            )
+            yield result
+
     def _collection_details(
         self,
         collection: Collection,
     ) -> Collection:
         """Add detailled informations to collection.
 
-        Detailled informations are fetched using separated threads to speed up response
-        time for large collections.
+        Detailled informations are fetched concurrently using the client worker pool
+        to speed up response time for large collections. Tracks only need their
+        release date: it is fetched once per album (see `album_release_dates`).
         """
-        queue: SyncQueue = SyncQueue()
-        threads = []
-        order = {}
         endpoint: Callable[[int], TrackShort] | Callable[[int], AlbumShort] | None = (
             None
         )
@@ -127,7 +343,27 @@ class DeezerClient(deezer.Deezer):
 
         sample = collection[0]
         if isinstance(sample, TrackShort):
-            endpoint = get_track
+            tracks = cast(List[TrackShort], collection)
+            dates = self.album_release_dates(
+                track.album_id for track in tracks if track.album_id is not None
+            )
+            # Tracks with an unknown album are fetched one by one
+            orphans = [track.id for track in tracks if track.album_id is None]
+            details = dict(
+                zip(orphans, self.map_concurrently(get_track, orphans), strict=True)
+            )
+            return [
+                (
+                    details[track.id]
+                    if track.album_id is None
+                    else track.model_copy(
+                        update={
+                            "release_date": dates[track.album_id] or track.release_date
+                        }
+                    )
+                )
+                for track in tracks
+            ]
         elif isinstance(sample, AlbumShort):
             endpoint = get_album
         else:
@@ -135,28 +371,46 @@ class DeezerClient(deezer.Deezer):
             logger.error(msg)
             raise ValueError(msg)
 
-        # Start threads
-        # FIXME: mypy cannot reliably guess types when using enumerate
-        for position, item in enumerate(collection):
-            order[item.id] = position  # type: ignore[attr-defined]
-            t = Thread(
-                target=lambda q, id_: q.put(endpoint(id_)),
-                args=(queue, item.id),  # type: ignore[attr-defined]
-            )
-            t.start()
-            threads.append(t)
+        # FIXME: mypy cannot reliably guess types of the collection items
+        return cast(
+            Collection,
+            list(
+                self.map_concurrently(
+                    endpoint,  # type: ignore[arg-type]
+                    (item.id for item in collection),  # type: ignore[union-attr]
+                )
+            ),
+        )
 
-        # Join threads
-        for t in threads:
-            t.join()
+    def album_release_dates(
+        self, album_ids: Iterable[int]
+    ) -> Dict[int, Optional[date]]:
+        """Get albums release date.
 
-        # Get updated collection
-        new = []
-        while not queue.empty():
-            new.append(queue.get())
+        Every album is fetched once, concurrently using the client worker pool. When
+        the response cache is enabled, known release dates are read from (and
+        fetched ones stored to) its albums release date table.
+        """
+        ids = list(dict.fromkeys(album_ids))
+        dates: Dict[int, Optional[date]] = {}
+        if self.cache is not None:
+            dates.update(self.cache.get_release_dates(ids))
+        missing = [id_ for id_ in ids if id_ not in dates]
+        logger.debug(f"Fetching {len(missing)}/{len(ids)} album(s) release date")
+
+        def get_release_date(id_: int) -> Optional[date]:
+            return cast(
+                DeezerAlbum, self._api(DeezerAlbum, self.api.get_album, id_)
+            ).release_date
 
-        # Preserve collection ordering
-        return sorted(new, key=lambda i: order[i.id])
+        fetched = dict(
+            zip(missing, self.map_concurrently(get_release_date, missing), strict=True)
+        )
+        if self.cache is not None:
+            self.cache.set_release_dates(
+                {id_: value for id_, value in fetched.items() if value is not None}
+            )
+        return dates | fetched
 
     def _api(
         self,
@@ -164,8 +418,10 @@ class DeezerClient(deezer.Deezer):
             type[DeezerAlbum]
             | type[DeezerAlbumResponse]
             | type[DeezerArtist]
+            | type[DeezerArtistRelatedResponse]
             | type[DeezerArtistResponse]
             | type[DeezerPlaylist]
+            | type[DeezerPlaylistTracksResponse]
             | type[DeezerSearchResponse]
             | type[DeezerTrack]
         ),
@@ -176,6 +432,7 @@ class DeezerClient(deezer.Deezer):
         DeezerAlbum
         | DeezerAlbumResponse
         | DeezerArtist
+        | DeezerArtistRelatedResponse
         | DeezerArtistResponse
         | DeezerPlaylist
         | DeezerSearchResponse
@@ -184,78 +441,139 @@ class DeezerClient(deezer.Deezer):
         """An API proxy that validates response using the input model."""
         logger.debug(f"Will query {endpoint=} to {model=} with {args=}/{kwargs=}")
 
-        response = endpoint(*args, **kwargs)
-        logger.debug(pformat(response, sort_dicts=True))
+        # Concurrent identical queries share the same upstream request
+        key = ResponseCache.key(endpoint.__name__, *args, **kwargs)
+        if self.cache is None:
+            content = self.inflight.do(key, endpoint, *args, **kwargs)
+        else:
+            content = self.inflight.do(key, self._cached, endpoint, *args, **kwargs)
 
-        instance = model(**response)
-        logger.debug(f"{instance=}")
+        instance = type_adapter(model).validate_json(content)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(pformat(json.loads(content), sort_dicts=True))
+            logger.debug(f"{instance=}")
         return instance
 
-    def artist(
+    def _cached(self, endpoint: Callable, *args, **kwargs) -> bytes:
+        """Read-through response cache for API endpoints."""
+        cache = cast(ResponseCache, self.cache)
+        key = cache.key(endpoint.__name__, *args, **kwargs)
+
+        hit, response = cache.get(key)
+        if hit:
+            logger.debug(f"Cache hit for {key=}")
+            if response is None:
+                raise DataException(f"DataException: {endpoint.__name__} no data")
+            return response
+
+        try:
+            response = endpoint(*args, **kwargs)
+        except DataException:
+            cache.set(key, None, endpoint.__name__)
+            raise
+        cache.set(key, response, endpoint.__name__)
+        return response
+
+    def _pages(
+        self,
+        model: (
+            type[DeezerArtistResponse]
+            | type[DeezerPlaylistTracksResponse]
+            | type[DeezerSearchResponse]
+        ),
+        endpoint: Callable,
+        *args,
+        limit: Optional[int] = None,
+        index: int = 0,
+        **kwargs,
+    ) -> Generator[DeezerAPIResponseCollection, None, None]:
+        """Iterate over paginated API collection pages.
+
+        Pages are fetched on demand by following the `next` link of responses. The
+        limit is pushed to upstream queries so that no more than `limit` items are
+        requested (all items are when the limit is `None`).
+        """
+        while limit is None or limit > 0:
+            size = PAGE_SIZE if limit is None else min(limit, PAGE_SIZE)
+            page = cast(
+                DeezerAPIResponseCollection,
+                self._api(model, endpoint, *args, index=index, limit=size, **kwargs),
+            )
+            if limit is not None:
+                page.data = page.data[:limit]
+            yield page
+
+            if not page.data or page.next is None:
+                return
+            if limit is not None:
+                limit -= len(page.data)
+            next_index = parse_qs(urlsplit(page.next).query).get("index")
+            index = int(next_index[0]) if next_index else index + len(page.data)
+
+    def iter_artist(
         self,
         artist_id: int,
         radio: bool = False,
         top: bool = True,
         albums: bool = False,
-        limit: int = 10,
-        fetch_release_date: bool = False,
-    ) -> Collection:
-        """Get artist tracks."""
-        artist = cast(
-            DeezerArtist, self._api(DeezerArtist, self.api.get_artist, artist_id)
-        ).to_short()
-        logger.debug(f"{artist=}")
-        results: Collection = []
+        limit: Optional[int] = 10,
+    ) -> Generator[TrackShort | AlbumShort, None, None]:
+        """Iterate over artist tracks (or albums), fetching pages on demand.
 
+        The artist itself is only fetched to label its albums: this request is sent
+        concurrently with the first albums page request.
+        """
         if radio:
-            results = list(
-                to_tracks(
-                    cast(
-                        DeezerArtistRadioResponse,
-                        self._api(
-                            DeezerArtistRadioResponse,
-                            self.api.get_artist_radio,
-                            artist.id,
-                            limit=limit,
-                        ),
-                    )
-                )
-            )
+            for page in self._pages(
+                DeezerArtistRadioResponse,
+                self.api.get_artist_radio,
+                artist_id,
+                limit=limit,
+            ):
+                yield from to_tracks(page)
         elif top:
-            results = list(
-                to_tracks(
-                    cast(
-                        DeezerArtistTopResponse,
-                        self._api(
-                            DeezerArtistTopResponse,
-                            self.api.get_artist_top,
-                            artist.id,
-                            limit=limit,
-                        ),
-                    )
-                )
-            )
+            for page in self._pages(
+                DeezerArtistTopResponse, self.api.get_artist_top, artist_id, limit=limit
+            ):
+                yield from to_tracks(page)
         elif albums:
-            results = list(
-                to_albums(
-                    cast(
-                        DeezerArtistAlbumsResponse,
-                        self._api(
-                            DeezerArtistAlbumsResponse,
-                            self.api.get_artist_albums,
-                            artist.id,
-                            limit=limit,
-                        ),
-                    ),
-                    artist=artist,
-                )
+            future = self.executor.submit(
+                self._api, DeezerArtist, self.api.get_artist, artist_id
             )
+            for page in self._pages(
+                DeezerArtistAlbumsResponse,
+                self.api.get_artist_albums,
+                artist_id,
+                limit=limit,
+            ):
+                artist = cast(DeezerArtist, future.result()).to_short()
+                logger.debug(f"{artist=}")
+                yield from to_albums(page, artist=artist)
         else:
             raise ValueError(
                 "Either radio, top or albums should be True to get artist details"
             )
 
-        if self.always_fetch_release_date or fetch_release_date:
+    def artist(
+        self,
+        artist_id: int,
+        radio: bool = False,
+        top: bool = True,
+        albums: bool = False,
+        limit: Optional[int] = 10,
+        fetch_release_date: bool = False,
+    ) -> Collection:
+        """Get artist tracks."""
+        results = cast(
+            Collection,
+            list(
+                self.iter_artist(
+                    artist_id, radio=radio, top=top, albums=albums, limit=limit
+                )
+            ),
+        )
+
+        if (self.always_fetch_release_date or fetch_release_date) and results:
             results = self._collection_details(results)
 
         return results
@@ -275,97 +593,229 @@ class DeezerClient(deezer.Deezer):
             DeezerTrack, self._api(DeezerTrack, self.api.get_track, track_id)
         ).to_short()
 
+    def iter_playlist_tracks(
+        self, playlist_id: int, limit: Optional[int] = None, index: int = 0
+    ) -> Generator[TrackShort, None, None]:
+        """Iterate over playlist tracks, fetching pages on demand."""
+        for page in self._pages(
+            DeezerPlaylistTracksResponse,
+            self.api.get_playlist_tracks,
+            playlist_id,
+            limit=limit,
+            index=index,
+        ):
+            yield from to_tracks(page)
+
     def playlist(self, playlist_id: int) -> PlaylistShort:
-        """Get playlist tracks."""
-        return cast(
+        """Get playlist tracks.
+
+        The playlist response only includes its first tracks for large playlists:
+        remaining tracks are fetched page by page from the playlist tracks endpoint.
+        """
+        playlist = cast(
             DeezerPlaylist,
             self._api(DeezerPlaylist, self.api.get_playlist, playlist_id),
-        ).to_short()
+        )
+        result = playlist.to_short()
+        tracks = result.tracks
+        if tracks is None or len(tracks) >= playlist.nb_tracks:
+            return result
+
+        tracks.extend(
+            self.iter_playlist_tracks(
+                playlist_id, limit=playlist.nb_tracks - len(tracks), index=len(tracks)
+            )
+        )
+        return result
 
-    def search(
+    def iter_search(
         self,
         artist: str = "",
         album: str = "",
         track: str = "",
         playlist: str = "",
         strict: bool = False,
-        fetch_release_date: bool = False,
-    ) -> Collection:
-        """Mixed custom search."""
+        limit: Optional[int] = 25,
+    ) -> Generator[TrackShort | AlbumShort | ArtistShort | PlaylistShort, None, None]:
+        """Iterate over mixed custom search results, fetching pages on demand."""
         criteria = list(filter(None, (artist, album, track, playlist)))
-        results: Collection = []
 
         if len(criteria) == 0:
             msg = "You should at least provide one search criterion"
             logger.error(msg)
             raise ValueError(msg)
         elif len(criteria) > 1:
-            results = list(
-                to_tracks(
-                    cast(
-                        DeezerAdvancedSearchResponse,
-                        self._api(
-                            DeezerAdvancedSearchResponse,
-                            self.api.advanced_search,
-                            artist=artist,
-                            album=album,
-                            track=track,
-                            strict=strict,
-                        ),
-                    )
-                )
-            )
+            for page in self._pages(
+                DeezerAdvancedSearchResponse,
+                self.api.advanced_search,
+                artist=artist,
+                album=album,
+                track=track,
+                strict=strict,
+                limit=limit,
+            ):
+                yield from to_tracks(page)
         elif artist:
-            results = list(
-                to_artists(
-                    cast(
-                        DeezerSearchArtistResponse,
-                        self._api(
-                            DeezerSearchArtistResponse, self.api.search_artist, artist
-                        ),
-                    )
-                )
-            )
+            for page in self._pages(
+                DeezerSearchArtistResponse, self.api.search_artist, artist, limit=limit
+            ):
+                yield from to_artists(page)
         elif album:
-            results = list(
-                to_albums(
-                    cast(
-                        DeezerSearchAlbumResponse,
-                        self._api(
-                            DeezerSearchAlbumResponse, self.api.search_album, album
-                        ),
-                    )
-                )
-            )
+            for page in self._pages(
+                DeezerSearchAlbumResponse, self.api.search_album, album, limit=limit
+            ):
+                yield from to_albums(page)
         elif track:
-            results = list(
-                to_tracks(
-                    cast(
-                        DeezerSearchTrackResponse,
-                        self._api(
-                            DeezerSearchTrackResponse, self.api.search_track, track
-                        ),
-                    ),
-                )
-            )
+            for page in self._pages(
+                DeezerSearchTrackResponse, self.api.search_track, track, limit=limit
+            ):
+                yield from to_tracks(page)
         elif playlist:
-            results = list(
-                to_playlists(
-                    cast(
-                        DeezerSearchPlaylistResponse,
-                        self._api(
-                            DeezerSearchPlaylistResponse,
-                            self.api.search_playlist,
-                            playlist,
-                        ),
+            for page in self._pages(
+                DeezerSearchPlaylistResponse,
+                self.api.search_playlist,
+                playlist,
+                limit=limit,
+            ):
+                yield from to_playlists(page)
+
+    def search(
+        self,
+        artist: str = "",
+        album: str = "",
+        track: str = "",
+        playlist: str = "",
+        strict: bool = False,
+        fetch_release_date: bool = False,
+        limit: Optional[int] = 25,
+    ) -> Collection:
+        """Mixed custom search."""
+        results = cast(
+            Collection,
+            list(self.iter_search(artist, album, track, playlist, strict, limit)),
+        )
+
+        if (
+            (self.always_fetch_release_date or fetch_release_date)
+            and not artist
+            and results
+        ):
+            results = self._collection_details(results)
+
+        return results
+
+    def related_artists(
+        self, artist_id: int, limit: Optional[int] = RELATED_ARTISTS_LIMIT
+    ) -> List[ArtistShort]:
+        """Get related artists."""
+        return list(
+            to_artists(
+                cast(
+                    DeezerArtistRelatedResponse,
+                    self._api(
+                        DeezerArtistRelatedResponse,
+                        self.api.get_artist_related,
+                        artist_id,
+                        limit=limit,
                     ),
                 )
             )
+        )
 
-        if (self.always_fetch_release_date or fetch_release_date) and not artist:
-            results = self._collection_details(results)
+    def crawl_related_artists(
+        self, seeds: List[ArtistShort], depth: int = 1, fanout: int = 5
+    ) -> List[ArtistShort]:
+        """Crawl the related artists graph breadth-first from seed artists.
 
-        return results
+        Related artists of each level are fetched concurrently using the client
+        worker pool. For every crawled artist, only its `fanout` first related
+        artists that have not been visited yet are kept, and the crawl stops after
+        `depth` levels. Artists are returned in the crawl order (seeds first).
+        """
+        limit = max(fanout, RELATED_ARTISTS_LIMIT)
+
+        def related(artist: ArtistShort) -> List[ArtistShort]:
+            try:
+                return self.related_artists(artist.id, limit=limit)
+            except (DeezerError, requests.RequestException) as err:
+                logger.warning(f"Cannot get artists related to '{artist.name}': {err}")
+                return []
+
+        visited = {artist.id for artist in seeds}
+        artists = list(seeds)
+        frontier = list(seeds)
+        for level in range(depth):
+            logger.debug(f"Crawling {len(frontier)} artist(s) at {level=}")
+            next_frontier: List[ArtistShort] = []
+            for candidates in self.map_concurrently(related, frontier):
+                new = [artist for artist in candidates if artist.id not in visited]
+                for artist in new[:fanout]:
+                    visited.add(artist.id)
+                    next_frontier.append(artist)
+            artists += next_frontier
+            frontier = next_frontier
+            if not frontier:
+                break
+        return artists
+
+    def mix(
+        self,
+        artists: List[str],
+        radio: bool = False,
+        limit: Optional[int] = 10,
+        depth: int = 0,
+        fanout: int = 5,
+    ) -> Tuple[List[TrackShort], Dict[str, Exception]]:
+        """Get tracks of multiple artists given their names.
+
+        Artists are searched and fetched concurrently using a dedicated bounded pool
+        (fetching artists details may require the client worker pool). For deep
+        mixes (`depth > 0`), tracks of artists related to searched artists are also
+        mixed (see the `crawl_related_artists` method).
+
+        Tracks are returned in the artists order (deep mixes crawl each artist once
+        and skip duplicated tracks) along with errors of artists that could not be
+        found or fetched (instead of failing the whole mix).
+        """
+        errors: Dict[str, Exception] = {}
+
+        def search(name: str) -> ArtistShort:
+            # We expect the search engine to be relevant 🤞
+            result = self.search(artist=name, strict=True, limit=1)
+            if not result:
+                raise LookupError("No match found")
+            return cast(ArtistShort, result[0])
+
+        def artist_tracks(artist: ArtistShort) -> List[TrackShort]:
+            return cast(
+                List[TrackShort],
+                self.artist(artist.id, radio=radio, top=True, limit=limit),
+            )
+
+        def gather(futures: List[Tuple[str, Future[R]]]) -> Generator[R, None, None]:
+            for name, future in futures:
+                try:
+                    yield future.result()
+                except Exception as err:
+                    logger.debug(f"Cannot mix artist '{name}': {err}")
+                    errors[name] = err
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="onzr-mix"
+        ) as executor:
+            found = gather([(name, executor.submit(search, name)) for name in artists])
+            if depth:
+                seeds = list({artist.id: artist for artist in found}.values())
+                mixed = self.crawl_related_artists(seeds, depth, fanout)
+            else:
+                mixed = list(found)
+            results = gather(
+                [(a.name, executor.submit(artist_tracks, a)) for a in mixed]
+            )
+            tracks = [track for batch in results for track in batch]
+        if depth:
+            tracks = list({track.id: track for track in tracks}.values())
+        return tracks, errors
 
 
 class TrackStatus(IntEnum):
@@ -398,29 +848,20 @@ def get_album_cover_filename(size: AlbumCoverSize) -> str:
             return "1000x1000-000000-80-0-0.jpg"
 
 
-class Track:
-    """A Deezer track."""
+class BaseTrack:
+    """A Deezer track: track info and stream decryption.
 
-    def __init__(
-        self,
-        client: DeezerClient,
-        track_id: int,
-        background: bool = False,
-    ) -> None:
+    This base class does not perform any I/O, see the AsyncTrack implementation.
+    """
+
+    def __init__(self, track_id: int, blowfish: str) -> None:
         """Instantiate a new track."""
-        self.deezer = client
         self.track_id = track_id
-        self.session = requests.Session()
+        self.blowfish = blowfish
 
         self.track_info: Optional[TrackInfo] = None
         self.key: Optional[bytes] = None
-
-        # Fetch track info in a separated thread to make instantiation non-blocking
-        if background:
-            thread = Thread(target=self._set_track_info)
-            thread.start()
-        else:
-            self._set_track_info()
+        self.decryptor: Optional[StripeDecryptor] = None
 
         self.status: TrackStatus = TrackStatus.IDLE
         self.streamed: int = 0
@@ -429,31 +870,20 @@ class Track:
         """Get track str representation."""
         return f"ID: {self.track_id}"
 
-    def _set_track_info(self):
-        """Get track info."""
-        self.track_info = DeezerSong(
-            **self.deezer.gw.get_track(self.track_id)
-        ).to_track_info()
+    def _update_track_info(self, song: DeezerSong):
+        """Update track info from a gateway song."""
+        self.track_info = song.to_track_info()
         logger.debug("Track info: %s", pformat(self.track_info, sort_dicts=True))
 
         self.track_id = self.track_info.id
         self.key = self._generate_blowfish_key()
+        self.decryptor = StripeDecryptor(self.key)
         if not len(self.track_info.formats):
             raise DeezerTrackException(
                 f"No available formats detected for track {self.track_id}"
             )
         logger.debug(f"{self.track_info}")
 
-    def refresh(self):
-        """Refresh track info."""
-        logger.debug("Refreshing track info…")
-        self._set_track_info()
-
-    def _get_url(self, quality: StreamQuality) -> HttpUrl:
-        """Get URL of the track to stream."""
-        logger.debug(f"Getting track url with quality {quality}…")
-        return HttpUrl(self.deezer.get_track_url(self.token, quality.value))
-
     def _generate_blowfish_key(self) -> bytes:
         """Generate the blowfish key for Deezer streams.
 
@@ -466,18 +896,31 @@ class Track:
             for t in zip(
                 md5_hash[:16],
                 md5_hash[16:],
-                self.deezer.blowfish,
+                self.blowfish,
                 strict=False,
             )
         ).encode()
 
-    def _decrypt(self, chunk):
-        """Decrypt blowfish encrypted chunk."""
-        return Blowfish.new(  # noqa: S304
-            self.key,
-            Blowfish.MODE_CBC,
-            b"\x00\x01\x02\x03\x04\x05\x06\x07",
-        ).decrypt(chunk)
+    def _decrypt_buffer(self, buffer: memoryview) -> None:
+        """Decrypt a stream buffer in place.
+
+        Streams are made of chunks of CHUNK_SIZE bytes, only the first STRIPE_SIZE
+        bytes of a chunk are encrypted. Buffers start at a chunk boundary and may
+        span several chunks.
+        """
+        if self.decryptor is None:
+            raise DeezerTrackException(f"Track {self.track_id} key is unknown")
+        self.decryptor.decrypt_into(buffer)
+
+    @staticmethod
+    def _stream_range(offset: int) -> Tuple[int, Dict[str, str]]:
+        """Get the stream resume position and request headers given an offset.
+
+        Streams are resumed from the start of the chunk containing the offset so
+        that encrypted stripes stay aligned.
+        """
+        start = offset - offset % CHUNK_SIZE
+        return start, {"Range": f"bytes={start}-"} if start else {}
 
     def _get_track_info_attribute(self, field: str) -> Any:
         """Get self.track_info attribute if defined."""
@@ -572,11 +1015,8 @@ class Track:
         """Get track full title (artist/title/album)."""
         return f"{self.artist} - {self.title} [{self.album}]"
 
-    def stream(self, quality: StreamQuality = StreamQuality.MP3_128) -> Iterator[bytes]:
-        """Fetch track in-memory.
-
-        quality (StreamQuality): audio file to stream quality
-        """
+    def _stream_quality(self, quality: StreamQuality) -> StreamQuality:
+        """Get the quality to stream given the queried one."""
         if (best := self.query_quality(quality)) != quality:
             logger.warning(
                 (
@@ -586,36 +1026,7 @@ class Track:
                 quality,
                 best,
             )
-            quality = best
-
-        logger.debug(
-            "Start streaming track: "
-            f"▶️ {self.full_title} (ID: {self.track_id} Q: {quality})"
-        )
-
-        chunk_sep = 2048
-        chunk_size = 3 * chunk_sep
-        self.streamed = 0
-        self.status = TrackStatus.IDLE
-
-        url = self._get_url(quality)
-        with self.session.get(str(url), stream=True) as r:
-            r.raise_for_status()
-            filesize = int(r.headers.get("Content-Length", 0))
-            logger.debug(f"Track size: {filesize}")
-            self.status = TrackStatus.STREAMING
-
-            for chunk in r.iter_content(chunk_size):
-                if len(chunk) > chunk_sep:
-                    dchunk = self._decrypt(chunk[:chunk_sep]) + chunk[chunk_sep:]
-                else:
-                    dchunk = chunk
-                self.streamed += chunk_size
-                yield dchunk
-
-        # We are done here
-        self.status = TrackStatus.STREAMED
-        logger.debug(f"Track fully streamed {self.streamed}")
+        return best
 
     # Pydantic will raise an error for us
     def serialize(self) -> TrackShort:
@@ -7,3 +7,11 @@ class OnzrConfigurationError(Exception):
 
 class DeezerTrackException(Exception):
     """Raised when onzr cannot handle a Deezer track."""
+
+
+class DeezerLoginException(Exception):
+    """Raised when onzr cannot log in to Deezer."""
+
+
+class DeezerUnavailableException(Exception):
+    """Raised when a Deezer service is considered unavailable (open circuit)."""
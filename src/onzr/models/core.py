@@ -2,7 +2,7 @@
 
 from datetime import date
 from enum import StrEnum
-from typing import Annotated, List, Optional, TypeAlias
+from typing import Annotated, Dict, List, Optional, TypeAlias
 
 from pydantic import BaseModel, Field, PositiveInt
 from pydantic_extra_types.color import Color
@@ -35,6 +35,32 @@ class ServerState(BaseModel):
     queue: QueueState
 
 
+class HedgingStats(BaseModel):
+    """Hedged calls counters."""
+
+    calls: int = 0
+    hedged: int = 0
+    won: int = 0
+
+
+class TrafficStats(BaseModel):
+    """Traffic class concurrency counters."""
+
+    limit: int
+    calls: int = 0
+    active: int = 0
+    waiting: int = 0
+    max_waiting: int = 0
+
+
+class ServerStats(BaseModel):
+    """Onzr server outbound traffic stats."""
+
+    traffic: Dict[str, TrafficStats] = {}
+    hedging: Dict[str, HedgingStats] = {}
+    circuits: Dict[str, str] = {}
+
+
 class StreamQuality(StrEnum):
     """Track stream quality."""
 
@@ -91,6 +117,8 @@ class TrackShort(BaseModel):
     album: str
     artist: str
     release_date: Optional[date] = None
+    # Only used internally to fetch the release date of albums (once per album)
+    album_id: Optional[int] = Field(default=None, exclude=True)
 
 
 class PlaylistShort(BaseModel):
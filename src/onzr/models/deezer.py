@@ -1,11 +1,21 @@
 """Onzr: deezer models."""
 
+import functools
 import logging
 from datetime import date
-from typing import Annotated, Generator, Generic, List, Optional, TypeAlias, TypeVar
+from typing import (
+    Annotated,
+    Any,
+    Generator,
+    Generic,
+    List,
+    Optional,
+    TypeAlias,
+    TypeVar,
+)
 
 from annotated_types import Ge, Gt
-from pydantic import BaseModel, PlainSerializer, PositiveInt
+from pydantic import BaseModel, PlainSerializer, PositiveInt, TypeAdapter
 
 from .core import (
     AlbumShort,
@@ -32,9 +42,15 @@ class BaseDeezerAPIResponse(BaseModel):
 
 
 class DeezerAPIResponseCollection(BaseModel, Generic[DeezerT]):
-    """An intermediate model for collections in data fields."""
+    """An intermediate model for collections in data fields.
+
+    Paginated collections come with the total number of items and a link to the
+    next page (if any).
+    """
 
     data: List[DeezerT]
+    total: Optional[int] = None
+    next: Optional[str] = None
 
 
 class DeezerArtist(BaseDeezerModel):
@@ -83,6 +99,7 @@ class DeezerTrack(BaseDeezerModel):
             album=self.album.title,
             artist=self.artist.name,
             release_date=self.release_date,
+            album_id=self.album.id,
         )
 
 
@@ -148,12 +165,15 @@ class DeezerAlbumResponse(BaseDeezerAPIResponse):
                 album=track.album.title,
                 artist=track.artist.name,
                 release_date=self.release_date,
+                album_id=self.id,
             )
 
 
 DeezerArtistTopResponse = DeezerAPIResponseCollection[DeezerTrack]
 DeezerArtistRadioResponse = DeezerAPIResponseCollection[DeezerTrack]
 DeezerArtistAlbumsResponse = DeezerAPIResponseCollection[DeezerAlbum]
+DeezerArtistRelatedResponse = DeezerAPIResponseCollection[DeezerArtist]
+DeezerPlaylistTracksResponse = DeezerAPIResponseCollection[DeezerTrack]
 DeezerArtistResponse: TypeAlias = (
     DeezerArtistTopResponse | DeezerArtistRadioResponse | DeezerArtistAlbumsResponse
 )
@@ -172,11 +192,18 @@ DeezerSearchResponse: TypeAlias = (
 
 
 # Helpers
+@functools.cache
+def type_adapter(model: Any) -> TypeAdapter:
+    """Get the (cached) type adapter used to validate raw JSON responses."""
+    return TypeAdapter(model)
+
+
 def to_tracks(
     collection: (
         DeezerArtistTopResponse
         | DeezerArtistRadioResponse
         | DeezerAdvancedSearchResponse
+        | DeezerPlaylistTracksResponse
         | DeezerSearchTrackResponse
     ),
 ) -> Generator[TrackShort, None, None]:
@@ -202,7 +229,7 @@ def to_albums(
 
 
 def to_artists(
-    collection: DeezerSearchArtistResponse,
+    collection: DeezerArtistRelatedResponse | DeezerSearchArtistResponse,
 ) -> Generator[ArtistShort, None, None]:
     """Get artists collection iterator."""
     for artist in collection.data:
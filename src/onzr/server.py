@@ -1,15 +1,18 @@
 """Onzr: http server."""
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, List
 
-from fastapi import Depends, FastAPI, HTTPException, Path, status
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Path, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
+from .aio import AsyncTrack
 from .config import get_settings
 from .core import Onzr
-from .deezer import Track
+from .exceptions import DeezerTrackException, DeezerUnavailableException
 from .models.core import (
     PlayerControl,
     PlayerState,
@@ -18,14 +21,14 @@ from .models.core import (
     QueuedTracks,
     ServerMessage,
     ServerState,
+    ServerStats,
 )
+from .traffic import Priority, prioritized
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-app = FastAPI(title="Onzr", root_path=settings.API_ROOT_URL, debug=settings.DEBUG)
-
 
 @lru_cache
 def get_onzr() -> Onzr:
@@ -33,6 +36,35 @@ def get_onzr() -> Onzr:
     return Onzr()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Close the Deezer client when the server shuts down."""
+    yield
+    if get_onzr.cache_info().currsize:
+        onzr = get_onzr()
+        if onzr.prefetcher is not None:
+            onzr.prefetcher.cancel()
+        await onzr.deezer.aclose()
+
+
+app = FastAPI(
+    title="Onzr",
+    root_path=settings.API_ROOT_URL,
+    debug=settings.DEBUG,
+    lifespan=lifespan,
+)
+
+
+@app.exception_handler(DeezerUnavailableException)
+async def deezer_unavailable_handler(
+    request: Request, exc: DeezerUnavailableException
+) -> JSONResponse:
+    """Respond with a service unavailable error when Deezer is unavailable."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": str(exc)}
+    )
+
+
 # --- Routes
 
 
@@ -41,9 +73,34 @@ async def queue_add(
     onzr: Annotated[Onzr, Depends(get_onzr)],
     track_ids: List[int],
 ) -> ServerMessage:
-    """Add tracks to queue given their identifiers."""
-    tracks = [Track(onzr.deezer, id_, background=True) for id_ in track_ids]
+    """Add tracks to queue given their identifiers.
+
+    Track info is fetched by batches from the gateway. Tracks that are missing from
+    batch results are fetched individually. Those calls have a lower priority than
+    the playing track stream ones.
+    """
+    with prioritized(Priority.QUEUE):
+        songs = await onzr.deezer.songs(track_ids)
+        tracks = []
+        for id_ in track_ids:
+            try:
+                tracks.append(AsyncTrack(onzr.deezer, id_, song=songs.get(id_)))
+            except DeezerTrackException as err:
+                logger.warning(f"Ignoring track {id_}: {err}")
+
+        missing = [track for track in tracks if track.track_info is None]
+        for track, result in zip(
+            missing,
+            await asyncio.gather(
+                *(t.refresh() for t in missing), return_exceptions=True
+            ),
+            strict=True,
+        ):
+            if isinstance(result, Exception):
+                logger.warning(f"Cannot fetch track {track} info: {result}")
+
     onzr.queue.add(tracks=tracks)
+    onzr.prefetch()
     return ServerMessage(message=f"Added {len(tracks)} track(s) to queue")
 
 
@@ -54,6 +111,7 @@ async def queue_clear(
     """Clear tracks queue."""
     onzr.player.stop()
     onzr.queue.clear()
+    onzr.prefetch()
     return onzr.state()
 
 
@@ -81,10 +139,29 @@ async def stream_track(
         )
     onzr.queue.playing = rank
     track = onzr.queue[rank]
-    # Refresh track token in case it expired
-    track.refresh()
+    cache = onzr.audio_cache
+    if cache is None:
+        # Refresh track token in case it expired
+        with prioritized(Priority.STREAM):
+            await track.refresh()
+        quality = track.query_quality(settings.QUALITY)
+        return StreamingResponse(track.stream(quality), media_type=quality.media_type)
+
+    # Prefetch tracks following the playing one: the playing track prefetch (if
+    # pending) is cancelled as it is now streamed
+    onzr.prefetch()
+
+    # Cached tracks are served locally: their token does not need to be refreshed
+    if (
+        track.track_info is None
+        or cache.get(track.track_id, track.query_quality(settings.QUALITY)) is None
+    ):
+        with prioritized(Priority.STREAM):
+            await track.refresh()
     quality = track.query_quality(settings.QUALITY)
-    return StreamingResponse(track.stream(quality), media_type=quality.media_type)
+    return StreamingResponse(
+        track.cached_stream(cache, quality), media_type=quality.media_type
+    )
 
 
 @app.get("/now")
@@ -166,6 +243,14 @@ async def state(
     return onzr.state()
 
 
+@app.get("/stats")
+async def stats(
+    onzr: Annotated[Onzr, Depends(get_onzr)],
+) -> ServerStats:
+    """Server outbound traffic stats."""
+    return onzr.stats()
+
+
 @app.get("/ping")
 async def ping() -> None:
     """Server ping."""
@@ -0,0 +1,458 @@
+"""Onzr: upstream traffic control."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import random
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum, StrEnum
+from threading import Lock
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .exceptions import DeezerUnavailableException
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Get the bounded exponential backoff delay (in seconds) of a retry attempt."""
+    return min(cap, base * 2 ** (attempt - 1))
+
+
+class SingleFlight:
+    """De-duplicate concurrent identical calls (threads).
+
+    The first caller for a key performs the call while concurrent callers for the
+    same key wait for its outcome: they all get the same result (or exception).
+    Once the call is done, the key is forgotten so that later calls hit upstream
+    again.
+    """
+
+    def __init__(self) -> None:
+        """Instantiate an empty in-flight calls registry."""
+        self._lock = Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[..., R], *args, **kwargs) -> R:
+        """Call func or wait for the in-flight call with the same key."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            logger.debug(f"Waiting for in-flight call {key=}")
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        """Get the number of in-flight calls."""
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """De-duplicate concurrent identical calls (asyncio).
+
+    This is the asyncio counterpart of the SingleFlight class: concurrent callers
+    await the same task. Cancelling a caller does not cancel the shared task.
+    """
+
+    def __init__(self) -> None:
+        """Instantiate an empty in-flight calls registry."""
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Awaitable[R]], *args, **kwargs
+    ) -> R:
+        """Await func or the in-flight call with the same key."""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.debug(f"Waiting for in-flight call {key=}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        """Remove a done call from the registry."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        """Get the number of in-flight calls."""
+        return len(self._calls)
+
+
+class RateLimiter:
+    """An adaptive token bucket rate limiter (thread-safe).
+
+    Every call consumes a token, tokens are refilled at `rate` per second up to
+    `burst` tokens. When upstream reports a quota error (see the `throttled` method),
+    the rate is halved (down to `min_rate`) and all callers pause for an exponential
+    backoff with jitter. Successful calls then increase the rate back to its
+    configured maximum.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        min_rate: float = 0.5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        """Instantiate a full bucket."""
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(1, math.ceil(rate))
+        self.min_rate = min(min_rate, rate)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._lock = Lock()
+        self._tokens: float = self.burst
+        self._updated = time.monotonic()
+        self._failures = 0
+
+    def _reserve(self) -> float:
+        """Consume a token and get the delay (in seconds) before it is available."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            # Refill is postponed while paused
+            self._updated = max(now, self._updated)
+            self._tokens -= 1
+            return (self._updated - now) + max(0.0, -self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Wait for a token."""
+        if (delay := self._reserve()) > 0:
+            logger.debug(f"Rate limited, waiting {delay:.3f}s")
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        """Wait for a token (asyncio)."""
+        if (delay := self._reserve()) > 0:
+            logger.debug(f"Rate limited, waiting {delay:.3f}s")
+            await asyncio.sleep(delay)
+
+    def throttled(self) -> float:
+        """Slow down after a quota error and get the pause duration (in seconds)."""
+        with self._lock:
+            self._failures += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = backoff_delay(self._failures, self.backoff, self.max_backoff)
+            pause *= random.uniform(0.5, 1.0)  # noqa: S311
+            # Only one call is allowed right after the pause
+            self._tokens = min(1.0, self._tokens)
+            self._updated = max(self._updated, time.monotonic() + pause)
+        logger.warning(
+            f"Deezer quota exceeded, pausing for {pause:.1f}s "
+            f"(rate: {self.rate:.2f} requests/s)"
+        )
+        return pause
+
+    def succeeded(self) -> None:
+        """Speed up (additively) after a successful call."""
+        if self.rate == self.max_rate and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class Hedger:
+    """Hedge slow calls (asyncio).
+
+    When a call has not answered after the `percentile` of recent latencies of calls
+    with the same key, a duplicate call is sent and the first successful answer wins
+    (the other call is cancelled). To bound the extra load, no more than `max_ratio`
+    of all calls are hedged. Calls are not hedged until `min_samples` latencies
+    have been measured for their key.
+
+    Per-key `calls`, `hedged` and `won` (the duplicate answered first) counters are
+    available in the `counters` attribute.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        max_ratio: float = 0.1,
+        window: int = 100,
+        min_samples: int = 10,
+    ) -> None:
+        """Instantiate a hedger without latency measures."""
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.counters: Dict[str, Counter] = defaultdict(Counter)
+        self._latencies: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+
+    def delay(self, key: str) -> Optional[float]:
+        """Get the delay (in seconds) after which a call should be hedged."""
+        latencies = sorted(self._latencies[key])
+        if len(latencies) < self.min_samples:
+            return None
+        rank = math.ceil(len(latencies) * self.percentile / 100) - 1
+        return latencies[min(max(rank, 0), len(latencies) - 1)]
+
+    def _allowed(self) -> bool:
+        """Check if the extra load budget allows hedging another call."""
+        calls = sum(counter["calls"] for counter in self.counters.values())
+        hedged = sum(counter["hedged"] for counter in self.counters.values())
+        return hedged < self.max_ratio * calls
+
+    async def do(
+        self, key: str, func: Callable[..., Awaitable[R]], *args, **kwargs
+    ) -> R:
+        """Await func, sending a duplicate call if it is too slow."""
+        counter = self.counters[key]
+        counter["calls"] += 1
+        start = time.monotonic()
+        tasks: List[asyncio.Future[R]] = [asyncio.ensure_future(func(*args, **kwargs))]
+        try:
+            delay = self.delay(key)
+            if delay is not None and self._allowed():
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    logger.debug(f"Hedging {key} call after {delay:.3f}s")
+                    counter["hedged"] += 1
+                    tasks.append(asyncio.ensure_future(func(*args, **kwargs)))
+
+            # The first successful call wins, otherwise the first call error is raised
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    if task is not tasks[0]:
+                        counter["won"] += 1
+                    self._latencies[key].append(time.monotonic() - start)
+                    return task.result()
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+class CircuitState(StrEnum):
+    """Circuit breaker states."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """A circuit breaker for a family of upstream endpoints (thread-safe).
+
+    The circuit opens after `failure_threshold` consecutive failures: calls then
+    fail fast (raising a DeezerUnavailableException) for `reset_timeout` seconds.
+    The circuit is then half-open: a single trial call is allowed, closing the
+    circuit if it succeeds or opening it again if it fails.
+
+    Callers should `acquire` the breaker before each call and report its outcome
+    using the `succeeded`, `failed` or `release` (neither) methods.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        """Instantiate a closed circuit breaker."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+
+        self._lock = Lock()
+        self._failures = 0
+        self._opened = 0.0
+        self._trial = False
+
+    def _set_state(self, state: CircuitState) -> None:
+        """Change the circuit state."""
+        if state == self.state:
+            return
+        log = logger.warning if state == CircuitState.OPEN else logger.info
+        log(f"Deezer {self.name} circuit is now {state} (was {self.state})")
+        self.state = state
+
+    def acquire(self) -> None:
+        """Check if a call is allowed (or raise a DeezerUnavailableException)."""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                remaining = self._opened + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise DeezerUnavailableException(
+                        f"Deezer {self.name} is unavailable, "
+                        f"will retry in {remaining:.0f}s"
+                    )
+                self._set_state(CircuitState.HALF_OPEN)
+            if self.state == CircuitState.HALF_OPEN:
+                if self._trial:
+                    raise DeezerUnavailableException(
+                        f"Deezer {self.name} is unavailable, checking its recovery"
+                    )
+                self._trial = True
+
+    def succeeded(self) -> None:
+        """Report a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._trial = False
+            self._set_state(CircuitState.CLOSED)
+
+    def failed(self) -> None:
+        """Report a failed call."""
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if (
+                self.state == CircuitState.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._opened = time.monotonic()
+                self._set_state(CircuitState.OPEN)
+
+    def release(self) -> None:
+        """Report a call that neither succeeded nor failed (e.g. cancelled)."""
+        with self._lock:
+            self._trial = False
+
+
+class Priority(IntEnum):
+    """Outbound calls priority (lower values first)."""
+
+    STREAM = 0
+    PREFETCH = 1
+    QUEUE = 2
+
+
+# Priority of the outbound calls performed in the current context
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority", default=Priority.QUEUE
+)
+
+
+@contextmanager
+def prioritized(priority: Priority) -> Iterator[None]:
+    """Set the priority of outbound calls performed in this context."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class ConcurrencyGovernor:
+    """Limit concurrent outbound calls per traffic class (asyncio).
+
+    Each traffic class (_e.g._ metadata, gateway or CDN traffic) has its own limit
+    of concurrent calls so that a burst of calls of one class cannot starve other
+    classes. Classes without a (positive) limit are not limited.
+
+    When a slot is freed, it is handed over to the waiting call with the highest
+    priority (see `current_priority`), first come first served for calls with the
+    same priority.
+
+    Per-class `calls`, `active`, `waiting` (the queue depth) and `max_waiting`
+    counters are available in the `counters` attribute.
+    """
+
+    def __init__(self, limits: Dict[str, int]) -> None:
+        """Instantiate the governor given per-class limits."""
+        self.limits = {name: limit for name, limit in limits.items() if limit > 0}
+        self.counters: Dict[str, Counter] = {name: Counter() for name in self.limits}
+        self._waiters: Dict[str, List[Tuple[int, int, asyncio.Future]]] = {
+            name: [] for name in self.limits
+        }
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def slot(
+        self, traffic: str, priority: Optional[Priority] = None
+    ) -> AsyncIterator[None]:
+        """Wait for a slot of the traffic class and hold it.
+
+        If not given, the priority is the one of the current context.
+        """
+        limit = self.limits.get(traffic)
+        if limit is None:
+            yield
+            return
+
+        counter = self.counters[traffic]
+        if counter["active"] < limit:
+            counter["active"] += 1
+        else:
+            if priority is None:
+                priority = current_priority.get()
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiters[traffic], (priority, next(self._sequence), waiter)
+            )
+            counter["waiting"] += 1
+            counter["max_waiting"] = max(counter["max_waiting"], counter["waiting"])
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # The slot may have been handed over before cancellation
+                if waiter.done() and not waiter.cancelled():
+                    self._release(traffic)
+                raise
+            finally:
+                counter["waiting"] -= 1
+
+        counter["calls"] += 1
+        try:
+            yield
+        finally:
+            self._release(traffic)
+
+    def _release(self, traffic: str) -> None:
+        """Hand the slot over to the next waiting call or free it."""
+        waiters = self._waiters[traffic]
+        while waiters:
+            *_, waiter = heapq.heappop(waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.counters[traffic]["active"] -= 1
@@ -6,10 +6,11 @@ import logging
 import tempfile
 import threading
 from pathlib import Path
-from typing import Generator
+from typing import AsyncGenerator
 
 import pytest
 import requests
+import respx
 import uvicorn
 import yaml
 from fastapi.testclient import TestClient
@@ -17,19 +18,46 @@ from requests.exceptions import ConnectionError
 from typer.testing import CliRunner
 
 import onzr
-from onzr import cli, config
+from onzr import cli, config, core
+from onzr.aio import GW_URL, AsyncTrack
 from onzr.core import Onzr
-from onzr.deezer import DeezerClient, Track
+from onzr.deezer import DeezerClient
 from tests.factories import DeezerSongFactory, DeezerSongResponseFactory
 
 logger = logging.getLogger(__name__)
 
+DEEZER_USER_DATA = {
+    "error": {},
+    "results": {
+        "checkForm": "secret_token",
+        "USER": {
+            "USER_ID": 666,
+            "MULTI_ACCOUNT": {"ENABLED": False},
+            "BLOG_NAME": "onzr",
+            "OPTIONS": {
+                "license_token": "fake",
+                "web_hq": True,
+                "web_lossless": True,
+                "license_country": "FR",
+            },
+            "SETTING": {"global": {}},
+        },
+    },
+}
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run async tests using asyncio."""
+    return "asyncio"
+
 
 @pytest.fixture
 def onzr_dir(monkeypatch):
     """Create test application directory."""
     with tempfile.TemporaryDirectory() as app_dir:
         monkeypatch.setattr(config, "get_onzr_dir", lambda: Path(app_dir))
+        monkeypatch.setattr(core, "get_onzr_dir", lambda: Path(app_dir))
         importlib.reload(cli)
         yield app_dir
 
@@ -60,6 +88,12 @@ def settings(app_configuration):
     return config.get_settings()
 
 
+@pytest.fixture
+def audio_cache_settings(monkeypatch, settings):
+    """Enable the decrypted audio cache."""
+    monkeypatch.setattr(settings, "AUDIO_CACHE", True)
+
+
 @pytest.fixture
 def cli_runner():
     """CLI runner."""
@@ -77,26 +111,7 @@ def deezer_client(responses, settings):
     """Configured DeezerClient instance."""
     responses.post(
         "http://www.deezer.com/ajax/gw-light.php",
-        body=json.dumps(
-            {
-                "error": {},
-                "results": {
-                    "checkForm": "secret_token",
-                    "USER": {
-                        "USER_ID": 666,
-                        "MULTI_ACCOUNT": {"ENABLED": False},
-                        "BLOG_NAME": "onzr",
-                        "OPTIONS": {
-                            "license_token": "fake",
-                            "web_hq": True,
-                            "web_lossless": True,
-                            "license_country": "FR",
-                        },
-                        "SETTING": {"global": {}},
-                    },
-                },
-            }
-        ),
+        body=json.dumps(DEEZER_USER_DATA),
         status=200,
         content_type="application/json",
     )
@@ -110,33 +125,18 @@ def deezer_client(responses, settings):
 
 
 @pytest.fixture
-def configured_onzr(responses, app_configuration):
-    """Onzr core instance with an initialized Deezer client."""
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        body=json.dumps(
-            {
-                "error": {},
-                "results": {
-                    "checkForm": "secret_token",
-                    "USER": {
-                        "USER_ID": 666,
-                        "MULTI_ACCOUNT": {"ENABLED": False},
-                        "BLOG_NAME": "onzr",
-                        "OPTIONS": {
-                            "license_token": "fake",
-                            "web_hq": True,
-                            "web_lossless": True,
-                            "license_country": "FR",
-                        },
-                        "SETTING": {"global": {}},
-                    },
-                },
-            }
-        ),
-        status=200,
-        content_type="application/json",
-    )
+def deezer_gw():
+    """Mocked Deezer HTTP APIs for the asyncio client (logged in by default)."""
+    with respx.mock(assert_all_called=False) as router:
+        router.post(GW_URL, params={"method": "deezer.getUserData"}).respond(
+            json=DEEZER_USER_DATA
+        )
+        yield router
+
+
+@pytest.fixture
+def configured_onzr(deezer_gw, app_configuration):
+    """Onzr core instance with a mocked Deezer client."""
     instance = Onzr()
 
     yield instance
@@ -203,10 +203,10 @@ def test_server(responses, settings, configured_onzr):
 
 
 @pytest.fixture
-def track(responses, configured_onzr, faker, monkeypatch):
+def track(deezer_gw, configured_onzr, faker, monkeypatch):
     """Track factory fixture."""
 
-    def stream_local_file(_) -> Generator[bytes, None, None]:
+    async def stream_local_file(*_) -> AsyncGenerator[bytes, None]:
         """Stream the same file for every track."""
         chunk_size: int = 2048 * 3
         with Path("./tests/intro-lvs.mp3").open("rb") as content:
@@ -215,15 +215,16 @@ def track(responses, configured_onzr, faker, monkeypatch):
 
     def _track(track_id: int | None = None, **kwargs):
         track_id = faker.pyint() if track_id is None else track_id
-        responses.post(
-            "http://www.deezer.com/ajax/gw-light.php",
-            status=200,
-            json=DeezerSongResponseFactory.build(
-                error={}, results=DeezerSongFactory.build(SNG_ID=track_id, **kwargs)
-            ).model_dump(),
+        song = DeezerSongFactory.build(SNG_ID=track_id, **kwargs)
+        # Track info refresh
+        deezer_gw.post(
+            GW_URL, params={"method": "song.getData"}, json={"SNG_ID": track_id}
+        ).respond(
+            json=DeezerSongResponseFactory.build(error={}, results=song).model_dump()
         )
-        track = Track(configured_onzr.deezer, track_id)
-        monkeypatch.setattr(track, "stream", stream_local_file)
-        return track
+        return AsyncTrack(configured_onzr.deezer, track_id, song=song)
+
+    # Prefetched tracks copies also stream the local file
+    monkeypatch.setattr(AsyncTrack, "stream", stream_local_file)
 
     return _track
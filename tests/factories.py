@@ -11,8 +11,10 @@ from onzr.models.deezer import (
     DeezerArtist,
     DeezerArtistAlbumsResponse,
     DeezerArtistRadioResponse,
+    DeezerArtistRelatedResponse,
     DeezerArtistTopResponse,
     DeezerPlaylist,
+    DeezerPlaylistTracksResponse,
     DeezerSearchAlbumResponse,
     DeezerSearchArtistResponse,
     DeezerSearchPlaylistResponse,
@@ -23,6 +25,12 @@ from onzr.models.deezer import (
 )
 
 
+class SinglePageFactoryMixin:
+    """Build collections without a next page."""
+
+    next = None
+
+
 class DeezerSongFactory(ModelFactory[DeezerSong]):
     """DeezerSong factory."""
 
@@ -40,9 +48,20 @@ class DeezerArtistFactory(ModelFactory[DeezerArtist]):
     """DeezerArtist factory."""
 
 
+class DeezerPlaylistTracksResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerPlaylistTracksResponse]
+):
+    """DeezerPlaylistTracksResponse factory."""
+
+
 class DeezerPlaylistFactory(ModelFactory[DeezerPlaylist]):
     """DeezerPlaylist factory."""
 
+    @classmethod
+    def tracks(cls) -> DeezerPlaylistTracksResponse:
+        """Playlist tracks fit in a single page."""
+        return DeezerPlaylistTracksResponseFactory.build()
+
 
 class DeezerTrackFactory(ModelFactory[DeezerTrack]):
     """DeezerTrack factory."""
@@ -56,35 +75,57 @@ class DeezerSongResponseFactory(ModelFactory[DeezerSongResponse]):
     """DeezerSongResponse factory."""
 
 
-class DeezerArtistAlbumsResponseFactory(ModelFactory[DeezerArtistAlbumsResponse]):
+class DeezerArtistAlbumsResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerArtistAlbumsResponse]
+):
     """DeezerArtistAlbumsResponse factory."""
 
 
-class DeezerArtistRadioResponseFactory(ModelFactory[DeezerArtistRadioResponse]):
+class DeezerArtistRadioResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerArtistRadioResponse]
+):
     """DeezerArtistRadioResponse factory."""
 
 
-class DeezerArtistTopResponseFactory(ModelFactory[DeezerArtistTopResponse]):
+class DeezerArtistRelatedResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerArtistRelatedResponse]
+):
+    """DeezerArtistRelatedResponse factory."""
+
+
+class DeezerArtistTopResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerArtistTopResponse]
+):
     """DeezerArtistTopResponse factory."""
 
 
-class DeezerAdvancedSearchResponseFactory(ModelFactory[DeezerAdvancedSearchResponse]):
+class DeezerAdvancedSearchResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerAdvancedSearchResponse]
+):
     """DeezerAdvancedSearchResponse factory."""
 
 
-class DeezerSearchArtistResponseFactory(ModelFactory[DeezerSearchArtistResponse]):
+class DeezerSearchArtistResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerSearchArtistResponse]
+):
     """DeezerSearchArtistResponse factory."""
 
 
-class DeezerSearchAlbumResponseFactory(ModelFactory[DeezerSearchAlbumResponse]):
+class DeezerSearchAlbumResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerSearchAlbumResponse]
+):
     """DeezerSearchAlbumResponse factory."""
 
 
-class DeezerSearchPlaylistResponseFactory(ModelFactory[DeezerSearchPlaylistResponse]):
+class DeezerSearchPlaylistResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerSearchPlaylistResponse]
+):
     """DeezerSearchPlaylistResponse factory."""
 
 
-class DeezerSearchTrackResponseFactory(ModelFactory[DeezerSearchTrackResponse]):
+class DeezerSearchTrackResponseFactory(
+    SinglePageFactoryMixin, ModelFactory[DeezerSearchTrackResponse]
+):
     """DeezerSearchTrackResponse factory."""
 
 
@@ -0,0 +1,964 @@
+"""Onzr asyncio deezer client tests."""
+
+import asyncio
+import datetime
+import json
+import time
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from Cryptodome.Cipher import Blowfish
+from deezer.errors import APIError, DataException, GWAPIError, WrongLicense
+from pydantic import HttpUrl
+
+from onzr.aio import (
+    API_URL,
+    CDN_KEEPALIVE_EXPIRY,
+    GW_URL,
+    MEDIA_URL,
+    STREAM_MAX_RETRIES,
+    AsyncDeezerClient,
+    AsyncTrack,
+    Prefetcher,
+)
+from onzr.cache import AudioCache
+from onzr.crypto import CHUNK_SIZE, STRIPE_SIZE
+from onzr.deezer import QUOTA_MAX_RETRIES, StreamQuality, TrackStatus
+from onzr.exceptions import (
+    DeezerLoginException,
+    DeezerTrackException,
+    DeezerUnavailableException,
+)
+from onzr.models.core import TrackInfo, TrackShort
+from onzr.traffic import (
+    CircuitBreaker,
+    CircuitState,
+    ConcurrencyGovernor,
+    Hedger,
+    Priority,
+    RateLimiter,
+)
+from tests.conftest import DEEZER_USER_DATA
+from tests.factories import (
+    DeezerSongFactory,
+    DeezerSongResponseFactory,
+    DeezerTrackFactory,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def async_deezer_client(settings):
+    """Configured AsyncDeezerClient instance."""
+    client = AsyncDeezerClient(
+        arl=settings.ARL, blowfish=settings.DEEZER_BLOWFISH_SECRET
+    )
+    yield client
+    await client.aclose()
+
+
+async def test_async_deezer_client_login(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient login."""
+    assert async_deezer_client.logged_in is False
+
+    await async_deezer_client.login()
+    assert async_deezer_client.logged_in is True
+    assert async_deezer_client.api_token == "secret_token"  # noqa: S105
+    assert async_deezer_client.current_user["id"] == 666  # noqa: PLR2004
+    assert async_deezer_client.current_user["can_stream_lossless"] is True
+
+    # Login is only performed once
+    await async_deezer_client.login()
+    assert deezer_gw.calls.call_count == 1
+
+
+async def test_async_deezer_client_login_failure(respx_mock, async_deezer_client):
+    """Test the AsyncDeezerClient login with an invalid ARL."""
+    user_data = json.loads(json.dumps(DEEZER_USER_DATA))
+    user_data["results"]["USER"]["USER_ID"] = 0
+    respx_mock.post(GW_URL).respond(json=user_data)
+
+    with pytest.raises(DeezerLoginException, match="check your ARL"):
+        await async_deezer_client.login()
+    assert async_deezer_client.logged_in is False
+
+
+async def test_async_deezer_client_session(deezer_gw, settings, tmp_path, monkeypatch):
+    """Test the AsyncDeezerClient login session persistence."""
+    session_file = tmp_path / "session.json"
+
+    def get_client(arl=settings.ARL):
+        return AsyncDeezerClient(
+            arl=arl,
+            blowfish=settings.DEEZER_BLOWFISH_SECRET,
+            session_file=session_file,
+            session_ttl=10,
+        )
+
+    client = get_client()
+    await client.login()
+    assert deezer_gw.calls.call_count == 1
+    assert session_file.stat().st_mode & 0o777 == 0o600  # noqa: PLR2004
+    await client.aclose()
+
+    # The session is reused after a restart
+    client = get_client()
+    await client.login()
+    assert deezer_gw.calls.call_count == 1
+    assert client.logged_in is True
+    assert client.api_token == "secret_token"  # noqa: S105
+    assert client.current_user["id"] == 666  # noqa: PLR2004
+    assert client.http.cookies["arl"] == settings.ARL
+    await client.aclose()
+
+    # But not for another account
+    client = get_client(arl="another-arl")
+    await client.login()
+    assert deezer_gw.calls.call_count == 2  # noqa: PLR2004
+    await client.aclose()
+
+    # Nor once expired
+    now = time.time()
+    monkeypatch.setattr("onzr.aio.time.time", lambda: now + 11)
+    client = get_client()
+    await client.login()
+    assert deezer_gw.calls.call_count == 3  # noqa: PLR2004
+
+    # The persisted session is not reused when the token is no longer valid
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    route.side_effect = [
+        httpx.Response(200, json={"error": {"GATEWAY_ERROR": "invalid api token"}}),
+        httpx.Response(200, json={"error": {}, "results": {"SNG_ID": 1}}),
+    ]
+    assert await client.gw("song.getData", {"SNG_ID": 1}) == {"SNG_ID": 1}
+    assert deezer_gw.calls.call_count == 6  # noqa: PLR2004 (+ login and 2 calls)
+    await client.aclose()
+
+
+async def test_async_deezer_client_http2(settings):
+    """Test the AsyncDeezerClient with HTTP/2 enabled."""
+    pytest.importorskip("h2")
+
+    client = AsyncDeezerClient(
+        arl=settings.ARL, blowfish=settings.DEEZER_BLOWFISH_SECRET, http2=True
+    )
+    assert client.http._transport._pool._http2 is True
+    assert client.cdn._transport._pool._http2 is True
+    # HTTP/2 is negotiated through TLS
+    assert GW_URL.startswith("https://")
+    await client.aclose()
+
+
+async def test_async_deezer_client_http2_fallback(settings, monkeypatch):
+    """Test the AsyncDeezerClient HTTP/2 fallback when h2 is not installed."""
+    logger = Mock()
+    monkeypatch.setattr("onzr.aio.logger", logger)
+    monkeypatch.setattr("onzr.aio.importlib.util.find_spec", lambda name: None)
+
+    client = AsyncDeezerClient(
+        arl=settings.ARL, blowfish=settings.DEEZER_BLOWFISH_SECRET, http2=True
+    )
+    assert client.http._transport._pool._http2 is False
+    logger.warning.assert_called_once()
+    await client.aclose()
+
+
+async def test_async_deezer_client_cdn_pool(settings):
+    """Test the AsyncDeezerClient CDN connection pool."""
+    client = AsyncDeezerClient(
+        arl=settings.ARL,
+        blowfish=settings.DEEZER_BLOWFISH_SECRET,
+        cdn_pool_size=12,
+    )
+    pool = client.cdn._transport._pool
+    assert pool._max_connections == 12  # noqa: PLR2004
+    assert pool._max_keepalive_connections == 12  # noqa: PLR2004
+    assert pool._keepalive_expiry == CDN_KEEPALIVE_EXPIRY
+    # API and gateway requests use their own pool
+    assert client.http._transport._pool is not pool
+    await client.aclose()
+
+
+async def test_async_deezer_client_gw(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient gateway calls."""
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    route.side_effect = [
+        httpx.Response(200, json={"error": {"GATEWAY_ERROR": "invalid api token"}}),
+        httpx.Response(200, json={"error": {}, "results": {"SNG_ID": 1}}),
+    ]
+
+    # An invalid token triggers a new login
+    assert await async_deezer_client.gw("song.getData", {"SNG_ID": 1}) == {"SNG_ID": 1}
+    assert route.call_count == 2  # noqa: PLR2004
+    assert deezer_gw.calls.call_count == 4  # noqa: PLR2004 (2 logins + 2 calls)
+    api_token = route.calls.last.request.url.params["api_token"]
+    assert api_token == "secret_token"  # noqa: S105
+
+    route.side_effect = None
+    route.respond(json={"error": {"DATA_ERROR": "foo"}, "results": {}})
+    with pytest.raises(GWAPIError, match="DATA_ERROR"):
+        await async_deezer_client.gw("song.getData", {"SNG_ID": 1})
+
+
+async def test_async_deezer_client_api(respx_mock, async_deezer_client, monkeypatch):
+    """Test the AsyncDeezerClient public API calls."""
+    monkeypatch.setattr("onzr.aio.API_RETRY_DELAY", 0)
+    payload = DeezerTrackFactory.build(id=1)
+    route = respx_mock.get(f"{API_URL}track/1")
+    route.side_effect = [
+        httpx.Response(200, json={"error": {"code": 4, "message": "Quota limit"}}),
+        httpx.Response(200, json=json.loads(payload.model_dump_json())),
+    ]
+
+    # Busy API calls are retried
+    track = await async_deezer_client.track(1)
+    assert isinstance(track, TrackShort)
+    assert track.id == 1
+    assert route.call_count == 2  # noqa: PLR2004
+
+    respx_mock.get(f"{API_URL}track/2").respond(
+        json={"error": {"type": "DataException", "message": "no data", "code": 800}}
+    )
+    with pytest.raises(DataException):
+        await async_deezer_client.track(2)
+
+    respx_mock.get(f"{API_URL}track/3").respond(
+        json={"error": {"type": "Exception", "message": "Oops", "code": 100}}
+    )
+    with pytest.raises(APIError, match="Oops"):
+        await async_deezer_client.track(3)
+
+
+async def test_async_deezer_client_rate_limiter(respx_mock, settings, monkeypatch):
+    """Test the AsyncDeezerClient rate limited API calls."""
+    limiter = RateLimiter(rate=100)
+    throttled = []
+    monkeypatch.setattr(limiter, "throttled", lambda: throttled.append(1))
+    client = AsyncDeezerClient(
+        arl=settings.ARL, blowfish=settings.DEEZER_BLOWFISH_SECRET, limiter=limiter
+    )
+    payload = DeezerTrackFactory.build(id=1)
+    route = respx_mock.get(f"{API_URL}track/1")
+    route.side_effect = [
+        httpx.Response(429),
+        httpx.Response(200, json={"error": {"code": 4, "message": "Quota limit"}}),
+        httpx.Response(200, json=json.loads(payload.model_dump_json())),
+    ]
+
+    # Quota errors are reported to the limiter and requests are sent again
+    assert (await client.track(1)).id == 1
+    assert len(throttled) == 2  # noqa: PLR2004
+    assert route.call_count == 3  # noqa: PLR2004
+
+    # Give up when quota is still exceeded after QUOTA_MAX_RETRIES attempts
+    route.reset()
+    route.side_effect = None
+    route.respond(429)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.track(1)
+    assert route.call_count == QUOTA_MAX_RETRIES
+
+    route.reset()
+    route.respond(json={"error": {"code": 4, "message": "Quota limit"}})
+    with pytest.raises(APIError, match="Quota limit"):
+        await client.track(1)
+    assert route.call_count == QUOTA_MAX_RETRIES
+    await client.aclose()
+
+
+async def test_async_deezer_client_songs(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient `songs` method."""
+    assert await async_deezer_client.songs([]) == {}
+
+    track_ids = [1, 2, 3, 4, 5]
+
+    def list_data(request):
+        ids = json.loads(request.content)["SNG_IDS"]
+        data = [
+            DeezerSongFactory.build(SNG_ID=id_, FALLBACK=None).model_dump()
+            for id_ in ids
+            if id_ != 4  # noqa: PLR2004
+        ]
+        return httpx.Response(
+            200, json={"error": {}, "results": {"data": data, "count": len(data)}}
+        )
+
+    route = deezer_gw.post(GW_URL, params={"method": "song.getListData"})
+    route.side_effect = list_data
+
+    songs = await async_deezer_client.songs(track_ids, batch_size=2)
+    assert route.call_count == 3  # noqa: PLR2004
+    assert sorted(songs) == [1, 2, 3, 5]
+    assert all(song.SNG_ID == id_ for id_, song in songs.items())
+
+
+async def test_async_deezer_client_songs_batch_failure(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient `songs` method when a batch fails."""
+
+    def list_data(request):
+        ids = json.loads(request.content)["SNG_IDS"]
+        if 3 in ids:  # noqa: PLR2004
+            raise httpx.ConnectError("Connection refused")
+        data = [
+            DeezerSongFactory.build(SNG_ID=id_, FALLBACK=None).model_dump()
+            for id_ in ids
+        ]
+        return httpx.Response(
+            200, json={"error": {}, "results": {"data": data, "count": len(data)}}
+        )
+
+    route = deezer_gw.post(GW_URL, params={"method": "song.getListData"})
+    route.side_effect = list_data
+
+    # Songs of the failed batch are missing
+    songs = await async_deezer_client.songs([1, 2, 3, 4, 5], batch_size=2)
+    assert route.call_count == 3  # noqa: PLR2004
+    assert sorted(songs) == [1, 2, 5]
+
+
+async def test_async_deezer_client_get_track_url(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient `get_track_url` method."""
+    url = "https://cdn.example.org/1.mp3"
+    route = deezer_gw.post(MEDIA_URL).respond(
+        json={"data": [{"media": [{"sources": [{"url": url}]}]}]}
+    )
+
+    assert await async_deezer_client.get_track_url(
+        "token", StreamQuality.MP3_128
+    ) == HttpUrl(url)
+    assert json.loads(route.calls.last.request.content)["track_tokens"] == ["token"]
+
+    route.respond(json={"data": [{}]})
+    with pytest.raises(DeezerTrackException, match="No media"):
+        await async_deezer_client.get_track_url("token", StreamQuality.MP3_128)
+
+    async_deezer_client.current_user["can_stream_lossless"] = False
+    with pytest.raises(WrongLicense):
+        await async_deezer_client.get_track_url("token", StreamQuality.FLAC)
+
+
+async def test_async_deezer_client_hedging(deezer_gw, async_deezer_client):
+    """Test the AsyncDeezerClient hedged calls."""
+    async_deezer_client.hedger = Hedger()
+    deezer_gw.post(GW_URL, params={"method": "song.getData"}).respond(
+        json={"error": {}, "results": DeezerSongFactory.build(SNG_ID=1).model_dump()}
+    )
+    url = "https://cdn.example.org/1.mp3"
+    deezer_gw.post(MEDIA_URL).respond(
+        json={"data": [{"media": [{"sources": [{"url": url}]}]}]}
+    )
+
+    song = await async_deezer_client.song(1)
+    assert song.SNG_ID == 1
+    assert await async_deezer_client.get_track_url(
+        "token", StreamQuality.MP3_128
+    ) == HttpUrl(url)
+    assert async_deezer_client.hedger.counters == {
+        "gateway": {"calls": 1},
+        "media": {"calls": 1},
+    }
+
+
+async def test_async_deezer_client_circuit_breakers(respx_mock, async_deezer_client):
+    """Test the AsyncDeezerClient circuit breakers."""
+    async_deezer_client.breakers = {
+        family: CircuitBreaker(family, failure_threshold=2) for family in ("api", "cdn")
+    }
+    api = respx_mock.get(f"{API_URL}track/1").mock(
+        side_effect=httpx.ConnectError("Oops")
+    )
+
+    # The API circuit opens after consecutive failures, then fails fast
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await async_deezer_client.track(1)
+    assert async_deezer_client.breakers["api"].state == CircuitState.OPEN
+    with pytest.raises(DeezerUnavailableException, match="Deezer api"):
+        await async_deezer_client.track(1)
+    assert api.call_count == 2  # noqa: PLR2004
+
+    # Server errors are failures too
+    url = "https://cdn.example.org/1.mp3"
+    cdn = respx_mock.get(url).respond(status_code=502)
+    for _ in range(2):
+        async with async_deezer_client.stream(url) as response:
+            assert response.status_code == 502  # noqa: PLR2004
+    with pytest.raises(DeezerUnavailableException, match="Deezer cdn"):
+        async with async_deezer_client.stream(url):
+            pass
+    assert cdn.call_count == 2  # noqa: PLR2004
+
+
+async def test_async_deezer_client_governor(respx_mock, async_deezer_client):
+    """Test the AsyncDeezerClient concurrency governor."""
+    async_deezer_client.governor = ConcurrencyGovernor({"metadata": 1, "cdn": 1})
+    payload = DeezerTrackFactory.build(id=1)
+    respx_mock.get(f"{API_URL}track/1").respond(
+        json=json.loads(payload.model_dump_json())
+    )
+    url = "https://cdn.example.org/1.mp3"
+    respx_mock.get(url).respond(content=b"foo")
+
+    await async_deezer_client.track(1)
+    assert async_deezer_client.governor.counters["metadata"]["calls"] == 1
+
+    # A CDN slot is held while streaming
+    async with async_deezer_client.stream(url):
+        assert async_deezer_client.governor.counters["cdn"]["active"] == 1
+    assert async_deezer_client.governor.counters["cdn"] == {"calls": 1, "active": 0}
+
+
+async def refreshed(client: AsyncDeezerClient, track_id: int) -> AsyncTrack:
+    """Get a track with its info fetched from the gateway."""
+    track = AsyncTrack(client, track_id)
+    await track.refresh()
+    return track
+
+
+async def test_async_track_refresh(deezer_gw, async_deezer_client):
+    """Test the AsyncTrack `refresh` method."""
+    track = AsyncTrack(async_deezer_client, 1)
+    assert track.track_info is None
+
+    deezer_gw.post(GW_URL, params={"method": "song.getData"}).respond(
+        json={
+            "error": {},
+            "results": DeezerSongFactory.build(SNG_ID=1, DURATION=128).model_dump(),
+        }
+    )
+    await track.refresh()
+    assert track.track_info is not None
+    assert track.duration == 128  # noqa: PLR2004
+
+
+async def test_async_track_init(deezer_gw, async_deezer_client):
+    """Test the AsyncTrack instantiation."""
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    track_id = 1
+    track_token = "fake"  # noqa: S105
+    track_duration = 120
+    track_artist = "Jimi Hendrix"
+    track_title = "All along the watchtower"
+    track_version = "(Dylan remix)"
+    track_album = "Experience"
+    track_picture = "ABCDEF"
+    track_physical_release_date = "2025-01-01"
+    track_filesize_mp3_128 = 128
+    track_filesize_mp3_320 = 320
+    track_filesize_flac = 7142
+
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                VERSION=track_version,
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE=track_physical_release_date,
+                FILESIZE_MP3_128=track_filesize_mp3_128,
+                FILESIZE_MP3_320=track_filesize_mp3_320,
+                FILESIZE_FLAC=track_filesize_flac,
+            ),
+        ).model_dump(),
+    )
+
+    track = await refreshed(async_deezer_client, track_id)
+
+    assert track.track_id == track_id
+    assert track.key == b"4den4:}:g,#j3i`a"
+    assert track.status == TrackStatus.IDLE
+    assert track.streamed == 0
+    assert track.track_info == TrackInfo(
+        id=track_id,
+        token=track_token,
+        duration=track_duration,
+        artist=track_artist,
+        title=f"{track_title} {track_version}",
+        album=track_album,
+        release_date=track_physical_release_date,
+        picture=track_picture,
+        formats=[
+            StreamQuality.MP3_128,
+            StreamQuality.MP3_320,
+            StreamQuality.FLAC,
+        ],
+    )
+    assert track.token == track_token
+    assert track.duration == track_duration
+    assert track.artist == track_artist
+    assert track.title == f"{track_title} {track_version}"
+    assert track.album == track_album
+    assert track.release_date == datetime.date(2025, 1, 1)
+    assert track.picture == track_picture
+    assert track.cover_small == HttpUrl(
+        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/56x56-000000-80-0-0.jpg"
+    )
+    assert track.cover_medium == HttpUrl(
+        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/250x250-000000-80-0-0.jpg"
+    )
+    assert track.cover_big == HttpUrl(
+        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/500x500-000000-80-0-0.jpg"
+    )
+    assert track.cover_xl == HttpUrl(
+        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/1000x1000-000000-80-0-0.jpg"
+    )
+    assert (
+        track.full_title
+        == f"{track_artist} - {track_title} {track_version} [{track_album}]"
+    )
+    assert str(track) == "ID: 1"
+
+    # If picture is None
+    track.track_info.picture = None
+    assert track.cover_small is None
+    assert track.cover_medium is None
+    assert track.cover_big is None
+    assert track.cover_xl is None
+    assert track.formats == [
+        StreamQuality.MP3_128,
+        StreamQuality.MP3_320,
+        StreamQuality.FLAC,
+    ]
+
+    # Test available formats
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE=track_physical_release_date,
+                FILESIZE_MP3_128=track_filesize_mp3_128,
+                FILESIZE_MP3_320=track_filesize_mp3_320,
+                FILESIZE_FLAC=0,
+            ),
+        ).model_dump(),
+    )
+    track = await refreshed(async_deezer_client, track_id)
+
+    assert track.formats == [
+        StreamQuality.MP3_128,
+        StreamQuality.MP3_320,
+    ]
+
+    # Test when none of configured formats are available
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                VERSION="",
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE=track_physical_release_date,
+                FILESIZE_MP3_128=0,
+                FILESIZE_MP3_320=0,
+                FILESIZE_FLAC=0,
+            ),
+        ).model_dump(),
+    )
+    with pytest.raises(
+        DeezerTrackException,
+        match=r"No available formats detected for track \d+$",
+    ):
+        await refreshed(async_deezer_client, track_id)
+
+    # Test when no version is supplied (empty string)
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                VERSION="",
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE=track_physical_release_date,
+                FILESIZE_MP3_128=track_filesize_mp3_128,
+                FILESIZE_MP3_320=track_filesize_mp3_320,
+                FILESIZE_FLAC=track_filesize_flac,
+            ),
+        ).model_dump(),
+    )
+
+    track = await refreshed(async_deezer_client, track_id)
+    assert track.title == track_title
+
+    # Test when no version is supplied (field not in payload)
+    payload = DeezerSongResponseFactory.build(
+        error={},
+        results=DeezerSongFactory.build(
+            SNG_ID=track_id,
+            TRACK_TOKEN=track_token,
+            DURATION=track_duration,
+            ART_NAME=track_artist,
+            SNG_TITLE=track_title,
+            ALB_TITLE=track_album,
+            ALB_PICTURE=track_picture,
+            PHYSICAL_RELEASE_DATE=track_physical_release_date,
+            FILESIZE_MP3_128=track_filesize_mp3_128,
+            FILESIZE_MP3_320=track_filesize_mp3_320,
+            FILESIZE_FLAC=track_filesize_flac,
+        ),
+    )
+    del payload.results.VERSION
+
+    route.respond(json=payload.model_dump())
+
+    track = await refreshed(async_deezer_client, track_id)
+    assert track.title == track_title
+
+
+async def test_async_track_fallback(deezer_gw, async_deezer_client):
+    """Test track fallback.
+
+    When a track is no longer available or restricted in some country, a fallback track
+    is proposed in the track payload. We decide then to switch the initial reference by
+    the proposed fallback.
+    """
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    track_id = 1
+    track_token = "fake"  # noqa: S105
+    track_duration = 120
+    track_artist = "Jimi Hendrix"
+    track_title = "All along the watchtower"
+    track_album = "Experience"
+    track_picture = "ABCDEF"
+    track_physical_release_date = "2025-01-01"
+    track_filesize_mp3_128 = 128
+    track_filesize_mp3_320 = 320
+    track_filesize_flac = 0
+
+    fallback_track_id = 2
+    fallback_track_filesize_flac = 440
+
+    # Test when a fallback is supplied (field in payload)
+    payload = DeezerSongResponseFactory.build(
+        error={},
+        results=DeezerSongFactory.build(
+            SNG_ID=track_id,
+            TRACK_TOKEN=track_token,
+            DURATION=track_duration,
+            ART_NAME=track_artist,
+            SNG_TITLE=track_title,
+            ALB_TITLE=track_album,
+            ALB_PICTURE=track_picture,
+            PHYSICAL_RELEASE_DATE=track_physical_release_date,
+            FILESIZE_MP3_128=track_filesize_mp3_128,
+            FILESIZE_MP3_320=track_filesize_mp3_320,
+            FILESIZE_FLAC=track_filesize_flac,
+            FALLBACK=DeezerSongFactory.build(
+                SNG_ID=fallback_track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE=track_physical_release_date,
+                FILESIZE_MP3_128=track_filesize_mp3_128,
+                FILESIZE_MP3_320=track_filesize_mp3_320,
+                FILESIZE_FLAC=fallback_track_filesize_flac,
+            ),
+        ),
+    )
+
+    route.respond(json=payload.model_dump())
+
+    track = await refreshed(async_deezer_client, track_id)
+    assert track.track_id == fallback_track_id
+    assert track.formats == [
+        StreamQuality.MP3_128,
+        StreamQuality.MP3_320,
+        StreamQuality.FLAC,
+    ]
+
+
+async def test_async_track_get_url(async_deezer_client, monkeypatch):
+    """Test the AsyncTrack `_get_url` method."""
+    url = "https://fake.example.org/foo/1"
+    instance = AsyncTrack(
+        async_deezer_client, 1, song=DeezerSongFactory.build(SNG_ID=1)
+    )
+
+    async def get_track_url(token, quality):
+        return HttpUrl(url)
+
+    monkeypatch.setattr(instance.deezer, "get_track_url", get_track_url)
+    assert await instance._get_url(quality=StreamQuality.MP3_128) == HttpUrl(url)
+
+
+async def test_async_track_query_quality(deezer_gw, async_deezer_client):
+    """Test the AsyncTrack query_quality method."""
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    track_id = 1
+    track_token = "fake"  # noqa: S105
+    track_duration = 120
+    track_artist = "Jimi Hendrix"
+    track_title = "All along the watchtower"
+    track_album = "Experience"
+    track_picture = "ABCDEF"
+    track_filesize_mp3_128 = 128
+    track_filesize_mp3_320 = 320
+
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE="2023-01-01",
+                FILESIZE_MP3_128=track_filesize_mp3_128,
+                FILESIZE_MP3_320=track_filesize_mp3_320,
+                FILESIZE_FLAC=0,
+            ),
+        ).model_dump(),
+    )
+    track = await refreshed(async_deezer_client, track_id)
+
+    assert track.query_quality(StreamQuality.MP3_128) == StreamQuality.MP3_128
+    assert track.query_quality(StreamQuality.MP3_320) == StreamQuality.MP3_320
+    assert track.query_quality(StreamQuality.FLAC) == StreamQuality.MP3_320
+
+
+async def test_async_track_serialize(deezer_gw, async_deezer_client):
+    """Test the AsyncTrack serialization."""
+    route = deezer_gw.post(GW_URL, params={"method": "song.getData"})
+    track_id = 1
+    track_token = "fake"  # noqa: S105
+    track_duration = 120
+    track_artist = "Jimi Hendrix"
+    track_title = "All along the watchtower"
+    track_album = "Experience"
+    track_picture = "ABCDEF"
+
+    route.respond(
+        json=DeezerSongResponseFactory.build(
+            error={},
+            results=DeezerSongFactory.build(
+                SNG_ID=track_id,
+                TRACK_TOKEN=track_token,
+                DURATION=track_duration,
+                ART_NAME=track_artist,
+                SNG_TITLE=track_title,
+                VERSION="",
+                ALB_TITLE=track_album,
+                ALB_PICTURE=track_picture,
+                PHYSICAL_RELEASE_DATE="2025-01-01",
+            ),
+        ).model_dump(),
+    )
+
+    track = await refreshed(async_deezer_client, track_id)
+
+    assert track.serialize() == TrackShort(
+        id=track_id,
+        title=track_title,
+        album=track_album,
+        artist=track_artist,
+        release_date=datetime.date(2025, 1, 1),
+    )
+
+
+async def test_async_track_stream(deezer_gw, async_deezer_client):
+    """Test the AsyncTrack `stream` method."""
+    track = AsyncTrack(
+        async_deezer_client, 1, song=DeezerSongFactory.build(SNG_ID=1, FALLBACK=None)
+    )
+    url = "https://cdn.example.org/1.mp3"
+    deezer_gw.post(MEDIA_URL).respond(
+        json={"data": [{"media": [{"sources": [{"url": url}]}]}]}
+    )
+
+    # Encrypt a fake track (the first stripe of each chunk)
+    content = bytes(range(256)) * 64
+    encrypted = b""
+    for i in range(0, len(content), CHUNK_SIZE):
+        chunk = content[i : i + CHUNK_SIZE]
+        if len(chunk) > STRIPE_SIZE:
+            cipher = Blowfish.new(  # noqa: S304
+                track.key, Blowfish.MODE_CBC, b"\x00\x01\x02\x03\x04\x05\x06\x07"
+            )
+            chunk = cipher.encrypt(chunk[:STRIPE_SIZE]) + chunk[STRIPE_SIZE:]
+        encrypted += chunk
+    deezer_gw.get(url).respond(content=encrypted)
+    # Read buffers span several chunks
+    async_deezer_client.stream_buffer_size = 2 * CHUNK_SIZE
+
+    streamed = b"".join(
+        [chunk async for chunk in track.stream(quality=StreamQuality.MP3_128)]
+    )
+    assert streamed == content
+    assert track.status == TrackStatus.STREAMED
+
+
+async def test_async_track_stream_resume(deezer_gw, async_deezer_client, monkeypatch):
+    """Test the AsyncTrack `stream` method when the connection drops."""
+    monkeypatch.setattr("onzr.aio.STREAM_RETRY_BACKOFF", 0)
+    track = AsyncTrack(
+        async_deezer_client, 1, song=DeezerSongFactory.build(SNG_ID=1, FALLBACK=None)
+    )
+    url = "https://cdn.example.org/1.mp3"
+    deezer_gw.post(MEDIA_URL).respond(
+        json={"data": [{"media": [{"sources": [{"url": url}]}]}]}
+    )
+    # A track that is not encrypted (smaller than a stripe) for the sake of clarity
+    monkeypatch.setattr(track, "_decrypt_buffer", lambda buffer: None)
+    async_deezer_client.stream_buffer_size = CHUNK_SIZE
+    content = bytes(range(256)) * 100
+
+    class FlakyStream(httpx.AsyncByteStream):
+        """Drop the connection after sending some content."""
+
+        def __init__(self, data: bytes):
+            self.data = data
+
+        async def __aiter__(self):
+            yield self.data[:10000]
+            raise httpx.ReadError("Connection reset by peer")
+
+    route = deezer_gw.get(url)
+    route.side_effect = [
+        httpx.Response(200, stream=FlakyStream(content)),
+        httpx.Response(206, stream=FlakyStream(content[CHUNK_SIZE:])),
+        httpx.Response(206, content=content[2 * CHUNK_SIZE :]),
+    ]
+
+    streamed = b"".join(
+        [chunk async for chunk in track.stream(quality=StreamQuality.MP3_128)]
+    )
+    assert streamed == content
+    assert track.streamed == len(content)
+    # Streams are resumed from the last received chunk
+    assert "Range" not in route.calls[0].request.headers
+    assert route.calls[1].request.headers["Range"] == f"bytes={CHUNK_SIZE}-"
+    assert route.calls[2].request.headers["Range"] == f"bytes={2 * CHUNK_SIZE}-"
+
+    # Give up after too many consecutive failures
+    route.side_effect = None
+    route.mock(side_effect=httpx.ConnectError("Connection refused"))
+    with pytest.raises(httpx.ConnectError):
+        [chunk async for chunk in track.stream(quality=StreamQuality.MP3_128)]
+    assert route.call_count == 3 + STREAM_MAX_RETRIES + 1
+
+
+async def test_async_track_cached_stream(async_deezer_client, tmp_path, monkeypatch):
+    """Test the AsyncTrack `cached_stream` method."""
+    cache = AudioCache(tmp_path / "audio")
+    track = AsyncTrack(
+        async_deezer_client, 1, song=DeezerSongFactory.build(SNG_ID=1, FALLBACK=None)
+    )
+    calls = []
+
+    async def stream(quality, priority):
+        calls.append((quality, priority))
+        yield b"foo"
+        yield b"bar"
+
+    monkeypatch.setattr(track, "stream", stream)
+    quality = StreamQuality.MP3_128
+
+    assert [chunk async for chunk in track.cached_stream(cache, quality)] == [
+        b"foo",
+        b"bar",
+    ]
+    assert calls == [(quality, Priority.STREAM)]
+    assert cache.get(1, quality).read_bytes() == b"foobar"
+
+    # Cached tracks are read from disk
+    assert b"".join([chunk async for chunk in track.cached_stream(cache, quality)]) == (
+        b"foobar"
+    )
+    assert len(calls) == 1
+    assert track.streamed == len(b"foobar")
+    assert track.status == TrackStatus.STREAMED
+
+
+async def test_prefetcher(async_deezer_client, tmp_path, monkeypatch):
+    """Test the Prefetcher `schedule` and `cancel` methods."""
+    cache = AudioCache(tmp_path / "audio", max_bytes=1)
+    quality = StreamQuality.MP3_128
+    prefetcher = Prefetcher(cache, quality, depth=2)
+    release = asyncio.Event()
+    streamed = []
+    # Track 2 is replaced by its fallback track once refreshed
+    fallbacks = {2: 20}
+
+    def song(track_id):
+        return DeezerSongFactory.build(
+            SNG_ID=track_id, FALLBACK=None, FILESIZE_MP3_128=1
+        )
+
+    async def refresh(self):
+        self._update_track_info(song(fallbacks.get(self.track_id, self.track_id)))
+
+    async def stream(self, quality, priority):
+        assert priority == Priority.PREFETCH
+        yield b"foo"
+        await release.wait()
+        streamed.append(self.track_id)
+
+    monkeypatch.setattr(AsyncTrack, "refresh", refresh)
+    monkeypatch.setattr(AsyncTrack, "stream", stream)
+    tracks = [
+        AsyncTrack(async_deezer_client, track_id, song=song(track_id))
+        for track_id in range(1, 5)
+    ]
+
+    # Upcoming tracks are prefetched
+    prefetcher.schedule(tracks[:3])
+    assert set(prefetcher.tasks) == {(1, quality), (2, quality)}
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.wait(prefetcher.tasks.values())
+    assert streamed == [1, 20]
+    assert prefetcher.tasks == {}
+    # Prefetched tracks are pinned (though the cache budget is exceeded)
+    assert cache.get(1, quality) is not None
+    assert cache.get(20, quality) is not None
+    assert prefetcher.pins == {(1, quality), (20, quality)}
+    # Queued tracks are left untouched
+    assert tracks[1].track_id == 2  # noqa: PLR2004
+    assert all(track.status == TrackStatus.IDLE for track in tracks)
+
+    # Resolved prefetched tracks are not prefetched again
+    prefetcher.schedule(tracks[:3])
+    assert prefetcher.tasks == {}
+
+    # Stale prefetches are cancelled and unpinned
+    release.clear()
+    prefetcher.schedule(tracks[2:])
+    await asyncio.sleep(0.01)
+    assert set(prefetcher.tasks) == {(3, quality), (4, quality)}
+    assert prefetcher.pins == {(3, quality), (4, quality)}
+    prefetcher.cancel()
+    await asyncio.sleep(0.01)
+    assert prefetcher.tasks == {}
+    assert prefetcher.pins == set()
+    assert streamed == [1, 20]
+    assert cache.get(3, quality) is None
+    assert list(cache.path.glob("*.part")) == []
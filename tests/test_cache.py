@@ -0,0 +1,280 @@
+"""Onzr cache tests."""
+
+import json
+import time
+from datetime import date
+
+import pytest
+from deezer.errors import DataException
+
+from onzr.cache import DEFAULT_TTL, ENDPOINTS_TTL, AudioCache, ResponseCache
+from onzr.models.core import StreamQuality, TrackShort
+from tests.factories import DeezerAlbumFactory, DeezerTrackFactory
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    """An empty response cache."""
+    return ResponseCache(tmp_path / "cache.db", max_entries=3)
+
+
+def test_response_cache_key():
+    """Test the ResponseCache `key` static method."""
+    assert ResponseCache.key("get_track", 1) == ResponseCache.key("get_track", 1)
+    assert ResponseCache.key("get_track", 1) != ResponseCache.key("get_album", 1)
+    assert ResponseCache.key("get_artist_top", 1, limit=10) != ResponseCache.key(
+        "get_artist_top", 1, limit=20
+    )
+    assert ResponseCache.key("search", track="a", strict=True) == ResponseCache.key(
+        "search", strict=True, track="a"
+    )
+
+
+def test_response_cache_get_ttl(tmp_path):
+    """Test the ResponseCache `get_ttl` method."""
+    cache = ResponseCache(tmp_path / "cache.db", ttl={"get_track": 10})
+
+    assert cache.get_ttl("get_track") == 10  # noqa: PLR2004
+    assert cache.get_ttl("get_album") == ENDPOINTS_TTL["get_album"]
+    assert cache.get_ttl("search_track") == DEFAULT_TTL
+
+
+def test_response_cache_get_set(response_cache):
+    """Test the ResponseCache `get` and `set` methods."""
+    key = ResponseCache.key("get_track", 1)
+    assert response_cache.get(key) == (False, None)
+
+    response_cache.set(key, b'{"id": 1}', "get_track")
+    assert response_cache.get(key) == (True, b'{"id": 1}')
+    assert len(response_cache) == 1
+
+    # Negative caching
+    key = ResponseCache.key("get_track", 2)
+    response_cache.set(key, None, "get_track")
+    assert response_cache.get(key) == (True, None)
+
+    # Persistence
+    other = ResponseCache(response_cache.path)
+    assert other.get(ResponseCache.key("get_track", 1)) == (True, b'{"id": 1}')
+
+    response_cache.clear()
+    assert len(response_cache) == 0
+
+
+def test_response_cache_get_legacy_entries(response_cache):
+    """Test the ResponseCache `get` method with entries stored as text."""
+    key = ResponseCache.key("get_track", 1)
+    with response_cache._db:
+        response_cache._db.execute(
+            "INSERT INTO responses VALUES (?, ?, ?, ?)",
+            (key, '{"id": 1}', time.time() + 10, time.time()),
+        )
+    assert response_cache.get(key) == (True, b'{"id": 1}')
+
+
+def test_response_cache_release_dates(response_cache):
+    """Test the ResponseCache `get_release_dates` and `set_release_dates` methods."""
+    assert response_cache.get_release_dates([1, 2]) == {}
+
+    response_cache.set_release_dates({1: date(2020, 1, 1), 3: date(2021, 1, 1)})
+    assert response_cache.get_release_dates([1, 2, 3]) == {
+        1: date(2020, 1, 1),
+        3: date(2021, 1, 1),
+    }
+    # Release dates are not cached responses
+    assert len(response_cache) == 0
+
+    response_cache.clear()
+    assert response_cache.get_release_dates([1, 2, 3]) == {}
+
+
+def test_response_cache_expiration(tmp_path, monkeypatch):
+    """Test the ResponseCache entries expiration."""
+    cache = ResponseCache(tmp_path / "cache.db", ttl={"get_track": 10, "search": 0})
+    now = 1_000_000.0
+    monkeypatch.setattr("onzr.cache.time.time", lambda: now)
+
+    key = ResponseCache.key("get_track", 1)
+    cache.set(key, b'{"id": 1}', "get_track")
+    now += 9
+    assert cache.get(key) == (True, b'{"id": 1}')
+    now += 2
+    assert cache.get(key) == (False, None)
+    assert len(cache) == 0
+
+    # A null TTL disables caching
+    key = ResponseCache.key("search", "foo")
+    cache.set(key, b'{"data": []}', "search")
+    assert cache.get(key) == (False, None)
+
+
+def test_response_cache_lru_eviction(response_cache, monkeypatch):
+    """Test the ResponseCache least recently used entries eviction."""
+    now = 1_000_000.0
+    monkeypatch.setattr("onzr.cache.time.time", lambda: now)
+
+    keys = [ResponseCache.key("get_track", i) for i in range(4)]
+    for id_, key in enumerate(keys[:3]):
+        now += 1
+        response_cache.set(key, f'{{"id": {id_}}}'.encode(), "get_track")
+
+    # Access the first entry so that the second one is the least recently used
+    now += 1
+    assert response_cache.get(keys[0]) == (True, b'{"id": 0}')
+
+    now += 1
+    response_cache.set(keys[3], b'{"id": 3}', "get_track")
+    assert len(response_cache) == response_cache.max_entries
+    assert response_cache.get(keys[0])[0]
+    assert not response_cache.get(keys[1])[0]
+    assert response_cache.get(keys[2])[0]
+    assert response_cache.get(keys[3])[0]
+
+
+def test_deezer_client_with_response_cache(responses, deezer_client, tmp_path):
+    """Test the DeezerClient API responses caching."""
+    deezer_client.cache = ResponseCache(tmp_path / "cache.db")
+    track_id = 666
+
+    payload = DeezerTrackFactory.build(id=track_id)
+    responses.get(
+        f"https://api.deezer.com/track/{track_id}",
+        status=200,
+        json=json.loads(payload.model_dump_json()),
+    )
+    track = deezer_client.track(track_id=track_id)
+    assert isinstance(track, TrackShort)
+    assert len(responses.calls) == 2  # noqa: PLR2004 (login + track)
+
+    # Second call hits the cache
+    assert deezer_client.track(track_id=track_id) == track
+    assert len(responses.calls) == 2  # noqa: PLR2004
+
+    # Missing objects are cached too
+    responses.get(
+        "https://api.deezer.com/track/1",
+        status=200,
+        json={"error": {"type": "DataException", "message": "no data", "code": 800}},
+    )
+    with pytest.raises(DataException):
+        deezer_client.track(track_id=1)
+    with pytest.raises(DataException):
+        deezer_client.track(track_id=1)
+    assert len(responses.calls) == 3  # noqa: PLR2004
+
+
+def test_deezer_client_release_dates_cache(responses, deezer_client, tmp_path):
+    """Test the DeezerClient albums release date caching."""
+    deezer_client.cache = ResponseCache(tmp_path / "cache.db")
+    deezer_client.cache.set_release_dates({1: date(2020, 1, 1)})
+    responses.get(
+        "https://api.deezer.com/album/2",
+        status=200,
+        json=json.loads(
+            DeezerAlbumFactory.build(id=2, release_date="2021-01-01").model_dump_json()
+        ),
+    )
+
+    assert deezer_client.album_release_dates([1, 2, 1]) == {
+        1: date(2020, 1, 1),
+        2: date(2021, 1, 1),
+    }
+    assert deezer_client.cache.get_release_dates([2]) == {2: date(2021, 1, 1)}
+    assert len(responses.calls) == 2  # noqa: PLR2004 (login + album)
+
+
+@pytest.fixture
+def audio_cache(tmp_path):
+    """An empty audio cache."""
+    return AudioCache(tmp_path / "audio", max_bytes=10)
+
+
+def add_track(cache, track_id, content, quality=StreamQuality.MP3_128):
+    """Add a track to the audio cache."""
+    with cache.writer(track_id, quality) as file:
+        file.write(content)
+
+
+def test_audio_cache_get_writer(audio_cache):
+    """Test the AudioCache `get` and `writer` methods."""
+    assert audio_cache.get(1, StreamQuality.MP3_128) is None
+
+    with audio_cache.writer(1, StreamQuality.MP3_128) as file:
+        file.write(b"foo")
+        # Incomplete files are not cached
+        assert audio_cache.get(1, StreamQuality.MP3_128) is None
+
+    path = audio_cache.get(1, StreamQuality.MP3_128)
+    assert path.read_bytes() == b"foo"
+    assert audio_cache.get(1, StreamQuality.FLAC) is None
+    assert len(audio_cache) == 1
+    assert audio_cache.size == 3  # noqa: PLR2004
+
+    # Interrupted writes are discarded
+    with pytest.raises(ValueError, match="Oops"):
+        with audio_cache.writer(2, StreamQuality.MP3_128) as file:
+            file.write(b"bar")
+            raise ValueError("Oops")
+    assert audio_cache.get(2, StreamQuality.MP3_128) is None
+    assert list(audio_cache.path.iterdir()) == [path]
+
+    # Persistence (incomplete files left behind are removed)
+    (audio_cache.path / ".foo.part").write_bytes(b"foo")
+    (audio_cache.path / "foo").write_bytes(b"foo")
+    (audio_cache.path / "1-foo").write_bytes(b"foo")
+    other = AudioCache(audio_cache.path)
+    assert other.get(1, StreamQuality.MP3_128) == path
+    assert len(other) == 1
+    assert not (audio_cache.path / ".foo.part").exists()
+
+    audio_cache.clear()
+    assert len(audio_cache) == 0
+    assert not path.exists()
+
+
+def test_audio_cache_write_failure(audio_cache, monkeypatch):
+    """Test the AudioCache `writer` method when writing fails."""
+
+    def write(data):
+        raise OSError("No space left on device")
+
+    with audio_cache.writer(1, StreamQuality.MP3_128) as file:
+        monkeypatch.setattr(file._file, "write", write)
+        # Errors are not raised
+        file.write(b"foo")
+        assert file.failed
+    assert audio_cache.get(1, StreamQuality.MP3_128) is None
+    assert list(audio_cache.path.iterdir()) == []
+
+
+def test_audio_cache_lru_eviction(audio_cache):
+    """Test the AudioCache least recently used files eviction."""
+    for track_id in range(1, 4):
+        add_track(audio_cache, track_id, b"abcd")
+    # The byte budget is exceeded: the least recently used track has been evicted
+    assert audio_cache.get(1, StreamQuality.MP3_128) is None
+    assert audio_cache.size == 8  # noqa: PLR2004
+
+    # Access the second track so that the third one is the least recently used
+    assert audio_cache.get(2, StreamQuality.MP3_128) is not None
+    add_track(audio_cache, 4, b"abcd")
+    assert audio_cache.get(2, StreamQuality.MP3_128) is not None
+    assert audio_cache.get(3, StreamQuality.MP3_128) is None
+    assert audio_cache.get(4, StreamQuality.MP3_128) is not None
+
+
+def test_audio_cache_pinning(audio_cache):
+    """Test the AudioCache pinned tracks."""
+    add_track(audio_cache, 1, b"abcd")
+    with audio_cache.pinned(1, StreamQuality.MP3_128):
+        add_track(audio_cache, 2, b"abcd")
+        add_track(audio_cache, 3, b"abcd")
+        assert audio_cache.get(1, StreamQuality.MP3_128) is not None
+        assert audio_cache.get(2, StreamQuality.MP3_128) is None
+
+        audio_cache.clear()
+        assert len(audio_cache) == 1
+
+    # Unpinned tracks can be evicted again
+    add_track(audio_cache, 2, b"abcdefgh")
+    assert audio_cache.get(1, StreamQuality.MP3_128) is None
@@ -15,6 +15,7 @@ import vlc
 import yaml
 
 import onzr
+from onzr.aio import GW_URL
 from onzr.cli import ExitCodes, cli
 from onzr.deezer import DeezerClient
 from onzr.exceptions import OnzrConfigurationError
@@ -23,7 +24,6 @@ from tests.factories import (
     AlbumShortFactory,
     ArtistShortFactory,
     DeezerSongFactory,
-    DeezerSongResponseFactory,
     PlaylistShortFactory,
     TrackShortFactory,
 )
@@ -297,12 +297,15 @@ def test_playlist_command(configured_cli_runner, monkeypatch):
     )
 
     monkeypatch.setattr(DeezerClient, "playlist", lambda x, y: playlist_one)
+    monkeypatch.setattr(
+        DeezerClient, "iter_playlist_tracks", lambda x, y: iter(playlist_one.tracks)
+    )
 
     # Standard run
     result = configured_cli_runner.invoke(cli, ["playlist", "1"])
     assert result.exit_code == ExitCodes.OK
 
-    # Display only track ids
+    # Display only track ids (streamed from playlist tracks pages)
     result = configured_cli_runner.invoke(cli, ["playlist", "--ids", "1"])
     assert result.exit_code == ExitCodes.OK
     assert result.stdout == "".join([f"{t.id}\n" for t in playlist_one.tracks])
@@ -323,6 +326,11 @@ def test_playlist_command(configured_cli_runner, monkeypatch):
     assert result.exit_code == ExitCodes.INVALID_ARGUMENTS
     assert "This playlist contains no tracks" in result.stdout
 
+    monkeypatch.setattr(DeezerClient, "iter_playlist_tracks", lambda x, y: iter([]))
+    result = configured_cli_runner.invoke(cli, ["playlist", "--ids", "1"])
+    assert result.exit_code == ExitCodes.INVALID_ARGUMENTS
+    assert "This playlist contains no tracks" in result.stdout
+
 
 def test_mix_command(configured_cli_runner, monkeypatch):
     """Test the `onzr mix` command."""
@@ -367,18 +375,39 @@ def test_mix_command(configured_cli_runner, monkeypatch):
         [f"{t.id}" for t in deep_collection] * 2
     )
 
+    # Missing artists are reported
+    def search(*args, artist="", **kwargs) -> Collection:
+        """Monkeypatch search."""
+        return artists_collection if artist == "foo" else []
+
+    monkeypatch.setattr(DeezerClient, "search", search)
 
-def test_add_command(test_server, responses, configured_cli_runner):
+    result = configured_cli_runner.invoke(cli, ["mix", "foo", "bar", "--ids"])
+    assert result.exit_code == ExitCodes.OK
+    assert sorted(result.stdout.split()) == sorted(
+        [f"{t.id}" for t in tracks_collection]
+    )
+    assert "Artist 'bar' is missing from the mix (No match found)" in result.stderr
+
+    result = configured_cli_runner.invoke(cli, ["mix", "bar"])
+    assert result.exit_code == ExitCodes.NOT_FOUND
+
+
+def test_add_command(test_server, deezer_gw, configured_cli_runner):
     """Test the `onzr add` command."""
     track_ids = [1, 2, 3]
-    for track_id in track_ids:
-        responses.post(
-            "http://www.deezer.com/ajax/gw-light.php",
-            status=200,
-            json=DeezerSongResponseFactory.build(
-                error={}, results=DeezerSongFactory.build(SNG_ID=track_id)
-            ).model_dump(),
-        )
+    deezer_gw.post(GW_URL, params={"method": "song.getListData"}).respond(
+        json={
+            "error": {},
+            "results": {
+                "data": [
+                    DeezerSongFactory.build(SNG_ID=track_id).model_dump()
+                    for track_id in track_ids
+                ],
+                "count": len(track_ids),
+            },
+        },
+    )
 
     result = configured_cli_runner.invoke(cli, ["add", "1", "2", "3"])
     assert result.exit_code == ExitCodes.OK
@@ -427,9 +456,7 @@ def test_clear_command(test_server, configured_cli_runner, configured_onzr, trac
     assert configured_onzr.queue.is_empty
 
 
-def test_now_command(
-    test_server, configured_cli_runner, configured_onzr, track, responses
-):
+def test_now_command(test_server, configured_cli_runner, configured_onzr, track):
     """Test the `onzr clear` command."""
     # Empty queue
     result = configured_cli_runner.invoke(cli, ["now"])
@@ -452,19 +479,6 @@ def test_now_command(
     assert result.exit_code == ExitCodes.OK
     assert "Nothing more has been queued" in result.stdout
 
-    # Nota bene:
-    #
-    # Mock track info response as we will refresh this info before playing. If we do
-    # not mock this here, we will use the latest available response for this track
-    # which corresponds to the third track (and not the first).
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={}, results=DeezerSongFactory.build(SNG_ID=1, DURATION=128)
-        ).model_dump(),
-    )
-
     # Start playing
     configured_onzr.player.play()
     sleep(0.3)
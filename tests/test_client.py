@@ -2,6 +2,7 @@
 
 from time import sleep
 
+from onzr.aio import GW_URL
 from onzr.client import OnzrClient
 from onzr.models.core import (
     PlayerControl,
@@ -13,22 +14,26 @@ from onzr.models.core import (
     ServerState,
 )
 
-from .factories import DeezerSongFactory, DeezerSongResponseFactory
+from .factories import DeezerSongFactory
 
 
-def test_queue_add(test_server, responses):
+def test_queue_add(test_server, deezer_gw):
     """Test the `queue_add` method."""
     client = OnzrClient()
 
     track_ids = [1, 2, 3]
-    for track_id in track_ids:
-        responses.post(
-            "http://www.deezer.com/ajax/gw-light.php",
-            status=200,
-            json=DeezerSongResponseFactory.build(
-                error={}, results=DeezerSongFactory.build(SNG_ID=track_id)
-            ).model_dump(),
-        )
+    deezer_gw.post(GW_URL, params={"method": "song.getListData"}).respond(
+        json={
+            "error": {},
+            "results": {
+                "data": [
+                    DeezerSongFactory.build(SNG_ID=track_id).model_dump()
+                    for track_id in track_ids
+                ],
+                "count": len(track_ids),
+            },
+        },
+    )
 
     assert client.queue_add([str(t) for t in track_ids]) == ServerMessage(
         message="Added 3 track(s) to queue"
@@ -0,0 +1,80 @@
+"""Onzr crypto tests."""
+
+import pytest
+from Cryptodome.Cipher import Blowfish
+
+from onzr.crypto import (
+    CHUNK_SIZE,
+    IV,
+    STRIPE_SIZE,
+    StreamBuffer,
+    StripeDecryptor,
+    aligned_size,
+)
+
+KEY = b"0123456789abcdef"
+
+
+def encrypt(data: bytes) -> bytes:
+    """Encrypt data the way Deezer does: the first stripe of every chunk."""
+    encrypted = b""
+    for start in range(0, len(data), CHUNK_SIZE):
+        chunk = data[start : start + CHUNK_SIZE]
+        if len(chunk) > STRIPE_SIZE:
+            cipher = Blowfish.new(KEY, Blowfish.MODE_CBC, IV)  # noqa: S304
+            chunk = cipher.encrypt(chunk[:STRIPE_SIZE]) + chunk[STRIPE_SIZE:]
+        encrypted += chunk
+    return encrypted
+
+
+@pytest.mark.parametrize(
+    "size",
+    [
+        0,
+        100,
+        STRIPE_SIZE,
+        STRIPE_SIZE + 1,
+        CHUNK_SIZE,
+        5 * CHUNK_SIZE,
+        5 * CHUNK_SIZE + STRIPE_SIZE,
+        5 * CHUNK_SIZE + STRIPE_SIZE + 10,
+    ],
+)
+def test_stripe_decryptor_decrypt_into(size):
+    """Test the StripeDecryptor `decrypt_into` method."""
+    data = bytes(i % 251 for i in range(size))
+    buffer = bytearray(encrypt(data))
+
+    StripeDecryptor(KEY).decrypt_into(memoryview(buffer))
+    assert buffer == data
+
+
+@pytest.mark.parametrize("skip", [0, 10, CHUNK_SIZE, 2 * CHUNK_SIZE + 10])
+def test_stream_buffer(skip):
+    """Test the StreamBuffer `feed` and `flush` methods."""
+    data = bytes(i % 251 for i in range(5 * CHUNK_SIZE + 100))
+    encrypted = encrypt(data)
+    buffer = StreamBuffer(2 * CHUNK_SIZE, StripeDecryptor(KEY).decrypt_into, skip=skip)
+
+    # Received data sizes are not aligned with chunks
+    blocks = []
+    for start in range(0, len(encrypted), 5000):
+        blocks += buffer.feed(encrypted[start : start + 5000])
+    blocks += buffer.flush()
+
+    assert b"".join(blocks) == data[skip:]
+    assert all(len(block) <= 2 * CHUNK_SIZE for block in blocks)
+    assert list(buffer.flush()) == []
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    [
+        (0, CHUNK_SIZE),
+        (CHUNK_SIZE + 1, CHUNK_SIZE),
+        (256 * 1024, 42 * CHUNK_SIZE),
+    ],
+)
+def test_aligned_size(size, expected):
+    """Test the aligned_size function."""
+    assert aligned_size(size) == expected
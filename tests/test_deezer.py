@@ -2,20 +2,23 @@
 
 import datetime
 import json
+from threading import Lock
 from time import sleep
+from urllib.parse import urlsplit
 
 import pytest
-from pydantic import HttpUrl
+import requests
+from deezer.errors import APIError, InvalidQueryException
+from responses import matchers
 
-from onzr.deezer import DeezerClient, StreamQuality, Track, TrackStatus
-from onzr.exceptions import DeezerTrackException
+from onzr.deezer import QUOTA_MAX_RETRIES, DeezerClient, StreamQuality
 from onzr.models.core import (
     AlbumShort,
     ArtistShort,
     PlaylistShort,
-    TrackInfo,
     TrackShort,
 )
+from onzr.traffic import RateLimiter
 from tests.factories import (
     AlbumShortFactory,
     ArtistShortFactory,
@@ -25,14 +28,14 @@ from tests.factories import (
     DeezerArtistAlbumsResponseFactory,
     DeezerArtistFactory,
     DeezerArtistRadioResponseFactory,
+    DeezerArtistRelatedResponseFactory,
     DeezerArtistTopResponseFactory,
     DeezerPlaylistFactory,
+    DeezerPlaylistTracksResponseFactory,
     DeezerSearchAlbumResponseFactory,
     DeezerSearchArtistResponseFactory,
     DeezerSearchPlaylistResponseFactory,
     DeezerSearchTrackResponseFactory,
-    DeezerSongFactory,
-    DeezerSongResponseFactory,
     DeezerTrackFactory,
     TrackShortFactory,
 )
@@ -53,10 +56,135 @@ def test_deezer_client_init():
     assert client.session.adapters["https://"]._pool_maxsize == expected
 
 
+def test_deezer_client_rate_limiter(responses, settings, monkeypatch):
+    """Test the DeezerClient rate limited API calls."""
+    limiter = RateLimiter(rate=100)
+    throttled = []
+    monkeypatch.setattr(limiter, "throttled", lambda: throttled.append(1))
+    client = DeezerClient(
+        arl=settings.ARL,
+        blowfish=settings.DEEZER_BLOWFISH_SECRET,
+        fast=True,
+        limiter=limiter,
+    )
+    track_id = 1
+    url = f"https://api.deezer.com/track/{track_id}"
+    payload = DeezerTrackFactory.build(id=track_id)
+    responses.get(url, status=429)
+    responses.get(
+        url,
+        status=200,
+        json={"error": {"type": "Exception", "message": "Quota limit", "code": 4}},
+    )
+    responses.get(url, status=200, json=json.loads(payload.model_dump_json()))
+
+    # Quota errors are reported to the limiter and requests are sent again
+    assert client.track(track_id).id == track_id
+    assert len(throttled) == 2  # noqa: PLR2004
+    assert len(responses.calls) == 3  # noqa: PLR2004
+
+    # Persistent quota errors are only retried by the adapter, then raised
+    responses.get(
+        "https://api.deezer.com/track/2",
+        status=200,
+        json={"error": {"type": "Exception", "message": "Quota limit", "code": 4}},
+    )
+    with pytest.raises(APIError, match="Quota limit"):
+        client.track(2)
+    assert len(responses.calls) == 3 + QUOTA_MAX_RETRIES
+
+
+def test_deezer_client_raw_api(responses, monkeypatch):
+    """Test the DeezerClient raw API calls."""
+    monkeypatch.setattr("onzr.deezer.QUOTA_RETRY_DELAY", 0)
+    monkeypatch.setattr("onzr.deezer.API_RETRY_DELAY", 0)
+    client = DeezerClient(arl="fake", blowfish="fake", fast=True)
+    track_id = 1
+    url = f"https://api.deezer.com/track/{track_id}"
+    payload = DeezerTrackFactory.build(id=track_id)
+    responses.get(
+        url,
+        status=200,
+        json={"error": {"type": "Exception", "message": "Busy", "code": 700}},
+    )
+    responses.get(url, status=200, body=payload.model_dump_json())
+
+    # Responses are not decoded and busy API calls are retried
+    assert client.api.get_track(track_id) == payload.model_dump_json().encode()
+    assert client.track(track_id) == payload.to_short()
+    assert len(responses.calls) == 3  # noqa: PLR2004
+
+    # Errors are raised as deezer-py exceptions
+    responses.get(
+        "https://api.deezer.com/search/track",
+        status=200,
+        json={"error": {"type": "Exception", "message": "Bad query", "code": 600}},
+    )
+    with pytest.raises(InvalidQueryException, match="search/track Bad query"):
+        client.api.search_track("foo")
+    responses.get(
+        "https://api.deezer.com/album/1",
+        status=200,
+        json={"error": {"type": "Exception", "message": "Oops", "code": 666}},
+    )
+    with pytest.raises(APIError, match="Oops"):
+        client.api.get_album(1)
+
+    # Busy API calls and failed connections are retried a bounded number of times
+    calls = len(responses.calls)
+    responses.get(
+        "https://api.deezer.com/album/2",
+        status=200,
+        json={"error": {"type": "Exception", "message": "Busy", "code": 700}},
+    )
+    with pytest.raises(APIError, match="Busy"):
+        client.api.get_album(2)
+    assert len(responses.calls) == calls + QUOTA_MAX_RETRIES
+    responses.get(
+        "https://api.deezer.com/album/3", body=requests.ConnectionError("Refused")
+    )
+    with pytest.raises(requests.ConnectionError):
+        client.api.get_album(3)
+    assert len(responses.calls) == calls + 2 * QUOTA_MAX_RETRIES
+
+
+def test_deezer_client_map_concurrently():
+    """Test the DeezerClient `map_concurrently` method."""
+    client = DeezerClient(arl="fake", blowfish="fake", fast=True, max_workers=3)
+    assert client.executor._max_workers == 3  # noqa: PLR2004
+
+    lock = Lock()
+    running = 0
+    max_running = 0
+
+    def square(x: int) -> int:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        sleep(0.01 * (x % 3))
+        with lock:
+            running -= 1
+        return x * x
+
+    results = client.map_concurrently(square, range(20))
+    # Nothing is submitted until results are consumed
+    assert max_running == 0
+    # Ensure order is preserved
+    assert list(results) == [x * x for x in range(20)]
+    assert max_running <= client.max_workers
+
+    # Worker pool size defaults to the connection pool maximal size
+    client = DeezerClient(
+        arl="fake", blowfish="fake", fast=True, connection_pool_maxsize=15
+    )
+    assert client.max_workers == 15  # noqa: PLR2004
+
+
 def test_deezer_client_collection_details(responses, deezer_client):
     """Test the DeezerClient `_collection_details` method."""
     # Tracks
-    tracks = [TrackShortFactory.build(id=i) for i in range(1, 11)]
+    tracks = [TrackShortFactory.build(id=i, album_id=None) for i in range(1, 11)]
     for track in tracks:
         responses.get(
             f"https://api.deezer.com/track/{track.id}",
@@ -67,6 +195,30 @@ def test_deezer_client_collection_details(responses, deezer_client):
     # Ensure order is preserved
     assert [t.id for t in tracks] == list(range(1, 11))
 
+    # Tracks of the same album: the album release date is fetched once
+    responses.calls.reset()
+    for album_id, release_date in ((1, "2020-01-01"), (2, "2021-01-01")):
+        responses.get(
+            f"https://api.deezer.com/album/{album_id}",
+            status=200,
+            json=json.loads(
+                DeezerAlbumFactory.build(
+                    id=album_id, release_date=release_date
+                ).model_dump_json()
+            ),
+        )
+    tracks = [
+        TrackShortFactory.build(id=i, album_id=1 + i % 2, release_date=None)
+        for i in range(1, 11)
+    ]
+    tracks = deezer_client._collection_details(tracks)
+    assert [t.id for t in tracks] == list(range(1, 11))
+    assert [t.release_date for t in tracks] == [
+        datetime.date(2021, 1, 1),
+        datetime.date(2020, 1, 1),
+    ] * 5
+    assert len(responses.calls) == 2  # noqa: PLR2004
+
     # Albums
     albums = [AlbumShortFactory.build(id=i) for i in range(1, 11)]
     for album in albums:
@@ -92,11 +244,11 @@ def test_deezer_client_artist(responses, deezer_client):
     artist_id = 1
 
     # Artist
-    payload = DeezerArtistFactory.build(id=artist_id)
+    artist = DeezerArtistFactory.build(id=artist_id)
     responses.get(
         f"https://api.deezer.com/artist/{artist_id}",
         status=200,
-        json=json.loads(payload.model_dump_json()),
+        json=json.loads(artist.model_dump_json()),
     )
 
     with pytest.raises(
@@ -121,9 +273,9 @@ def test_deezer_client_artist(responses, deezer_client):
     # Radio - with collection details
     for track in payload.data:
         responses.get(
-            f"https://api.deezer.com/track/{track.id}",
+            f"https://api.deezer.com/album/{track.album.id}",
             status=200,
-            json=json.loads(DeezerTrackFactory.build(id=track.id).model_dump_json()),
+            json=json.loads(track.album.model_dump_json()),
         )
     radio = deezer_client.artist(
         artist_id=artist_id,
@@ -148,6 +300,16 @@ def test_deezer_client_artist(responses, deezer_client):
     assert isinstance(radio[0], TrackShort)
     assert len(radio) == len(payload.data)
 
+    # The artist is only fetched to label its albums
+    def artist_calls():
+        return [
+            call
+            for call in responses.calls
+            if urlsplit(call.request.url).path == f"/artist/{artist_id}"
+        ]
+
+    assert artist_calls() == []
+
     # Albums
     payload = DeezerArtistAlbumsResponseFactory.build()
     responses.get(
@@ -160,6 +322,8 @@ def test_deezer_client_artist(responses, deezer_client):
     )
     assert isinstance(radio[0], AlbumShort)
     assert len(radio) == len(payload.data)
+    assert {album.artist for album in radio} == {artist.name}
+    assert len(artist_calls()) == 1
 
 
 def test_deezer_client_album(responses, deezer_client):
@@ -195,7 +359,10 @@ def test_deezer_client_playlist(responses, deezer_client):
     """Test the DeezerClient `playlist` method."""
     playlist_id = 666
 
-    payload = DeezerPlaylistFactory.build(id=playlist_id)
+    tracks = DeezerPlaylistTracksResponseFactory.build(next=None)
+    payload = DeezerPlaylistFactory.build(
+        id=playlist_id, nb_tracks=len(tracks.data), tracks=tracks
+    )
     responses.get(
         f"https://api.deezer.com/playlist/{playlist_id}",
         status=200,
@@ -206,6 +373,83 @@ def test_deezer_client_playlist(responses, deezer_client):
     assert playlist.id == playlist_id
 
 
+def test_deezer_client_playlist_pagination(responses, deezer_client):
+    """Test the DeezerClient `playlist` method for large playlists."""
+    playlist_id = 666
+    url = f"https://api.deezer.com/playlist/{playlist_id}/tracks"
+
+    tracks = DeezerTrackFactory.batch(5)
+    # The embedded playlist tracks collection has no next link
+    payload = DeezerPlaylistFactory.build(
+        id=playlist_id,
+        nb_tracks=5,
+        tracks=DeezerPlaylistTracksResponseFactory.build(data=tracks[:2], next=None),
+    )
+    responses.get(
+        f"https://api.deezer.com/playlist/{playlist_id}",
+        status=200,
+        json=json.loads(payload.model_dump_json()),
+    )
+    # Remaining tracks are fetched page by page from the playlist tracks endpoint
+    responses.get(
+        url,
+        status=200,
+        match=[matchers.query_param_matcher({"index": 2, "limit": 3})],
+        json=json.loads(
+            DeezerPlaylistTracksResponseFactory.build(
+                data=tracks[2:4], total=5, next=f"{url}?index=4"
+            ).model_dump_json()
+        ),
+    )
+    responses.get(
+        url,
+        status=200,
+        match=[matchers.query_param_matcher({"index": 4, "limit": 1})],
+        json=json.loads(
+            DeezerPlaylistTracksResponseFactory.build(
+                data=tracks[4:], total=5
+            ).model_dump_json()
+        ),
+    )
+
+    playlist = deezer_client.playlist(playlist_id=playlist_id)
+    assert [t.id for t in playlist.tracks] == [t.id for t in tracks]
+
+
+def test_deezer_client_iter_search(responses, deezer_client, monkeypatch):
+    """Test the DeezerClient `iter_search` method pagination."""
+    monkeypatch.setattr("onzr.deezer.PAGE_SIZE", 2)
+    url = "https://api.deezer.com/search/track"
+    tracks = DeezerTrackFactory.batch(4)
+    for index in (0, 2):
+        responses.get(
+            url,
+            status=200,
+            match=[
+                matchers.query_param_matcher(
+                    {"q": "foo", "index": index, "limit": 2 if index == 0 else 1}
+                )
+            ],
+            json=json.loads(
+                DeezerSearchTrackResponseFactory.build(
+                    data=tracks[index : index + 2],
+                    total=4,
+                    next=f"{url}?q=foo&index={index + 2}",
+                ).model_dump_json()
+            ),
+        )
+
+    # The limit is pushed to upstream queries
+    results = list(deezer_client.iter_search(track="foo", limit=3))
+    assert [r.id for r in results] == [t.id for t in tracks[:3]]
+
+    # Pages are fetched on demand
+    responses.calls.reset()
+    first = next(deezer_client.iter_search(track="foo", limit=3))
+    assert first.id == tracks[0].id
+    assert len(responses.calls) == 1
+
+
 def test_deezer_client_search(responses, deezer_client):
     """Test the DeezerClient `search` method."""
     # Missing arguments
@@ -261,9 +505,9 @@ def test_deezer_client_search(responses, deezer_client):
     # Tracks - with collection details
     for track in payload.data:
         responses.get(
-            f"https://api.deezer.com/track/{track.id}",
+            f"https://api.deezer.com/album/{track.album.id}",
             status=200,
-            json=json.loads(DeezerTrackFactory.build(id=track.id).model_dump_json()),
+            json=json.loads(track.album.model_dump_json()),
         )
     tracks = deezer_client.search(track="lol", fetch_release_date=True)
     assert isinstance(tracks[0], TrackShort)
@@ -281,407 +525,103 @@ def test_deezer_client_search(responses, deezer_client):
     assert len(playlists) == len(payload.data)
 
 
-def test_stream_quality_enum():
-    """Test the StreamQuality enum."""
-    assert StreamQuality.FLAC.media_type == "audio/flac"
-    assert StreamQuality.MP3_320.media_type == "audio/mpeg"
-    assert StreamQuality.MP3_128.media_type == "audio/mpeg"
-
-
-def test_track_init(deezer_client, responses):
-    """Test the Track instantiation."""
-    track_id = 1
-    track_token = "fake"  # noqa: S105
-    track_duration = 120
-    track_artist = "Jimi Hendrix"
-    track_title = "All along the watchtower"
-    track_version = "(Dylan remix)"
-    track_album = "Experience"
-    track_picture = "ABCDEF"
-    track_physical_release_date = "2025-01-01"
-    track_filesize_mp3_128 = 128
-    track_filesize_mp3_320 = 320
-    track_filesize_flac = 7142
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                VERSION=track_version,
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE=track_physical_release_date,
-                FILESIZE_MP3_128=track_filesize_mp3_128,
-                FILESIZE_MP3_320=track_filesize_mp3_320,
-                FILESIZE_FLAC=track_filesize_flac,
-            ),
-        ).model_dump(),
-    )
-
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-
-    assert track.track_id == track_id
-    assert track.key == b"4den4:}:g,#j3i`a"
-    assert track.status == TrackStatus.IDLE
-    assert track.streamed == 0
-    assert track.track_info == TrackInfo(
-        id=track_id,
-        token=track_token,
-        duration=track_duration,
-        artist=track_artist,
-        title=f"{track_title} {track_version}",
-        album=track_album,
-        release_date=track_physical_release_date,
-        picture=track_picture,
-        formats=[
-            StreamQuality.MP3_128,
-            StreamQuality.MP3_320,
-            StreamQuality.FLAC,
-        ],
-    )
-    assert track.token == track_token
-    assert track.duration == track_duration
-    assert track.artist == track_artist
-    assert track.title == f"{track_title} {track_version}"
-    assert track.album == track_album
-    assert track.release_date == datetime.date(2025, 1, 1)
-    assert track.picture == track_picture
-    assert track.cover_small == HttpUrl(
-        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/56x56-000000-80-0-0.jpg"
-    )
-    assert track.cover_medium == HttpUrl(
-        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/250x250-000000-80-0-0.jpg"
-    )
-    assert track.cover_big == HttpUrl(
-        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/500x500-000000-80-0-0.jpg"
-    )
-    assert track.cover_xl == HttpUrl(
-        "https://e-cdns-images.dzcdn.net/images/cover/ABCDEF/1000x1000-000000-80-0-0.jpg"
-    )
-    assert (
-        track.full_title
-        == f"{track_artist} - {track_title} {track_version} [{track_album}]"
-    )
-    assert str(track) == "ID: 1"
-
-    # If picture is None
-    track.track_info.picture = None
-    assert track.cover_small is None
-    assert track.cover_medium is None
-    assert track.cover_big is None
-    assert track.cover_xl is None
-    assert track.formats == [
-        StreamQuality.MP3_128,
-        StreamQuality.MP3_320,
-        StreamQuality.FLAC,
-    ]
-
-    # Test available formats
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE=track_physical_release_date,
-                FILESIZE_MP3_128=track_filesize_mp3_128,
-                FILESIZE_MP3_320=track_filesize_mp3_320,
-                FILESIZE_FLAC=0,
-            ),
-        ).model_dump(),
-    )
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-
-    assert track.formats == [
-        StreamQuality.MP3_128,
-        StreamQuality.MP3_320,
-    ]
-
-    # Test when none of configured formats are available
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                VERSION="",
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE=track_physical_release_date,
-                FILESIZE_MP3_128=0,
-                FILESIZE_MP3_320=0,
-                FILESIZE_FLAC=0,
-            ),
-        ).model_dump(),
-    )
-    with pytest.raises(
-        DeezerTrackException,
-        match=r"No available formats detected for track \d+$",
-    ):
-        Track(client=deezer_client, track_id=track_id, background=False)
-
-    # Test when no version is supplied (empty string)
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                VERSION="",
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE=track_physical_release_date,
-                FILESIZE_MP3_128=track_filesize_mp3_128,
-                FILESIZE_MP3_320=track_filesize_mp3_320,
-                FILESIZE_FLAC=track_filesize_flac,
-            ),
-        ).model_dump(),
-    )
-
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-    assert track.title == track_title
-
-    # Test when no version is supplied (field not in payload)
-    payload = DeezerSongResponseFactory.build(
-        error={},
-        results=DeezerSongFactory.build(
-            SNG_ID=track_id,
-            TRACK_TOKEN=track_token,
-            DURATION=track_duration,
-            ART_NAME=track_artist,
-            SNG_TITLE=track_title,
-            ALB_TITLE=track_album,
-            ALB_PICTURE=track_picture,
-            PHYSICAL_RELEASE_DATE=track_physical_release_date,
-            FILESIZE_MP3_128=track_filesize_mp3_128,
-            FILESIZE_MP3_320=track_filesize_mp3_320,
-            FILESIZE_FLAC=track_filesize_flac,
-        ),
-    )
-    del payload.results.VERSION
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
+def test_deezer_client_mix(deezer_client, monkeypatch):
+    """Test the DeezerClient `mix` method."""
+    artists = {
+        "foo": ArtistShortFactory.build(id=1, name="foo"),
+        "bar": ArtistShortFactory.build(id=2, name="bar"),
+        "baz": ArtistShortFactory.build(id=3, name="baz"),
+    }
+    tracks = {artist.id: TrackShortFactory.batch(2) for artist in artists.values()}
+    calls = []
+
+    def search(artist, **kwargs):
+        calls.append(artist)
+        return [artists[artist]] if artist in artists else []
+
+    def artist(artist_id, **kwargs):
+        # Slow artists don't change tracks order
+        sleep(0.01 * (4 - artist_id))
+        if artist_id == 2:  # noqa: PLR2004
+            raise requests.ConnectionError("Oops")
+        return tracks[artist_id]
+
+    monkeypatch.setattr(deezer_client, "search", search)
+    monkeypatch.setattr(deezer_client, "artist", artist)
+
+    result, errors = deezer_client.mix(["foo", "bar", "baz", "unknown"])
+    assert sorted(calls) == ["bar", "baz", "foo", "unknown"]
+    assert result == tracks[1] + tracks[3]
+    assert sorted(errors) == ["bar", "unknown"]
+    assert isinstance(errors["bar"], requests.ConnectionError)
+    assert isinstance(errors["unknown"], LookupError)
+
+    # Plain mixes keep duplicated artists tracks
+    result, errors = deezer_client.mix(["foo", "foo"])
+    assert result == tracks[1] * 2
+
+    # Deep mix
+    related = ArtistShortFactory.build(id=4)
+    tracks[4] = tracks[1][:1] + TrackShortFactory.batch(1)
+    monkeypatch.setattr(
+        deezer_client,
+        "related_artists",
+        lambda artist_id, limit: [related] if artist_id == 1 else [],
+    )
+    result, errors = deezer_client.mix(["foo", "baz"], depth=2)
+    # Duplicated tracks are removed
+    assert result == tracks[1] + tracks[3] + tracks[4][1:]
+    assert errors == {}
+
+
+def test_deezer_client_related_artists(responses, deezer_client):
+    """Test the DeezerClient `related_artists` method."""
+    payload = DeezerArtistRelatedResponseFactory.build()
+    responses.get(
+        "https://api.deezer.com/artist/1/related",
         status=200,
-        json=payload.model_dump(),
+        json=json.loads(payload.model_dump_json()),
+        match=[matchers.query_param_matcher({"index": 0, "limit": 20})],
     )
+    assert deezer_client.related_artists(1) == [a.to_short() for a in payload.data]
 
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-    assert track.title == track_title
 
-    # Background init
-    track = Track(client=deezer_client, track_id=track_id, background=True)
-    sleep(0.5)
-    assert track.title == track_title
+def test_deezer_client_crawl_related_artists(deezer_client, monkeypatch):
+    """Test the DeezerClient `crawl_related_artists` method."""
+    # 1 → 2, 3, 4 → (2 → 1, 5, 6) (3 → 2, 7) (4 → fails) → (5 → 8)
+    graph = {1: [2, 3, 4], 2: [1, 5, 6], 3: [2, 7], 5: [8]}
+    artists = {id_: ArtistShortFactory.build(id=id_) for id_ in range(1, 9)}
+    calls = []
 
+    def related_artists(artist_id, limit):
+        calls.append(artist_id)
+        if artist_id == 4:  # noqa: PLR2004
+            raise requests.ConnectionError("Oops")
+        return [artists[id_] for id_ in graph.get(artist_id, [])]
 
-def test_track_fallback(deezer_client, responses):
-    """Test track fallback.
+    monkeypatch.setattr(deezer_client, "related_artists", related_artists)
+    seeds = [artists[1]]
 
-    When a track is no longer available or restricted in some country, a fallback track
-    is proposed in the track payload. We decide then to switch the initial reference by
-    the proposed fallback.
-    """
-    track_id = 1
-    track_token = "fake"  # noqa: S105
-    track_duration = 120
-    track_artist = "Jimi Hendrix"
-    track_title = "All along the watchtower"
-    track_album = "Experience"
-    track_picture = "ABCDEF"
-    track_physical_release_date = "2025-01-01"
-    track_filesize_mp3_128 = 128
-    track_filesize_mp3_320 = 320
-    track_filesize_flac = 0
-
-    fallback_track_id = 2
-    fallback_track_filesize_flac = 440
-
-    # Test when a fallback is supplied (field in payload)
-    payload = DeezerSongResponseFactory.build(
-        error={},
-        results=DeezerSongFactory.build(
-            SNG_ID=track_id,
-            TRACK_TOKEN=track_token,
-            DURATION=track_duration,
-            ART_NAME=track_artist,
-            SNG_TITLE=track_title,
-            ALB_TITLE=track_album,
-            ALB_PICTURE=track_picture,
-            PHYSICAL_RELEASE_DATE=track_physical_release_date,
-            FILESIZE_MP3_128=track_filesize_mp3_128,
-            FILESIZE_MP3_320=track_filesize_mp3_320,
-            FILESIZE_FLAC=track_filesize_flac,
-            FALLBACK=DeezerSongFactory.build(
-                SNG_ID=fallback_track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE=track_physical_release_date,
-                FILESIZE_MP3_128=track_filesize_mp3_128,
-                FILESIZE_MP3_320=track_filesize_mp3_320,
-                FILESIZE_FLAC=fallback_track_filesize_flac,
-            ),
-        ),
-    )
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=payload.model_dump(),
-    )
-
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-    assert track.track_id == fallback_track_id
-    assert track.formats == [
-        StreamQuality.MP3_128,
-        StreamQuality.MP3_320,
-        StreamQuality.FLAC,
+    assert deezer_client.crawl_related_artists(seeds, depth=0) == seeds
+    assert deezer_client.crawl_related_artists(seeds, depth=1, fanout=2) == [
+        artists[1],
+        artists[2],
+        artists[3],
     ]
+    calls.clear()
+    result = deezer_client.crawl_related_artists(seeds, depth=2, fanout=2)
+    assert [a.id for a in result] == [1, 2, 3, 5, 6, 7]
+    assert sorted(calls) == [1, 2, 3]
 
-
-def test_track_refresh(deezer_client, responses):
-    """Test the track `refresh` method."""
-    track_id = 1
-    track_title = "Paint it black"
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id, SNG_TITLE=track_title, VERSION=None
-            ),
-        ).model_dump(),
-    )
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-    assert track.title == track_title
-
-    new_title = "Paint it white"
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id, SNG_TITLE=new_title, VERSION=None
-            ),
-        ).model_dump(),
-    )
-    track.refresh()
-    assert track.title == new_title
-
-
-def test_track_get_url(track, monkeypatch):
-    """Test the track `_get_url` method."""
-    url = "https://fake.example.org/foo/1"
-    instance = track(1)
-    monkeypatch.setattr(instance.deezer, "get_track_url", lambda x, y: url)
-    assert instance._get_url(quality=StreamQuality.MP3_128) == HttpUrl(url)
+    # Artists are visited once
+    calls.clear()
+    result = deezer_client.crawl_related_artists(seeds, depth=10, fanout=5)
+    assert [a.id for a in result] == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert sorted(calls) == list(range(1, 9))
 
 
-def test_track_query_quality(deezer_client, responses):
-    """Test the track query_quality method."""
-    track_id = 1
-    track_token = "fake"  # noqa: S105
-    track_duration = 120
-    track_artist = "Jimi Hendrix"
-    track_title = "All along the watchtower"
-    track_album = "Experience"
-    track_picture = "ABCDEF"
-    track_filesize_mp3_128 = 128
-    track_filesize_mp3_320 = 320
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE="2023-01-01",
-                FILESIZE_MP3_128=track_filesize_mp3_128,
-                FILESIZE_MP3_320=track_filesize_mp3_320,
-                FILESIZE_FLAC=0,
-            ),
-        ).model_dump(),
-    )
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-
-    assert track.query_quality(StreamQuality.MP3_128) == StreamQuality.MP3_128
-    assert track.query_quality(StreamQuality.MP3_320) == StreamQuality.MP3_320
-    assert track.query_quality(StreamQuality.FLAC) == StreamQuality.MP3_320
-
-
-def test_track_serialize(deezer_client, responses):
-    """Test the Track serialization."""
-    track_id = 1
-    track_token = "fake"  # noqa: S105
-    track_duration = 120
-    track_artist = "Jimi Hendrix"
-    track_title = "All along the watchtower"
-    track_album = "Experience"
-    track_picture = "ABCDEF"
-
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={},
-            results=DeezerSongFactory.build(
-                SNG_ID=track_id,
-                TRACK_TOKEN=track_token,
-                DURATION=track_duration,
-                ART_NAME=track_artist,
-                SNG_TITLE=track_title,
-                VERSION="",
-                ALB_TITLE=track_album,
-                ALB_PICTURE=track_picture,
-                PHYSICAL_RELEASE_DATE="2025-01-01",
-            ),
-        ).model_dump(),
-    )
-
-    track = Track(client=deezer_client, track_id=track_id, background=False)
-
-    assert track.serialize() == TrackShort(
-        id=track_id,
-        title=track_title,
-        album=track_album,
-        artist=track_artist,
-        release_date=datetime.date(2025, 1, 1),
-    )
+def test_stream_quality_enum():
+    """Test the StreamQuality enum."""
+    assert StreamQuality.FLAC.media_type == "audio/flac"
+    assert StreamQuality.MP3_320.media_type == "audio/mpeg"
+    assert StreamQuality.MP3_128.media_type == "audio/mpeg"
@@ -1,14 +1,19 @@
 """Onzr server tests."""
 
+import asyncio
 from io import BytesIO
-from time import sleep
+from pathlib import Path
+from time import monotonic, sleep
 from unittest.mock import patch
 
+import pytest
 from fastapi import status
 
+from onzr.aio import GW_URL, AsyncTrack
 from onzr.models.core import PlayingState
+from onzr.traffic import Hedger, Priority
 
-from .factories import DeezerSongFactory, DeezerSongResponseFactory
+from .factories import DeezerSongFactory
 
 
 def test_queue_add_empty(client, responses, configured_onzr):
@@ -25,18 +30,22 @@ def test_queue_add_empty(client, responses, configured_onzr):
         assert track.track_id == expected
 
 
-def test_queue_add(client, responses, configured_onzr):
+def test_queue_add(client, deezer_gw, configured_onzr):
     """Test the POST /queue/ endpoint."""
     track_ids = [1, 2, 3]
-    for track_id in track_ids:
-        responses.post(
-            "http://www.deezer.com/ajax/gw-light.php",
-            status=200,
-            json=DeezerSongResponseFactory.build(
-                error={},
-                results=DeezerSongFactory.build(SNG_ID=track_id, FALLBACK=None),
-            ).model_dump(),
-        )
+    # Track info are fetched in a single batch
+    deezer_gw.post(GW_URL, params={"method": "song.getListData"}).respond(
+        json={
+            "error": {},
+            "results": {
+                "data": [
+                    DeezerSongFactory.build(SNG_ID=track_id, FALLBACK=None).model_dump()
+                    for track_id in track_ids
+                ],
+                "count": len(track_ids),
+            },
+        },
+    )
 
     assert len(configured_onzr.queue.tracks) == 0
 
@@ -47,6 +56,33 @@ def test_queue_add(client, responses, configured_onzr):
     assert len(configured_onzr.queue.tracks) == len(track_ids)
     for track, expected in zip(configured_onzr.queue.tracks, track_ids, strict=True):
         assert track.track_id == expected
+        assert track.track_info is not None
+
+
+def test_queue_add_batch_failure(client, deezer_gw, configured_onzr):
+    """Test the POST /queue/ endpoint when a songs batch fails."""
+    track_ids = [1, 2, 3]
+    deezer_gw.post(GW_URL, params={"method": "song.getListData"}).respond(500)
+    # Tracks of the failed batch are fetched individually
+    for track_id in track_ids:
+        deezer_gw.post(
+            GW_URL, params={"method": "song.getData"}, json={"SNG_ID": track_id}
+        ).respond(
+            json={
+                "error": {},
+                "results": DeezerSongFactory.build(
+                    SNG_ID=track_id, FALLBACK=None
+                ).model_dump(),
+            }
+        )
+
+    response = client.post("/queue/", json=track_ids)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == f"Added {len(track_ids)} track(s) to queue"
+    for track, expected in zip(configured_onzr.queue.tracks, track_ids, strict=True):
+        assert track.track_id == expected
+        assert track.track_info is not None
 
 
 def test_queue_clear(client, configured_onzr, track):
@@ -120,21 +156,13 @@ def test_stream_track_out_of_range(client, configured_onzr, track):
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
-def test_stream_track(client, responses, configured_onzr, track):
+def test_stream_track(client, configured_onzr, track):
     """Test the GET /queue/{rank}/stream endpoint."""
     # Fill queue
     track_ids = [1, 2, 3]
     configured_onzr.queue.add([track(track_id) for track_id in track_ids])
     assert len(configured_onzr.queue) == len(track_ids)
 
-    # Track info refresh request
-    responses.post(
-        "http://www.deezer.com/ajax/gw-light.php",
-        status=200,
-        json=DeezerSongResponseFactory.build(
-            error={}, results=DeezerSongFactory.build(SNG_ID=666)
-        ).model_dump(),
-    )
     rank = 1
     with client.stream("GET", f"/queue/{rank}/stream") as response:
         assert response.status_code == status.HTTP_200_OK
@@ -152,6 +180,82 @@ def test_stream_track(client, responses, configured_onzr, track):
     assert configured_onzr.queue.playing == rank
 
 
+@pytest.mark.usefixtures("audio_cache_settings")
+def test_stream_track_audio_cache(client, configured_onzr, track, deezer_gw):
+    """Test the GET /queue/{rank}/stream endpoint with cached tracks."""
+    configured_onzr.queue.add([track(1), track(2)])
+    refresh = deezer_gw.routes[-1]
+    expected = Path("./tests/intro-lvs.mp3").read_bytes()
+
+    with client.stream("GET", "/queue/1/stream") as response:
+        assert response.read() == expected
+    assert refresh.call_count == 1
+    assert len(configured_onzr.audio_cache) == 1
+
+    # Cached tracks are served without any request to Deezer
+    with client.stream("GET", "/queue/1/stream") as response:
+        assert response.read() == expected
+    assert refresh.call_count == 1
+
+
+@pytest.mark.usefixtures("audio_cache_settings")
+def test_stream_track_prefetch(client, configured_onzr, track, deezer_gw):
+    """Test the GET /queue/{rank}/stream endpoint upcoming tracks prefetch."""
+    configured_onzr.queue.add([track(1), track(2)])
+    refresh = deezer_gw.routes[-1]
+
+    # Keep the event loop running between requests
+    with client:
+        with client.stream("GET", "/queue/0/stream") as response:
+            response.read()
+        for _ in range(50):
+            if len(configured_onzr.audio_cache) == 2:  # noqa: PLR2004
+                break
+            sleep(0.1)
+        assert len(configured_onzr.audio_cache) == 2  # noqa: PLR2004
+        assert refresh.call_count == 1
+
+        # The next track is served from the audio cache
+        with client.stream("GET", "/queue/1/stream") as response:
+            assert response.read() == Path("./tests/intro-lvs.mp3").read_bytes()
+        assert refresh.call_count == 1
+
+        # Clearing the queue cancels prefetches
+        client.delete("/queue/")
+        assert configured_onzr.prefetcher.pins == set()
+
+
+@pytest.mark.usefixtures("audio_cache_settings")
+def test_stream_track_slow_prefetch(client, configured_onzr, track, monkeypatch):
+    """Test the GET /queue/{rank}/stream endpoint while the track is prefetched."""
+    expected = Path("./tests/intro-lvs.mp3").read_bytes()
+    stream_local_file = AsyncTrack.stream
+    delay = 2.0
+
+    async def stream(self, quality, priority):
+        if priority == Priority.PREFETCH:
+            await asyncio.sleep(delay)
+        async for chunk in stream_local_file(self, quality, priority):
+            yield chunk
+
+    monkeypatch.setattr(AsyncTrack, "stream", stream)
+    configured_onzr.queue.add([track(1), track(2)])
+
+    # Keep the event loop running between requests
+    with client:
+        with client.stream("GET", "/queue/0/stream") as response:
+            response.read()
+        assert len(configured_onzr.prefetcher.tasks) == 1
+
+        # The playing track prefetch is cancelled instead of being waited for
+        start = monotonic()
+        with client.stream("GET", "/queue/1/stream") as response:
+            assert response.read() == expected
+        assert monotonic() - start < delay
+        assert configured_onzr.prefetcher.tasks == {}
+        assert len(configured_onzr.audio_cache) == 2  # noqa: PLR2004
+
+
 def test_now_playing_empty(client, configured_onzr, track):
     """Test the GET /now endpoint when the queue is empty."""
     response = client.get("/now")
@@ -331,6 +435,57 @@ def test_state(client, configured_onzr, track):
     }
 
 
+def test_stats(client, configured_onzr):
+    """Test the GET /stats endpoint."""
+    response = client.get("/stats")
+    assert response.status_code == status.HTTP_200_OK
+    circuits = {
+        "api": "closed",
+        "gateway": "closed",
+        "media": "closed",
+        "cdn": "closed",
+    }
+    traffic = {
+        "metadata": {
+            "limit": 8,
+            "calls": 0,
+            "active": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+        },
+        "gateway": {
+            "limit": 4,
+            "calls": 0,
+            "active": 0,
+            "waiting": 0,
+            "max_waiting": 0,
+        },
+        "cdn": {"limit": 4, "calls": 0, "active": 0, "waiting": 0, "max_waiting": 0},
+    }
+    assert response.json() == {"traffic": traffic, "hedging": {}, "circuits": circuits}
+
+    # Hedging is enabled
+    configured_onzr.deezer.hedger = Hedger()
+    configured_onzr.deezer.hedger.counters["gateway"].update(calls=10, hedged=1)
+    response = client.get("/stats")
+    assert response.json() == {
+        "traffic": traffic,
+        "hedging": {"gateway": {"calls": 10, "hedged": 1, "won": 0}},
+        "circuits": circuits,
+    }
+
+
+def test_deezer_unavailable(client, configured_onzr):
+    """Test the server response when Deezer is unavailable."""
+    breaker = configured_onzr.deezer.breakers["gateway"]
+    for _ in range(breaker.failure_threshold):
+        breaker.failed()
+
+    response = client.post("/queue/", json=[1, 2])
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["detail"].startswith("Deezer gateway is unavailable")
+
+
 def test_ping(client):
     """Test the GET /ping endpoint."""
     response = client.get("/ping")
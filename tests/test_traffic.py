@@ -0,0 +1,375 @@
+"""Onzr traffic control tests."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from unittest.mock import Mock
+
+import pytest
+
+from onzr.exceptions import DeezerUnavailableException
+from onzr.traffic import (
+    AsyncSingleFlight,
+    CircuitBreaker,
+    CircuitState,
+    ConcurrencyGovernor,
+    Hedger,
+    Priority,
+    RateLimiter,
+    SingleFlight,
+    current_priority,
+    prioritized,
+)
+
+
+def test_single_flight():
+    """Test the SingleFlight `do` method."""
+    flight = SingleFlight()
+    started = Event()
+    release = Event()
+    calls = []
+
+    def fetch(id_):
+        calls.append(id_)
+        started.set()
+        release.wait(timeout=5)
+        return {"id": id_}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "track-1", fetch, 1)
+        started.wait(timeout=5)
+        followers = [executor.submit(flight.do, "track-1", fetch, 1) for _ in range(3)]
+        other = executor.submit(flight.do, "track-2", lambda: {"id": 2})
+        assert other.result() == {"id": 2}
+        release.set()
+        results = [f.result() for f in [leader, *followers]]
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert len(flight) == 0
+
+    # Once done, calls are performed again
+    assert flight.do("track-1", fetch, 1) == {"id": 1}
+    assert calls == [1, 1]
+
+
+def test_single_flight_exception():
+    """Test the SingleFlight `do` method when the call fails."""
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("Oops")
+
+    with pytest.raises(ValueError, match="Oops"):
+        flight.do("key", fail)
+    assert len(flight) == 0
+
+
+@pytest.mark.anyio
+async def test_async_single_flight():
+    """Test the AsyncSingleFlight `do` method."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch(id_):
+        calls.append(id_)
+        await asyncio.sleep(0.01)
+        return {"id": id_}
+
+    results = await asyncio.gather(
+        *(flight.do(("track", 1), fetch, 1) for _ in range(4)),
+        flight.do(("track", 2), fetch, 2),
+    )
+    assert calls == [1, 2]
+    assert results == [{"id": 1}] * 4 + [{"id": 2}]
+    assert len(flight) == 0
+
+    # Cancelling a caller does not cancel the shared call
+    first = asyncio.ensure_future(flight.do("key", fetch, 3))
+    second = asyncio.ensure_future(flight.do("key", fetch, 3))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == {"id": 3}
+    assert calls == [1, 2, 3]
+
+    async def fail():
+        raise ValueError("Oops")
+
+    with pytest.raises(ValueError, match="Oops"):
+        await flight.do("key", fail)
+    assert len(flight) == 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock, sleeping advances time."""
+    now = [1_000.0]
+
+    def sleep(delay):
+        now[0] += delay
+
+    monkeypatch.setattr("onzr.traffic.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("onzr.traffic.time.sleep", sleep)
+    monkeypatch.setattr("onzr.traffic.random.uniform", lambda a, b: b)
+    return now
+
+
+def test_rate_limiter(clock):
+    """Test the RateLimiter token bucket."""
+    limiter = RateLimiter(rate=10, burst=2)
+
+    # Burst
+    start = clock[0]
+    limiter.acquire()
+    limiter.acquire()
+    assert clock[0] == start
+
+    # Then we wait for tokens to be refilled
+    limiter.acquire()
+    assert clock[0] == pytest.approx(start + 0.1)
+    limiter.acquire()
+    assert clock[0] == pytest.approx(start + 0.2)
+
+
+def test_rate_limiter_adaptive_backoff(clock):
+    """Test the RateLimiter adaptive backoff."""
+    limiter = RateLimiter(rate=8, burst=1, min_rate=1, backoff=1, max_backoff=3)
+
+    # Quota errors slow down the rate and pause callers (exponential backoff)
+    assert limiter.throttled() == 1
+    assert limiter.rate == 4  # noqa: PLR2004
+    assert limiter.throttled() == 2  # noqa: PLR2004
+    assert limiter.rate == 2  # noqa: PLR2004
+    assert limiter.throttled() == 3  # noqa: PLR2004
+    assert limiter.throttled() == 3  # noqa: PLR2004
+    assert limiter.rate == 1
+
+    start = clock[0]
+    limiter.acquire()
+    assert clock[0] == pytest.approx(start + 3)
+
+    # Successful calls progressively restore the rate
+    limiter.succeeded()
+    assert limiter.rate == 1.4  # noqa: PLR2004
+    for _ in range(20):
+        limiter.succeeded()
+    assert limiter.rate == limiter.max_rate
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_aacquire(clock, monkeypatch):
+    """Test the RateLimiter `aacquire` method."""
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr("onzr.traffic.asyncio.sleep", sleep)
+    limiter = RateLimiter(rate=10, burst=1)
+
+    await limiter.aacquire()
+    await limiter.aacquire()
+    assert delays == [pytest.approx(0.1)]
+
+
+def test_hedger_delay():
+    """Test the Hedger `delay` method."""
+    hedger = Hedger(percentile=90, min_samples=5)
+    assert hedger.delay("gateway") is None
+
+    hedger._latencies["gateway"].extend([0.1 * i for i in range(1, 11)])
+    assert hedger.delay("gateway") == pytest.approx(0.9)
+    assert hedger.delay("media") is None
+
+
+@pytest.mark.anyio
+async def test_hedger_do():
+    """Test the Hedger `do` method."""
+    hedger = Hedger(percentile=50, max_ratio=0.25, min_samples=2)
+    delays = [0.0, 0.0]
+    calls = []
+
+    async def fetch(id_):
+        calls.append(id_)
+        await asyncio.sleep(delays.pop(0) if delays else 0.0)
+        return {"id": id_}
+
+    # Not enough latency measures to hedge calls
+    assert await hedger.do("gateway", fetch, 1) == {"id": 1}
+    assert await hedger.do("gateway", fetch, 1) == {"id": 1}
+    assert calls == [1, 1]
+    assert hedger.counters["gateway"] == {"calls": 2}
+
+    # A slow call is hedged and the duplicate call wins
+    delays = [1.0, 0.0]
+    assert await hedger.do("gateway", fetch, 2) == {"id": 2}
+    assert calls == [1, 1, 2, 2]
+    assert hedger.counters["gateway"] == {"calls": 3, "hedged": 1, "won": 1}
+
+    # Hedging is bounded by the extra load budget
+    delays = [0.1, 0.0]
+    assert await hedger.do("gateway", fetch, 3) == {"id": 3}
+    assert calls == [1, 1, 2, 2, 3]
+    assert hedger.counters["gateway"] == {"calls": 4, "hedged": 1, "won": 1}
+
+
+@pytest.mark.anyio
+async def test_hedger_do_errors():
+    """Test the Hedger `do` method when calls fail."""
+    hedger = Hedger(percentile=50, max_ratio=1, min_samples=1)
+    hedger._latencies["gateway"].append(0.01)
+    calls = []
+
+    async def fail(id_):
+        calls.append(id_)
+        attempt = len(calls)
+        await asyncio.sleep(0.05 if attempt == 1 else 0.0)
+        raise ValueError(f"Oops {attempt}")
+
+    # The first call error is raised when all calls failed
+    with pytest.raises(ValueError, match="Oops 1"):
+        await hedger.do("gateway", fail, 1)
+    assert calls == [1, 1]
+    assert hedger.counters["gateway"] == {"calls": 1, "hedged": 1}
+
+
+def test_circuit_breaker(clock, monkeypatch):
+    """Test the CircuitBreaker states."""
+    logger = Mock()
+    monkeypatch.setattr("onzr.traffic.logger", logger)
+    breaker = CircuitBreaker("gateway", failure_threshold=2, reset_timeout=10)
+    assert breaker.state == CircuitState.CLOSED
+
+    # Failures must be consecutive to open the circuit
+    breaker.acquire()
+    breaker.failed()
+    breaker.acquire()
+    breaker.succeeded()
+    breaker.acquire()
+    breaker.failed()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.acquire()
+    breaker.failed()
+    assert breaker.state == CircuitState.OPEN
+    logger.warning.assert_called_once_with(
+        "Deezer gateway circuit is now open (was closed)"
+    )
+
+    # Calls fail fast while the circuit is open
+    with pytest.raises(DeezerUnavailableException, match="retry in 10s"):
+        breaker.acquire()
+
+    # Then a single trial call is allowed
+    clock[0] += 10
+    breaker.acquire()
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(DeezerUnavailableException, match="checking its recovery"):
+        breaker.acquire()
+
+    # A failed trial opens the circuit again
+    breaker.failed()
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(DeezerUnavailableException):
+        breaker.acquire()
+
+    # A released trial allows another one
+    clock[0] += 10
+    breaker.acquire()
+    breaker.release()
+    breaker.acquire()
+
+    # A successful trial closes the circuit
+    breaker.succeeded()
+    assert breaker.state == CircuitState.CLOSED
+    logger.info.assert_called_with(
+        "Deezer gateway circuit is now closed (was half-open)"
+    )
+    breaker.acquire()
+
+
+@pytest.mark.anyio
+async def test_concurrency_governor():
+    """Test the ConcurrencyGovernor `slot` method."""
+    governor = ConcurrencyGovernor({"gateway": 2, "cdn": 0})
+    assert governor.limits == {"gateway": 2}
+    release = asyncio.Event()
+    running = []
+
+    async def call(traffic, id_):
+        async with governor.slot(traffic):
+            running.append(id_)
+            await release.wait()
+            running.remove(id_)
+
+    tasks = [asyncio.ensure_future(call("gateway", i)) for i in range(5)]
+    tasks += [asyncio.ensure_future(call("cdn", i)) for i in range(5, 8)]
+    await asyncio.sleep(0.01)
+
+    # Unlimited traffic classes are not queued
+    assert running == [0, 1, 5, 6, 7]
+    assert governor.counters["gateway"] == {
+        "calls": 2,
+        "active": 2,
+        "waiting": 3,
+        "max_waiting": 3,
+    }
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert running == []
+    assert governor.counters["gateway"] == {
+        "calls": 5,
+        "active": 0,
+        "waiting": 0,
+        "max_waiting": 3,
+    }
+
+
+@pytest.mark.anyio
+async def test_concurrency_governor_priorities():
+    """Test the ConcurrencyGovernor slots priority scheduling."""
+    governor = ConcurrencyGovernor({"gateway": 1})
+    release = asyncio.Event()
+    done = []
+
+    async def call(id_, priority=None):
+        async with governor.slot("gateway", priority):
+            await release.wait()
+            done.append(id_)
+
+    async def prioritized_call(id_, priority):
+        with prioritized(priority):
+            await call(id_)
+
+    holder = asyncio.ensure_future(call("holder"))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.ensure_future(call("queue-1")),
+        asyncio.ensure_future(prioritized_call("prefetch-1", Priority.PREFETCH)),
+        asyncio.ensure_future(call("queue-2", Priority.QUEUE)),
+        asyncio.ensure_future(call("cancelled", Priority.STREAM)),
+        asyncio.ensure_future(prioritized_call("prefetch-2", Priority.PREFETCH)),
+        asyncio.ensure_future(prioritized_call("stream", Priority.STREAM)),
+    ]
+    await asyncio.sleep(0.01)
+    assert governor.counters["gateway"]["waiting"] == len(tasks)
+
+    # Cancelled waiting calls are skipped
+    tasks.pop(3).cancel()
+    await asyncio.sleep(0)
+
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    assert done == [
+        "holder",
+        "stream",
+        "prefetch-1",
+        "prefetch-2",
+        "queue-1",
+        "queue-2",
+    ]
+    assert governor.counters["gateway"]["active"] == 0
+    assert governor.counters["gateway"]["waiting"] == 0
+
+    # The context priority is restored
+    assert current_priority.get() == Priority.QUEUE